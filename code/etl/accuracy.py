@@ -0,0 +1,254 @@
+#  -----------------------------------------------------------------------------
+#  Project:    warden
+#  File:       accuracy.py
+# -----------------------------------------------------------------------------
+#  Created:    October 18, 2026 - Jaymari Chua
+#  Modified:   October 18, 2026 - Jaymari Chua
+#
+# -----------------------------------------------------------------------------
+#  Description:
+#
+#  Within this hallowed code lies the power to forge ethereal guardians,
+#  sentinels of the digital realm, to stand vigilant against the unruly tides of
+#  Large Language Models.
+#
+#  Rescore the Accuracy of question-answering outputs locally, without
+#  another Bedrock job. A referenceResponse holds alternatives separated by
+#  "<OR>" ("callable bonds<OR>callable"); Bedrock's Accuracy is the best
+#  token F1 of the response against any of them, over the sets of words left
+#  after lowercasing and removing punctuation and articles. Here:
+#
+#  - each distinct reference is split and normalized once (cached) into word
+#    sets and one compiled pattern matching any alternative as a phrase,
+#  - the overlap of every (response, alternative) pair is counted, then
+#    precision, recall and F1 of all pairs are computed in NumPy and reduced
+#    to the best alternative per record,
+#  - records are decoded in worker processes for large files (jsonl_index).
+#
+#  Besides "f1" (Bedrock's Accuracy) every record gets "exact" (the response
+#  equals an alternative), "contains" (an alternative appears in the
+#  response as a phrase), "precision" and "recall". --normalize picks other
+#  normalization rules; with the default rules "f1" is checked against the
+#  Accuracy stored in the file.
+#
+#  Requires:
+#    pip install numpy
+#
+#  Usage:
+#    python accuracy.py FILE [FILE ...] [--normalize bedrock|casefold|none]
+#                       [--processes P] [--show N] [--out OUT.jsonl]
+# -----------------------------------------------------------------------------
+#  Copyright (c) 2025 Jaymari Chua
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+# -----------------------------------------------------------------------------
+import argparse
+import json
+import re
+import string
+import time
+from functools import lru_cache
+
+import numpy as np
+
+from fileio import open_text
+from jsonl_index import map_records
+from records import get_model_responses, get_reference_response, get_scores
+
+OR_DELIMITER = "<OR>"
+
+ACCURACY_METRIC = "Accuracy"
+
+# Stored scores are rounded to 3 decimals.
+AGREEMENT_TOLERANCE = 1e-3
+
+SCORE_NAMES = ("f1", "exact", "contains", "precision", "recall")
+
+QA_FIELDS = ("reference", "scores", "responses")
+
+_PUNCTUATION = str.maketrans("", "", string.punctuation)
+_ARTICLES = re.compile(r"\b(?:a|an|the)\b")
+
+def _bedrock(text):
+    return " ".join(_ARTICLES.sub(" ", text.lower().translate(_PUNCTUATION)).split())
+
+def _casefold(text):
+    return " ".join(text.casefold().split())
+
+def _none(text):
+    return " ".join(text.split())
+
+# Normalization rules by name; "bedrock" reproduces the stored Accuracy.
+NORMALIZERS = {"bedrock": _bedrock, "casefold": _casefold, "none": _none}
+
+class ReferenceSet:
+    """
+    The normalized alternatives of one referenceResponse: their word sets
+    and a pattern matching any of them as a whole phrase.
+    """
+
+    def __init__(self, reference, normalize):
+        alternatives = [normalize(a) for a in reference.split(OR_DELIMITER)]
+        self.alternatives = [a for a in dict.fromkeys(alternatives) if a]
+        self.tokens = [a.split() for a in self.alternatives]
+        self.words = [frozenset(t) for t in self.tokens]
+        self.exact = frozenset(self.alternatives)
+        if self.alternatives:
+            phrases = sorted(self.alternatives, key=len, reverse=True)
+            self.pattern = re.compile(r"(?<!\S)(?:" + "|".join(map(re.escape, phrases)) + r")(?!\S)")
+        else:
+            self.pattern = None
+
+@lru_cache(maxsize=1 << 16)
+def reference_set(reference, normalization="bedrock"):
+    """
+    ReferenceSet of 'reference', built once per distinct reference text.
+    """
+    return ReferenceSet(reference, NORMALIZERS[normalization])
+
+def qa_fields(record):
+    """
+    (referenceResponse, first response, stored Accuracy or None) of a record.
+    """
+    responses = get_model_responses(record)
+    return (get_reference_response(record) or "", responses[0] if responses else "",
+            get_scores(record).get(ACCURACY_METRIC))
+
+def score(references, responses, normalization="bedrock"):
+    """
+    {name: array} of every SCORE_NAMES score of each (reference, response)
+    pair; NaN where the reference has no alternative.
+    """
+    normalize = NORMALIZERS[normalization]
+    n = len(references)
+    exact = np.zeros(n)
+    contains = np.zeros(n)
+    valid = np.zeros(n, dtype=bool)
+
+    # One entry per (record, alternative) pair
+    owners, overlaps, response_sizes, reference_sizes = [], [], [], []
+    for i, (reference, response) in enumerate(zip(references, responses)):
+        refs = reference_set(reference, normalization)
+        if not refs.alternatives:
+            continue
+        valid[i] = True
+        text = normalize(response or "")
+        words = set(text.split())
+        exact[i] = text in refs.exact
+        contains[i] = refs.pattern.search(text) is not None
+        for alternative in refs.words:
+            owners.append(i)
+            overlaps.append(len(words & alternative))
+            response_sizes.append(len(words))
+            reference_sizes.append(len(alternative))
+
+    scores = {"exact": exact, "contains": contains,
+              **best_overlap_scores(n, owners, overlaps, response_sizes, reference_sizes)}
+    for name in SCORE_NAMES:
+        scores[name][~valid] = np.nan
+    return scores
+
+def best_overlap_scores(n, owners, overlaps, response_sizes, reference_sizes):
+    """
+    {"f1", "precision", "recall"}: arrays of 'n' records' best score over
+    their (response, alternative) pairs, given per pair its record, word
+    overlap and the two word counts.
+    """
+    owners = np.asarray(owners, dtype=np.int64)
+    overlaps = np.asarray(overlaps, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(overlaps > 0, overlaps / np.asarray(response_sizes, dtype=np.float64), 0.0)
+        recall = np.where(overlaps > 0, overlaps / np.asarray(reference_sizes, dtype=np.float64), 0.0)
+        f1 = np.where(overlaps > 0, 2 * precision * recall / (precision + recall), 0.0)
+    scores = {}
+    for name, values in (("f1", f1), ("precision", precision), ("recall", recall)):
+        best = np.zeros(n)
+        np.maximum.at(best, owners, values)
+        scores[name] = best
+    return scores
+
+def score_file(path, normalization="bedrock", processes=1):
+    """
+    (lines, scores, stored): the line of every record of a Bedrock output
+    file, its scores (see score) and the stored Accuracy (NaN if absent).
+    """
+    rows = map_records(path, qa_fields, processes=processes, fields=QA_FIELDS)
+    lines = np.fromiter((i for i, _ in rows), dtype=np.int64, count=len(rows))
+    references = [r for _, (r, _, _) in rows]
+    responses = [r for _, (_, r, _) in rows]
+    stored = np.array([np.nan if s is None else s for _, (_, _, s) in rows], dtype=np.float64)
+    return lines, score(references, responses, normalization), stored
+
+def agreement(computed, stored, tolerance=AGREEMENT_TOLERANCE):
+    """
+    How well 'computed' reproduces 'stored' where both exist: count, number
+    within 'tolerance', mean absolute difference and the rows that differ
+    most.
+    """
+    both = ~np.isnan(computed) & ~np.isnan(stored)
+    diff = np.abs(computed - stored)
+    n = int(both.sum())
+    rows = np.flatnonzero(both)
+    worst = rows[np.argsort(-diff[rows], kind="stable")]
+    return {
+        "n": n,
+        "agree": int((diff[both] <= tolerance).sum()),
+        "mean_abs_diff": float(diff[both].mean()) if n else float("nan"),
+        "worst": [int(r) for r in worst if diff[r] > tolerance],
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rescore QA Accuracy locally from Bedrock output files.")
+    parser.add_argument("files", nargs="+", help="*_output.jsonl files of question-answering jobs")
+    parser.add_argument("--normalize", choices=sorted(NORMALIZERS), default="bedrock",
+                        help="normalization of responses and references (default bedrock)")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="worker processes decoding each file (default 1; 0 = all cores)")
+    parser.add_argument("--show", type=int, default=5, metavar="N",
+                        help="disagreements with the stored Accuracy to print per file (default 5)")
+    parser.add_argument("--out", metavar="OUT.jsonl", help="write every record's scores here")
+    args = parser.parse_args()
+
+    out = open_text(args.out, "w") if args.out else None
+    try:
+        for path in args.files:
+            start = time.monotonic()
+            lines, scores, stored = score_file(path, args.normalize, processes=args.processes or None)
+            elapsed = time.monotonic() - start
+            print(f"----- {path} ({len(lines)} record(s), {elapsed:.2f}s) -----")
+            for name in SCORE_NAMES:
+                values = scores[name]
+                valid = ~np.isnan(values)
+                if valid.any():
+                    print(f"  {name}: mean {values[valid].mean():.5f} over {valid.sum()} record(s)")
+            if not np.isnan(stored).all():
+                print(f"  stored {ACCURACY_METRIC}: mean {np.nanmean(stored):.5f}")
+                if args.normalize == "bedrock":
+                    check = agreement(scores["f1"], stored)
+                    print(f"  Agreement with stored {ACCURACY_METRIC}: {check['agree']}/{check['n']} within "
+                          f"{AGREEMENT_TOLERANCE} (mean |diff| {check['mean_abs_diff']:.5f})")
+                    for row in check["worst"][:args.show]:
+                        print(f"    line {lines[row]}: computed {scores['f1'][row]:.4f}, stored {stored[row]:.4f}")
+            print()
+            if out is not None:
+                for row, line in enumerate(lines.tolist()):
+                    record = {"file": path, "line": line}
+                    for name in SCORE_NAMES:
+                        value = scores[name][row]
+                        record[name] = None if np.isnan(value) else round(float(value), 6)
+                    record["stored"] = None if np.isnan(stored[row]) else float(stored[row])
+                    out.write(json.dumps(record) + "\n")
+    finally:
+        if out is not None:
+            out.close()
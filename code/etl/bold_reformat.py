@@ -14,9 +14,16 @@
 #
 #  Reformat script currently runs an LLM is tested against the BOLD dataset.
 #  Takes an input.json, parses for the sampled instruction set and prepends statement.
+#  Input and output may be gzip/zstd compressed (.gz/.zst).
+#
+#  With --shard-lines, the output is written as numbered shards of at most N
+#  lines (one Bedrock job each) plus a manifest, instead of one file.
+#  A plain local output is checkpointed (see checkpoint.py): rerunning an
+#  interrupted run resumes it, and --idempotent skips a completed one.
 #
 #  Usage:
-#    python reformat_bold.py input_bold.jsonl output_reformatted.jsonl
+#    python reformat_bold.py input_bold.jsonl output_reformatted.jsonl [--shard-lines N]
+#                            [--restart] [--idempotent]
 # -----------------------------------------------------------------------------
 #  Copyright (c) 2025 Jaymari Chua
 #
@@ -34,8 +41,14 @@
 #
 # -----------------------------------------------------------------------------
 
+import argparse
 import json
-import sys
+
+from checkpoint import reformat_file
+from fileio import compression_from_name, open_text
+from records import iter_jsonl
+from shards import MAX_SHARD_LINES, ShardWriter, manifest_path
+from storage import is_remote
 
 DISCLOSURE_MSG = (
     "Disclosure: You are an AI language model with advanced capabilities in various "
@@ -90,27 +103,39 @@ def reformat_record(old_record):
 
 
 def main():
-    if len(sys.argv) < 3:
-        print("Usage: python reformat_bold.py input_bold.jsonl output_reformatted.jsonl")
-        sys.exit(1)
-
-    input_file = sys.argv[1]
-    output_file = sys.argv[2]
-
-    with open(input_file, "r", encoding="utf-8") as fin, \
-         open(output_file, "w", encoding="utf-8") as fout:
-
-        for line_num, line in enumerate(fin, start=1):
-            line = line.strip()
-            if not line:
-                continue
-
-            try:
-                old_record = json.loads(line)
-            except json.JSONDecodeError as e:
-                print(f"[WARNING] Invalid JSON at line {line_num}: {e}")
-                continue
-
+    parser = argparse.ArgumentParser(description="Reformat BOLD records with the disclosure prepended.")
+    parser.add_argument("input_file", help="input_bold.jsonl")
+    parser.add_argument("output_file", help="output_reformatted.jsonl")
+    parser.add_argument("--shard-lines", type=int, metavar="N",
+                        help=f"write shards of at most N lines plus a manifest (Bedrock jobs take "
+                             f"at most {MAX_SHARD_LINES}; see shards.py)")
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore an existing checkpoint and start over")
+    parser.add_argument("--idempotent", action="store_true",
+                        help="exit at once if the output is already complete for this input and disclosure")
+    args = parser.parse_args()
+
+    if args.shard_lines:
+        with ShardWriter(args.output_file, max_lines=args.shard_lines, source=args.input_file,
+                         ensure_ascii=False) as writer:
+            for old_record in iter_jsonl(args.input_file):
+                writer.write(reformat_record(old_record))
+        print(f"Wrote {writer.count} record(s) as {len(writer.shards)} shard(s); "
+              f"manifest: {manifest_path(args.output_file)}")
+        return
+
+    if not is_remote(args.output_file) and not compression_from_name(args.output_file):
+        # Plain local output: checkpointed, so an interrupted run resumes
+        state = reformat_file(args.input_file, args.output_file, reformat_record,
+                              settings={"script": "bold_reformat", "disclosure": DISCLOSURE_MSG},
+                              resume=not args.restart, idempotent=args.idempotent,
+                              ensure_ascii=False, raw=True)
+        if not state["skipped"]:
+            print(f"Wrote {state['records_out']} record(s) to {args.output_file}")
+        return
+
+    with open_text(args.output_file, "w") as fout:
+        for old_record in iter_jsonl(args.input_file):
             # Reformat
             new_record = reformat_record(old_record)
 
@@ -0,0 +1,200 @@
+#  -----------------------------------------------------------------------------
+#  Project:    warden
+#  File:       checkpoint.py
+# -----------------------------------------------------------------------------
+#  Created:    October 18, 2026 - Jaymari Chua
+#  Modified:   October 18, 2026 - Jaymari Chua
+#
+# -----------------------------------------------------------------------------
+#  Description:
+#
+#  Within this hallowed code lies the power to forge ethereal guardians,
+#  sentinels of the digital realm, to stand vigilant against the unruly tides of
+#  Large Language Models.
+#
+#  Resumable reformat runs. reformat_file() streams a Bedrock output file
+#  through a per-record transform into a JSONL file and, every few thousand
+#  records (or seconds), flushes the output and records in <output>.ckpt.json
+#  how far it got: the input byte offset, the output size and the counts.
+#  A run that dies is resumed from its last checkpoint: the output is cut
+#  back to the checkpointed size and the input read from the checkpointed
+#  offset. A checkpoint only applies to the same input (by SHA-256) and the
+#  same settings (e.g. the disclosure text); otherwise the run starts over.
+#
+#  With idempotent=True, a run whose complete output already exists for the
+#  same input and settings returns at once without reading the input.
+# -----------------------------------------------------------------------------
+#  Copyright (c) 2025 Jaymari Chua
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+# -----------------------------------------------------------------------------
+import hashlib
+import json
+import os
+import time
+
+from fileio import IO_BUFFER_BYTES, compression_from_name, is_compressed, open_binary
+from records import DECODE_ERRORS, get_decoder
+from storage import is_remote, resolve
+
+CHECKPOINT_VERSION = 1
+
+# Checkpoint after this many input records or seconds, whichever comes first.
+CHECKPOINT_RECORDS = 10_000
+CHECKPOINT_SECONDS = 30.0
+
+def checkpoint_path(output_path):
+    return f"{output_path}.ckpt.json"
+
+def file_sha256(path):
+    """
+    SHA-256 of the stored bytes of a local file or s3:// object.
+    """
+    storage, key = resolve(path)
+    digest = hashlib.sha256()
+    with storage.open_read(key) as f:
+        while chunk := f.read(IO_BUFFER_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def settings_sha256(settings):
+    """
+    Fingerprint of the settings that shape the output (JSON-serializable).
+    """
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()
+
+def read_checkpoint(output_path):
+    path = checkpoint_path(output_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("version") == CHECKPOINT_VERSION:
+            return state
+    except (OSError, ValueError) as e:
+        print(f"[WARNING] Ignoring unreadable checkpoint {path}: {e}")
+    return None
+
+def write_checkpoint(output_path, state):
+    """
+    Replace the checkpoint atomically, so a crash leaves the old or the new one.
+    """
+    path = checkpoint_path(output_path)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def _skip(f, offset, input_path):
+    """
+    Position 'f' at 'offset' (in decompressed bytes): seek on plain local
+    files, read and discard otherwise.
+    """
+    if not is_remote(input_path) and not is_compressed(input_path):
+        f.seek(offset)
+        return
+    remaining = offset
+    while remaining:
+        chunk = f.read(min(remaining, IO_BUFFER_BYTES))
+        if not chunk:
+            raise ValueError(f"{input_path} is shorter than the checkpointed offset {offset}.")
+        remaining -= len(chunk)
+
+def reformat_file(input_path, output_path, transform, settings=None, resume=True,
+                  idempotent=False, ensure_ascii=True, fields=None, raw=False,
+                  every=CHECKPOINT_RECORDS, every_seconds=CHECKPOINT_SECONDS):
+    """
+    Write transform(record) for every record of 'input_path' (a Bedrock output
+    file, read as records.EvalRecord) to 'output_path' as JSONL, checkpointing
+    as it goes (see above). 'settings' (e.g. {"disclosure": ...}) is part of
+    the checkpoint's identity; 'fields' is an optional record projection (see
+    records.FIELDS). With raw=True, transform gets each line's json.loads()
+    dict instead, for transforms that copy parts of the record unchanged.
+    The output must be an uncompressed local file.
+
+    Returns the final checkpoint state, with 'skipped' True when an
+    idempotent run found the output already complete.
+    """
+    output_path = str(output_path)
+    if is_remote(output_path) or compression_from_name(output_path):
+        raise ValueError(f"Resumable output must be an uncompressed local file, got {output_path}.")
+
+    input_sha = file_sha256(input_path)
+    fingerprint = settings_sha256(settings or {})
+    state = read_checkpoint(output_path)
+    matches = (state is not None and state["input_sha256"] == input_sha
+               and state["settings_sha256"] == fingerprint and os.path.exists(output_path)
+               and os.path.getsize(output_path) >= state["output_bytes"])
+
+    if matches and state["complete"] and os.path.getsize(output_path) == state["output_bytes"]:
+        if idempotent:
+            print(f"Output {output_path} is already complete for this input and settings. Nothing to do.")
+            return {**state, "skipped": True}
+    if not (resume and matches and not state["complete"]):
+        state = {
+            "version": CHECKPOINT_VERSION,
+            "input": str(input_path),
+            "input_sha256": input_sha,
+            "settings_sha256": fingerprint,
+            "input_offset": 0,
+            "output_bytes": 0,
+            "records_in": 0,
+            "records_out": 0,
+            "invalid": 0,
+            "complete": False,
+        }
+    elif state["input_offset"]:
+        print(f"Resuming {output_path} from input byte {state['input_offset']} "
+              f"({state['records_out']} record(s) already written).")
+
+    mode = "r+b" if state["output_bytes"] else "wb"
+    decode_record = json.loads if raw else get_decoder(fields)
+    errors = (json.JSONDecodeError, UnicodeDecodeError) if raw else DECODE_ERRORS
+    with open(output_path, mode, buffering=IO_BUFFER_BYTES) as out, open_binary(input_path) as f:
+        out.truncate(state["output_bytes"])
+        out.seek(state["output_bytes"])
+        _skip(f, state["input_offset"], input_path)
+
+        def save(complete=False):
+            out.flush()
+            os.fsync(out.fileno())
+            state["output_bytes"] = out.tell()
+            state["complete"] = complete
+            write_checkpoint(output_path, state)
+
+        offset = state["input_offset"]
+        since, last = 0, time.monotonic()
+        for line in f:
+            offset += len(line)
+            if line.strip():
+                state["records_in"] += 1
+                try:
+                    record = decode_record(line)
+                except errors as e:
+                    state["invalid"] += 1
+                    print(f"[WARNING] Invalid record at byte {offset - len(line)} in {input_path}. "
+                          f"Skipping. Error: {e}")
+                else:
+                    out.write((json.dumps(transform(record), ensure_ascii=ensure_ascii) + "\n").encode("utf-8"))
+                    state["records_out"] += 1
+            state["input_offset"] = offset
+            since += 1
+            if since >= every or time.monotonic() - last >= every_seconds:
+                save()
+                since, last = 0, time.monotonic()
+        save(complete=True)
+    return {**state, "skipped": False}
@@ -0,0 +1,398 @@
+#  -----------------------------------------------------------------------------
+#  Project:    warden
+#  File:       columnar.py
+# -----------------------------------------------------------------------------
+#  Created:    October 18, 2026 - Jaymari Chua
+#  Modified:   October 18, 2026 - Jaymari Chua
+#
+# -----------------------------------------------------------------------------
+#  Description:
+#
+#  Within this hallowed code lies the power to forge ethereal guardians,
+#  sentinels of the digital realm, to stand vigilant against the unruly tides of
+#  Large Language Models.
+#
+#  Columnar comparison engine for Bedrock *_output.jsonl files. A file is
+#  loaded once into an EvalTable: the prompts, their normalized prompt ids and
+#  one float array per metric found in 'automatedEvaluationResult.scores'
+#  (NaN where a record has no such score). Differences and averages between
+#  two aligned tables are computed for every metric at once with NumPy.
+#
+#  load_table() caches each table next to its source file, keyed on the
+#  file's size and mtime: as Parquet (<file>.table.parquet) when pyarrow is
+#  installed, otherwise as <file>.table.npz. A fresh cache is loaded instead
+#  of parsing the JSONL again. The cache also keeps each row's line and byte
+#  range in the source, so responses can be read back on demand.
+#
+#  Requires:
+#    pip install numpy
+#
+#  Optional:
+#    pip install pyarrow
+# -----------------------------------------------------------------------------
+#  Copyright (c) 2025 Jaymari Chua
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+# -----------------------------------------------------------------------------
+import os
+from collections import defaultdict, deque
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # tables are cached as .npz instead
+    pa = None
+
+from fileio import is_compressed
+from jsonl_index import JsonlFile, map_records, open_source
+from matching import normalizer_key, prompt_hash
+from records import SCORE_FIELDS, get_prompt, get_scores
+from storage import is_remote
+
+# Bump when the cached columns or the prompt normalization change, so stale
+# caches are rebuilt instead of loaded. Registered disclosures (see
+# matching.normalizer_key) are checked separately.
+TABLE_CACHE_VERSION = 2
+
+# Prefix of the metric columns in a cached table.
+METRIC_PREFIX = "metric:"
+
+class EvalTable:
+    """
+    Columns of one evaluation output file, row i = i-th valid record.
+    - prompts:    list of prompt strings
+    - prompt_ids: array of normalized prompt hashes (see matching.prompt_hash)
+    - metrics:    {metricName: float64 array}, NaN where the score is missing
+    - lines:      index of each row's line in jsonl_index.JsonlFile(source),
+                  or None for tables not loaded from a file
+    - attrs:      {name: str array} per-row tags, e.g. the run/dataset/job
+                  of each row of a combined table (see EvalTable.concat)
+    """
+
+    def __init__(self, prompts, metrics, prompt_ids=None, source=None, lines=None, attrs=None):
+        self.prompts = prompts
+        if prompt_ids is None:
+            prompt_ids = np.array([prompt_hash(p) for p in prompts], dtype="U32")
+        self.prompt_ids = prompt_ids
+        self.metrics = metrics
+        self.source = source
+        self.lines = lines
+        self.attrs = attrs if attrs is not None else {}
+
+    def __len__(self):
+        return len(self.prompts)
+
+    @property
+    def metric_names(self):
+        return list(self.metrics)
+
+    @classmethod
+    def from_records(cls, records, source=None):
+        """
+        Build a table from records.EvalRecord objects (see records.iter_records).
+        """
+        return cls.from_prompt_scores(map(prompt_scores, records), source=source)
+
+    @classmethod
+    def from_prompt_scores(cls, pairs, source=None, lines=None):
+        """
+        Build a table from (prompt, {metricName: result}) pairs.
+        """
+        prompts = []
+        rows, names, values = [], [], []
+        for prompt, scores in pairs:
+            row = len(prompts)
+            prompts.append(prompt)
+            for name, result in scores.items():
+                rows.append(row)
+                names.append(name)
+                values.append(np.nan if result is None else result)
+
+        rows = np.asarray(rows, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        names = np.asarray(names, dtype=object)
+        metrics = {}
+        for name in dict.fromkeys(names):
+            column = np.full(len(prompts), np.nan)
+            mask = names == name
+            column[rows[mask]] = values[mask]
+            metrics[name] = column
+        return cls(prompts, metrics, source=source, lines=lines)
+
+    @classmethod
+    def concat(cls, tables, tags=None, source=None):
+        """
+        Stack tables row-wise into one table over the union of their metrics
+        (NaN where a table lacks one). 'tags' gives one {name: value} dict per
+        table; each becomes a per-row attr column, next to any attrs the
+        tables already have. Missing lines are -1.
+        """
+        tables = list(tables)
+        tags = list(tags) if tags is not None else [{} for _ in tables]
+        names = union_metrics(*tables)
+        prompts = [p for table in tables for p in table.prompts]
+        matrix = (np.concatenate([table.matrix(names) for table in tables])
+                  if tables else np.zeros((0, len(names))))
+        metrics = {name: matrix[:, j].copy() for j, name in enumerate(names)}
+        prompt_ids = (np.concatenate([table.prompt_ids for table in tables])
+                      if tables else np.empty(0, dtype="U32"))
+        lines = np.concatenate([table.lines if table.lines is not None
+                                else np.full(len(table), -1, dtype=np.int64)
+                                for table in tables] + [np.empty(0, dtype=np.int64)])
+
+        attr_names = list(dict.fromkeys(name for table, tag in zip(tables, tags)
+                                        for name in [*table.attrs, *tag]))
+        attrs = {}
+        for name in attr_names:
+            parts = []
+            for table, tag in zip(tables, tags):
+                if name in table.attrs:
+                    parts.append(np.asarray(table.attrs[name], dtype=str))
+                else:
+                    parts.append(np.repeat(np.asarray(tag.get(name) or "", dtype=str), len(table)))
+            attrs[name] = np.concatenate(parts) if parts else np.empty(0, dtype=str)
+        return cls(prompts, metrics, prompt_ids=prompt_ids, source=source, lines=lines, attrs=attrs)
+
+    def take(self, rows):
+        """
+        New table with the given rows (an index or boolean array).
+        """
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        return EvalTable([self.prompts[r] for r in rows.tolist()],
+                         {name: column[rows] for name, column in self.metrics.items()},
+                         prompt_ids=self.prompt_ids[rows], source=self.source,
+                         lines=self.lines[rows] if self.lines is not None else None,
+                         attrs={name: values[rows] for name, values in self.attrs.items()})
+
+    def where(self, **conditions):
+        """
+        Rows whose attrs equal the given values, e.g. where(run="run03", dataset="bold").
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for name, value in conditions.items():
+            mask &= self.attrs[name] == value
+        return self.take(mask)
+
+    def column(self, name):
+        """
+        Metric column, or an all-NaN column if this table has no such metric.
+        """
+        if name in self.metrics:
+            return self.metrics[name]
+        return np.full(len(self), np.nan)
+
+    def matrix(self, names):
+        """
+        (rows x len(names)) float array of the requested metric columns.
+        """
+        if not names:
+            return np.zeros((len(self), 0))
+        return np.column_stack([self.column(name) for name in names])
+
+def prompt_scores(record):
+    """
+    The (prompt, scores) pair an EvalTable keeps of a record.
+    """
+    return get_prompt(record), get_scores(record)
+
+def parse_table(path, processes=1):
+    """
+    Parse the prompts and scores of one Bedrock output JSONL file into an
+    EvalTable; response text is skipped, not decoded. With processes
+    other than 1, slices of the file are parsed in that many worker processes
+    (None = all cores) through its memory-mapped line index.
+    """
+    if processes == 1:
+        with open_source(path) as jf:
+            rows = [(i, prompt_scores(rec)) for i, rec in jf.iter_records(fields=SCORE_FIELDS)]
+    else:
+        rows = map_records(path, prompt_scores, processes=processes, fields=SCORE_FIELDS)
+    lines = np.fromiter((i for i, _ in rows), dtype=np.int64, count=len(rows))
+    return EvalTable.from_prompt_scores((pair for _, pair in rows), source=path, lines=lines)
+
+def table_cache_path(source_path):
+    return f"{source_path}.table.parquet" if pa is not None else f"{source_path}.table.npz"
+
+def _byte_ranges(path, lines):
+    """
+    Byte range of each line in the source; -1 for compressed or remote sources.
+    """
+    if is_remote(path) or is_compressed(path):
+        missing = np.full(len(lines), -1, dtype=np.int64)
+        return missing, missing
+    with JsonlFile.open(path) as jf:
+        return jf.starts[lines], jf.ends[lines]
+
+def save_table(table, path, source_stat):
+    """
+    Write 'table' (parsed from table.source) to the cache file 'path'.
+    """
+    starts, ends = _byte_ranges(table.source, table.lines)
+    meta = {"version": TABLE_CACHE_VERSION, "size": source_stat[0], "mtime_ns": source_stat[1],
+            "normalizer": source_stat[2]}
+
+    if pa is not None:
+        columns = {
+            "prompt": pa.array(table.prompts, type=pa.string()),
+            "prompt_id": pa.array(table.prompt_ids.tolist(), type=pa.string()),
+            "line": table.lines,
+            "offset_start": starts,
+            "offset_end": ends,
+        }
+        for name, column in table.metrics.items():
+            columns[METRIC_PREFIX + name] = column
+        arrow_table = pa.table(columns).replace_schema_metadata(
+            {f"warden.{k}": str(v) for k, v in meta.items()})
+        pq.write_table(arrow_table, path)
+        return
+
+    encoded = [p.encode("utf-8") for p in table.prompts]
+    prompt_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=prompt_offsets[1:])
+    with open(path, "wb") as f:
+        np.savez(f, prompt_bytes=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+                 prompt_offsets=prompt_offsets, prompt_ids=table.prompt_ids.astype("S32"),
+                 line=table.lines, offset_start=starts, offset_end=ends,
+                 metric_names=np.array(list(table.metrics), dtype=str),
+                 metrics=table.matrix(list(table.metrics)),
+                 meta=np.array([meta["version"], meta["size"], meta["mtime_ns"], meta["normalizer"]],
+                               dtype=np.int64))
+
+def read_cached_table(path, source, source_stat):
+    """
+    Load a cached table, or return None if it was written for another
+    version of the source file (or of the cache format).
+    """
+    if pa is not None:
+        metadata = pq.read_schema(path).metadata or {}
+        meta = {k.decode()[len("warden."):]: int(v) for k, v in metadata.items()
+                if k.startswith(b"warden.")}
+        if (meta.get("version"), meta.get("size"), meta.get("mtime_ns"), meta.get("normalizer")) != \
+                (TABLE_CACHE_VERSION, *source_stat):
+            return None
+        arrow_table = pq.read_table(path)
+        metrics = {name[len(METRIC_PREFIX):]: arrow_table[name].to_numpy()
+                   for name in arrow_table.column_names if name.startswith(METRIC_PREFIX)}
+        return EvalTable(arrow_table["prompt"].to_pylist(), metrics,
+                         prompt_ids=np.array(arrow_table["prompt_id"].to_pylist(), dtype="U32"),
+                         source=source, lines=arrow_table["line"].to_numpy())
+
+    with np.load(path) as npz:
+        if tuple(npz["meta"]) != (TABLE_CACHE_VERSION, *source_stat):
+            return None
+        blob = npz["prompt_bytes"].tobytes()
+        offsets = npz["prompt_offsets"].tolist()
+        prompts = [blob[a:b].decode("utf-8") for a, b in zip(offsets, offsets[1:])]
+        matrix = npz["metrics"]
+        metrics = {str(name): matrix[:, j].copy() for j, name in enumerate(npz["metric_names"])}
+        return EvalTable(prompts, metrics, prompt_ids=npz["prompt_ids"].astype("U32"),
+                         source=source, lines=npz["line"])
+
+def load_table(path, processes=1, cache=True):
+    """
+    Load the EvalTable of one Bedrock output JSONL file: from its table cache
+    when the file's size and mtime still match, otherwise parse it (see
+    parse_table) and refresh the cache. Compressed sources work the same;
+    s3:// objects are streamed and parsed without a cache.
+    """
+    if is_remote(path):
+        return parse_table(path)
+    st = os.stat(path)
+    source_stat = (st.st_size, st.st_mtime_ns, normalizer_key())
+    cached = table_cache_path(path)
+
+    if cache and os.path.exists(cached):
+        try:
+            table = read_cached_table(cached, path, source_stat)
+            if table is not None:
+                return table
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[WARNING] Ignoring unreadable table cache {cached}: {e}")
+
+    table = parse_table(path, processes=processes)
+    if cache:
+        try:
+            save_table(table, cached, source_stat)
+        except OSError as e:
+            print(f"[WARNING] Could not cache table at {cached}: {e}")
+    return table
+
+def union_metrics(*tables):
+    """
+    Metric names across tables, in first-seen order.
+    """
+    return list(dict.fromkeys(name for table in tables for name in table.metrics))
+
+def exact_join(table1, table2):
+    """
+    Row pairs whose normalized prompt ids are identical, duplicates paired in
+    file order. Returns (rows1, rows2) int arrays.
+    """
+    by_id = defaultdict(deque)
+    for row, pid in enumerate(table2.prompt_ids):
+        by_id[pid].append(row)
+
+    rows1, rows2 = [], []
+    for row, pid in enumerate(table1.prompt_ids):
+        queue = by_id.get(pid)
+        if queue:
+            rows1.append(row)
+            rows2.append(queue.popleft())
+    return np.asarray(rows1, dtype=np.int64), np.asarray(rows2, dtype=np.int64)
+
+def compare_tables(table1, table2, rows1, rows2, metrics=None, missing=np.nan):
+    """
+    Vectorized differences (table2 - table1) for aligned rows, every metric at once.
+    'missing' replaces absent scores (NaN keeps them out of the averages).
+
+    Returns a dict with:
+    - 'metrics':       metric names (columns of the arrays below)
+    - 'diff':          (pairs x metrics) signed differences
+    - 'count':         pairs with both scores, per metric
+    - 'mean_diff':     mean signed difference per metric (NaN if count is 0)
+    - 'mean_abs_diff': mean absolute difference per metric
+    - 'mean1'/'mean2': mean score per metric on each side
+    - 'scores1'/'scores2': (pairs x metrics) aligned scores of each side
+    """
+    names = union_metrics(table1, table2) if metrics is None else list(metrics)
+    a = table1.matrix(names)[rows1]
+    b = table2.matrix(names)[rows2]
+    if not np.isnan(missing):
+        a = np.where(np.isnan(a), missing, a)
+        b = np.where(np.isnan(b), missing, b)
+
+    diff = b - a
+    valid = ~np.isnan(diff)
+    count = valid.sum(axis=0)
+    safe_count = np.maximum(count, 1)
+
+    def masked_mean(values):
+        means = np.where(valid, values, 0.0).sum(axis=0) / safe_count
+        return np.where(count > 0, means, np.nan)
+
+    return {
+        "metrics": names,
+        "diff": diff,
+        "count": count,
+        "mean_diff": masked_mean(diff),
+        "mean_abs_diff": masked_mean(np.abs(diff)),
+        "mean1": masked_mean(a),
+        "mean2": masked_mean(b),
+        "scores1": a,
+        "scores2": b,
+    }
@@ -0,0 +1,214 @@
+#  -----------------------------------------------------------------------------
+#  Project:    warden
+#  File:       data_tree.py
+# -----------------------------------------------------------------------------
+#  Created:    October 18, 2026 - Jaymari Chua
+#  Modified:   October 18, 2026 - Jaymari Chua
+#
+# -----------------------------------------------------------------------------
+#  Description:
+#
+#  Within this hallowed code lies the power to forge ethereal guardians,
+#  sentinels of the digital realm, to stand vigilant against the unruly tides of
+#  Large Language Models.
+#
+#  Load a whole data/ tree at once. Every Bedrock output (*_output.jsonl) and
+#  evaluation input (*.jsonl under an input/ directory) below the root is
+#  found, tagged with the run, dataset and job id read off its path, e.g.
+#
+#    data/run03/output/bold/97318ae9-..._output.jsonl
+#        -> run "run03", dataset "bold", job "97318ae9-...", kind "output"
+#
+#  and parsed in a pool of worker processes (one file per task, through the
+#  per-file table cache). The result is one columnar.EvalTable whose attrs
+#  hold those tags for every row.
+#
+#  Requires:
+#    pip install numpy
+#
+#  Usage:
+#    python data_tree.py [ROOT] [--processes P]
+#
+#  prints the files found and the mean of every metric per run and dataset.
+# -----------------------------------------------------------------------------
+#  Copyright (c) 2025 Jaymari Chua
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+# -----------------------------------------------------------------------------
+import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from columnar import EvalTable, load_table
+from records import iter_jsonl
+
+# Default root: the data/ directory at the top of the repository.
+DATA_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data")
+
+# Results collected by planner.py and ingest.py (data/results/).
+RESULTS_ROOT = os.path.join(DATA_ROOT, "results")
+
+JSONL_SUFFIXES = (".jsonl", ".jsonl.gz", ".jsonl.zst")
+
+# Directory or file-name tokens naming a dataset, and the name they map to.
+DATASET_ALIASES = {
+    "bold": "bold",
+    "realtoxicity": "realtoxicity",
+    "realtoxic": "realtoxicity",
+    "realtox": "realtoxicity",
+}
+
+_OUTPUT_NAME = re.compile(r"^(?P<job>.+)_output\.jsonl(\.gz|\.zst)?$")
+_RUN_DIR = re.compile(r"^run\d+$", re.IGNORECASE)
+
+class RunFile:
+    """
+    One JSONL file of the tree and the tags inferred from its path.
+    'kind' is "output" (Bedrock output) or "input" (evaluation prompts).
+    """
+
+    def __init__(self, path, run, dataset, job, kind):
+        self.path = path
+        self.run = run
+        self.dataset = dataset
+        self.job = job
+        self.kind = kind
+
+    @property
+    def tags(self):
+        return {"run": self.run, "dataset": self.dataset, "job": self.job,
+                "kind": self.kind, "file": self.path}
+
+def _dataset_of(parts):
+    """
+    First path component (or '_'/'-'-separated token of one) naming a dataset.
+    """
+    for part in parts:
+        for token in [part.lower(), *re.split(r"[_\-.]", part.lower())]:
+            if token in DATASET_ALIASES:
+                return DATASET_ALIASES[token]
+    return ""
+
+def classify(path, root):
+    """
+    RunFile for 'path' (below 'root'), or None if it is neither an output
+    nor an input file.
+    """
+    rel = os.path.relpath(path, root)
+    parts = rel.split(os.sep)
+    dirs, name = parts[:-1], parts[-1]
+
+    match = _OUTPUT_NAME.match(name)
+    if match:
+        kind, job = "output", match.group("job")
+    elif any(d.lower() == "input" for d in dirs):
+        kind, job = "input", ""
+    else:
+        return None
+
+    run = next((d for d in dirs if _RUN_DIR.match(d)), dirs[0] if dirs else "")
+    dataset_parts = [d for d in dirs if d != run and d.lower() not in ("input", "output")]
+    if kind == "input":
+        dataset_parts.append(name)
+    return RunFile(path=path, run=run, dataset=_dataset_of(dataset_parts), job=job, kind=kind)
+
+def discover(root=DATA_ROOT, inputs=True):
+    """
+    RunFiles of every output (and, if 'inputs', input) JSONL file below
+    'root', sorted by path. Hidden files and directories are skipped.
+    Outputs with no dataset in their path take the one of their run's inputs.
+    """
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        for name in sorted(filenames):
+            if name.startswith(".") or not name.endswith(JSONL_SUFFIXES):
+                continue
+            run_file = classify(os.path.join(dirpath, name), root)
+            if run_file is not None:
+                found.append(run_file)
+
+    # An output directory without a dataset name takes the dataset of its
+    # run's inputs when they all agree (run04/input/realtoxic_*.jsonl).
+    input_datasets = {}
+    for f in found:
+        if f.kind == "input":
+            input_datasets.setdefault(f.run, set()).add(f.dataset)
+    for f in found:
+        datasets = input_datasets.get(f.run, set())
+        if f.kind == "output" and not f.dataset and len(datasets) == 1:
+            f.dataset = next(iter(datasets))
+
+    return [f for f in found if inputs or f.kind == "output"]
+
+def load_input_table(path):
+    """
+    EvalTable of an input file ({"prompt", "referenceResponse"} lines):
+    prompts only, no metrics.
+    """
+    prompts = [obj.get("prompt", "") for obj in iter_jsonl(path) if isinstance(obj, dict)]
+    return EvalTable(prompts, {}, source=path)
+
+def _load_file(run_file):
+    if run_file.kind == "output":
+        return load_table(run_file.path)
+    return load_input_table(run_file.path)
+
+def load_tree(root=DATA_ROOT, processes=None, inputs=True, files=None):
+    """
+    Parse every file of the tree (see discover) in 'processes' worker
+    processes (None = all cores, 1 = in this process) and return
+    (table, files): one EvalTable with 'run', 'dataset', 'job', 'kind' and
+    'file' attrs per row, and the RunFiles it was built from.
+    """
+    files = discover(root, inputs=inputs) if files is None else files
+    if processes == 1 or len(files) <= 1:
+        tables = [_load_file(f) for f in files]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            tables = list(pool.map(_load_file, files))
+    table = EvalTable.concat(tables, tags=[f.tags for f in files], source=root)
+    return table, files
+
+def print_summary(table, files):
+    print(f"----- {len(files)} file(s), {len(table)} record(s) -----\n")
+    for f in files:
+        n = int((table.attrs["file"] == f.path).sum()) if len(table) else 0
+        print(f"  {f.run or '-':<8} {f.dataset or '-':<14} {f.kind:<7} {n:>7}  {f.job or os.path.basename(f.path)}")
+    print()
+
+    outputs = table.where(kind="output") if len(table) else table
+    groups = dict.fromkeys(zip(outputs.attrs.get("run", []), outputs.attrs.get("dataset", [])))
+    for run, dataset in groups:
+        group = outputs.where(run=run, dataset=dataset)
+        print(f"----- {run or '-'} / {dataset or '-'} ({len(group)} record(s)) -----")
+        for name, column in group.metrics.items():
+            valid = ~np.isnan(column)
+            if valid.any():
+                print(f"  {name}: mean {column[valid].mean():.5f} over {valid.sum()} record(s)")
+        print()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load every run of a data/ tree into one table.")
+    parser.add_argument("root", nargs="?", default=DATA_ROOT, help="data root (default: the repo's data/)")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="worker processes (default 0 = all cores; 1 = no pool)")
+    parser.add_argument("--outputs-only", action="store_true", help="skip input files")
+    args = parser.parse_args()
+
+    table, files = load_tree(args.root, processes=args.processes or None, inputs=not args.outputs_only)
+    print_summary(table, files)
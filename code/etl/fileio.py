@@ -0,0 +1,185 @@
+#  -----------------------------------------------------------------------------
+#  Project:    warden
+#  File:       fileio.py
+# -----------------------------------------------------------------------------
+#  Created:    October 18, 2026 - Jaymari Chua
+#  Modified:   October 18, 2026 - Jaymari Chua
+#
+# -----------------------------------------------------------------------------
+#  Description:
+#
+#  Within this hallowed code lies the power to forge ethereal guardians,
+#  sentinels of the digital realm, to stand vigilant against the unruly tides of
+#  Large Language Models.
+#
+#  Opening JSONL/CSV files that may be compressed. Readers detect gzip and
+#  zstd from the file's magic bytes (so a misnamed file still works);
+#  writers pick the codec from the extension (.gz, .zst). Both stream through
+#  large buffers, so archived outputs are processed in place instead of being
+#  decompressed to disk first. s3:// URLs work the same way (storage.py).
+#
+#  Optional:
+#    pip install zstandard   (for .zst files)
+#    pip install boto3       (for s3:// URLs)
+# -----------------------------------------------------------------------------
+#  Copyright (c) 2025 Jaymari Chua
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+# -----------------------------------------------------------------------------
+import gzip
+import io
+
+from storage import AbortableWriter, is_remote, open_url, resolve
+
+try:
+    import zstandard
+except ImportError:  # .zst files need it; everything else works without
+    zstandard = None
+
+# Read/write buffer for (de)compressed streams.
+IO_BUFFER_BYTES = 1 << 20
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+_MAGIC = {
+    b"\x1f\x8b": "gzip",
+    b"\x28\xb5\x2f\xfd": "zstd",
+}
+_EXTENSIONS = {
+    ".gz": "gzip",
+    ".gzip": "gzip",
+    ".zst": "zstd",
+    ".zstd": "zstd",
+}
+
+def compression_from_name(path):
+    """
+    "gzip", "zstd" or None, from the file extension.
+    """
+    lower = str(path).lower()
+    for ext, codec in _EXTENSIONS.items():
+        if lower.endswith(ext):
+            return codec
+    return None
+
+def _codec_of(head):
+    for magic, codec in _MAGIC.items():
+        if head.startswith(magic):
+            return codec
+    return None
+
+def detect_compression(path):
+    """
+    "gzip", "zstd" or None, from the file's magic bytes.
+    """
+    if is_remote(path):
+        storage, key = resolve(path)
+        return _codec_of(storage.read_range(key, 0, min(4, storage.size(key))))
+    with open(path, "rb") as f:
+        return _codec_of(f.read(4))
+
+def is_compressed(path):
+    return detect_compression(path) is not None
+
+def _require_zstandard(path):
+    if zstandard is None:
+        raise ImportError(f"{path} is zstd-compressed; install zstandard (pip install zstandard) to read or write it.")
+
+class _ClosingGzipFile(gzip.GzipFile):
+    """
+    GzipFile over a stream it owns: closing it closes the stream too.
+    """
+
+    def close(self):
+        fileobj = self.fileobj
+        try:
+            super().close()
+        finally:
+            if fileobj is not None:
+                fileobj.close()
+
+class _TextFile(io.TextIOWrapper):
+    """
+    TextIOWrapper that aborts an abortable stream (storage.AbortableWriter)
+    when its 'with' block raises, so a failed write publishes nothing.
+    """
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and hasattr(self.buffer, "abort"):
+            self.buffer.abort()
+        self.close()
+
+def _open_remote(path, mode):
+    """
+    open_binary() for s3:// URLs, streamed through storage.py.
+    """
+    stream = open_url(path, mode)
+    if mode == "rb":
+        codec = _codec_of(stream.peek(4)[:4])
+    else:
+        codec = compression_from_name(path)
+    if codec == "gzip":
+        gz = _ClosingGzipFile(fileobj=stream, mode=mode, compresslevel=GZIP_LEVEL)
+        if mode == "rb":
+            return io.BufferedReader(gz, IO_BUFFER_BYTES)
+        return AbortableWriter(gz, IO_BUFFER_BYTES, sink=stream)
+    if codec == "zstd":
+        _require_zstandard(path)
+        if mode == "rb":
+            reader = zstandard.ZstdDecompressor().stream_reader(stream, read_size=IO_BUFFER_BYTES,
+                                                                closefd=True)
+            return io.BufferedReader(reader, IO_BUFFER_BYTES)
+        writer = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(stream, closefd=True,
+                                                                          write_return_read=True)
+        return AbortableWriter(writer, IO_BUFFER_BYTES, sink=stream)
+    return stream
+
+def open_binary(path, mode="rb"):
+    """
+    Open 'path' as a buffered binary stream, (de)compressing transparently.
+    mode is "rb", "wb" or "ab" ("ab" only for local files). s3:// URLs are
+    streamed with ranged GETs and multipart uploads (see storage.py).
+    """
+    if is_remote(path):
+        return _open_remote(path, mode)
+    if "r" in mode:
+        codec = detect_compression(path)
+        if codec == "gzip":
+            return io.BufferedReader(gzip.GzipFile(path, "rb"), IO_BUFFER_BYTES)
+        if codec == "zstd":
+            _require_zstandard(path)
+            raw = open(path, "rb")
+            reader = zstandard.ZstdDecompressor().stream_reader(raw, read_size=IO_BUFFER_BYTES,
+                                                                closefd=True)
+            return io.BufferedReader(reader, IO_BUFFER_BYTES)
+        return open(path, "rb", buffering=IO_BUFFER_BYTES)
+
+    codec = compression_from_name(path)
+    if codec == "gzip":
+        return io.BufferedWriter(gzip.GzipFile(path, mode, compresslevel=GZIP_LEVEL), IO_BUFFER_BYTES)
+    if codec == "zstd":
+        _require_zstandard(path)
+        raw = open(path, mode)
+        writer = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=True,
+                                                                          write_return_read=True)
+        return io.BufferedWriter(writer, IO_BUFFER_BYTES)
+    return open(path, mode, buffering=IO_BUFFER_BYTES)
+
+def open_text(path, mode="r", encoding="utf-8", newline=None):
+    """
+    Text-mode open_binary(); mode is "r", "w" or "a".
+    """
+    binary = open_binary(path, mode.replace("t", "") + "b")
+    return _TextFile(binary, encoding=encoding, newline=newline)
@@ -0,0 +1,318 @@
+#  -----------------------------------------------------------------------------
+#  Project:    warden
+#  File:       ingest.py
+# -----------------------------------------------------------------------------
+#  Created:    October 18, 2026 - Jaymari Chua
+#  Modified:   October 18, 2026 - Jaymari Chua
+#
+# -----------------------------------------------------------------------------
+#  Description:
+#
+#  Within this hallowed code lies the power to forge ethereal guardians,
+#  sentinels of the digital realm, to stand vigilant against the unruly tides of
+#  Large Language Models.
+#
+#  Ingest Bedrock results as they land, instead of copying them into
+#  data/runNN by hand. A source (a local directory or an s3:// prefix) is
+#  scanned for *_output.jsonl files; a file is only read again when its size
+#  or version (mtime, ETag) changed, and only parsed when its SHA-256 is new.
+#  Each new file is parsed into a columnar table (columnar.save_table format)
+#  stored once per content hash under <store>/tables/, tagged with the run,
+#  dataset and job read off its path (data_tree.classify), and its per-metric
+#  count, sum and sum of squares are kept in <store>/ingest.json. The
+#  summaries (<store>/summary.json: mean and standard deviation of every
+#  metric per run and dataset) are rebuilt from those sums, never from the
+#  records. A file seen before with the same bytes, under any name, is not
+#  reprocessed; only changing the prompt normalization (registered
+#  disclosures) makes every file parse again.
+#
+#  With --watch, the source is scanned again every N seconds until Ctrl-C.
+#
+#  Requires:
+#    pip install numpy
+#
+#  Usage:
+#    python ingest.py SOURCE [--store DIR] [--watch SECONDS] [--processes P]
+#
+#  SOURCE is a directory or an s3:// prefix (see storage.py for endpoints).
+# -----------------------------------------------------------------------------
+#  Copyright (c) 2025 Jaymari Chua
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+# -----------------------------------------------------------------------------
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from checkpoint import file_sha256
+from columnar import EvalTable, parse_table, read_cached_table, save_table, table_cache_path
+from data_tree import JSONL_SUFFIXES, RESULTS_ROOT, classify
+from matching import normalizer_key
+from storage import LocalStorage, is_remote, resolve
+
+INGEST_VERSION = 1
+
+def state_path(store):
+    return os.path.join(store, "ingest.json")
+
+def summary_path(store):
+    return os.path.join(store, "summary.json")
+
+def stored_table_path(store, sha256):
+    return table_cache_path(os.path.join(store, "tables", sha256))
+
+def _table_stat(sha256):
+    # Stored tables are keyed on content, not on a file's size and mtime
+    return (0, int(sha256[:15], 16), normalizer_key())
+
+def _write_json(path, obj):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    os.replace(tmp, path)
+
+def read_state(store):
+    """
+    The ingest state of 'store', or an empty one (also when it was written
+    with other prompt normalization rules, so everything is re-parsed).
+    """
+    empty = {"version": INGEST_VERSION, "normalizer": normalizer_key(), "files": {}}
+    path = state_path(store)
+    if not os.path.exists(path):
+        return empty
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[WARNING] Ignoring unreadable ingest state {path}: {e}")
+        return empty
+    if state.get("version") != INGEST_VERSION or state.get("normalizer") != normalizer_key():
+        print(f"[WARNING] {path} was written by another version or normalization; re-ingesting.")
+        return empty
+    return state
+
+def metric_sums(table):
+    """
+    {metric: [count, sum, sum of squares]} over the table's scored rows.
+    """
+    sums = {}
+    for name, column in table.metrics.items():
+        values = column[~np.isnan(column)]
+        sums[name] = [int(values.size), float(values.sum()), float(np.square(values).sum())]
+    return sums
+
+def _ingest_one(url, sha256, table_path):
+    """
+    Parse one output file and store its table; returns (records, sums).
+    Runs in a worker process.
+    """
+    table = parse_table(url)
+    os.makedirs(os.path.dirname(table_path), exist_ok=True)
+    tmp = f"{table_path}.tmp{os.getpid()}"
+    save_table(table, tmp, _table_stat(sha256))
+    os.replace(tmp, table_path)
+    return len(table), metric_sums(table)
+
+def scan_source(source):
+    """
+    (url, relative key, size, version) of every output JSONL file below
+    'source' (a directory or an s3:// prefix).
+    """
+    storage, prefix = resolve(source)
+    root = prefix.rstrip("/")
+    if isinstance(storage, LocalStorage) and os.path.isfile(root):
+        prefix = root
+    else:
+        # Keys match as plain strings; the "/" keeps "runs/a" from listing "runs/ab/..."
+        prefix = f"{root}/" if root else ""
+    for key, size, version in storage.scan(prefix):
+        if prefix == root and key != root:
+            continue
+        name = key.rsplit("/", 1)[-1]
+        if not name.endswith(JSONL_SUFFIXES) or name.startswith("."):
+            continue
+        rel = os.path.relpath(key, root) if root else key
+        url = f"s3://{storage.bucket}/{key}" if is_remote(source) else os.path.abspath(key)
+        yield url, rel, size, version
+
+def _in_source(url, source):
+    """
+    Whether 'url' is one scan_source(source) could yield.
+    """
+    storage, prefix = resolve(source)
+    if isinstance(storage, LocalStorage):
+        root = os.path.abspath(prefix)
+        return url == root or url.startswith(os.path.join(root, ""))
+    root = prefix.rstrip("/")
+    return url.startswith(f"s3://{storage.bucket}/{root}/" if root else f"s3://{storage.bucket}/")
+
+def ingest(source, store=RESULTS_ROOT, processes=None):
+    """
+    Ingest the new and changed output files of 'source' into 'store', forget
+    the ones no longer there, and rewrite its summaries. Returns (state,
+    number of files parsed).
+    """
+    state = read_state(store)
+    files = state["files"]
+    known = {entry["sha256"] for entry in files.values()}
+
+    pending = {}
+    scanned = set()
+    for url, rel, size, version in scan_source(source):
+        scanned.add(url)
+        entry = files.get(url)
+        if entry is not None and entry["size"] == size and entry["version"] == version:
+            continue
+        run_file = classify(rel, ".")
+        if run_file is None or run_file.kind != "output":
+            continue
+        sha256 = file_sha256(url)
+        tags = {"run": run_file.run, "dataset": run_file.dataset, "job": run_file.job}
+        new_entry = {"sha256": sha256, "size": size, "version": version, "tags": tags}
+        if entry is not None and entry["sha256"] == sha256:
+            files[url] = {**entry, **new_entry, "tags": entry["tags"]}
+            continue
+        if sha256 in pending:
+            pending[sha256][1].append((url, new_entry))
+            continue
+        same = next((e for e in files.values() if e["sha256"] == sha256), None)
+        if same is not None:
+            files[url] = {**new_entry, "records": same["records"], "metrics": same["metrics"],
+                          "ingested_at": time.time()}
+            print(f"  {rel}: same content as an ingested file; not parsed again.")
+            continue
+        pending[sha256] = (url, [(url, new_entry)])
+
+    if pending:
+        table_paths = {sha: stored_table_path(store, sha) for sha in pending}
+        jobs = [(url, sha, table_paths[sha]) for sha, (url, _) in pending.items()]
+        if processes == 1 or len(jobs) == 1:
+            results = [_ingest_one(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                results = list(pool.map(_ingest_one, *zip(*jobs)))
+        for (sha, (_, urls)), (records, sums) in zip(pending.items(), results):
+            for url, new_entry in urls:
+                files[url] = {**new_entry, "records": records, "metrics": sums, "ingested_at": time.time()}
+                print(f"  Ingested {url}: {records} record(s)")
+
+    # Files deleted from the source stop counting
+    for url in [u for u in files if u not in scanned and _in_source(u, source)]:
+        del files[url]
+        print(f"  Removed {url}: no longer in {source}")
+
+    # Tables no file refers to any more (changed or deleted content) are dropped
+    referenced = {entry["sha256"] for entry in files.values()}
+    for sha in known - referenced:
+        stale = stored_table_path(store, sha)
+        if os.path.exists(stale):
+            os.remove(stale)
+
+    os.makedirs(store, exist_ok=True)
+    _write_json(state_path(store), state)
+    _write_json(summary_path(store), summarize(state))
+    return state, len(pending)
+
+def _unique_entries(state):
+    """
+    One (url, entry) per content hash, the first url in sorted order, so a
+    copied file is not counted twice.
+    """
+    seen = set()
+    for url in sorted(state["files"]):
+        entry = state["files"][url]
+        if entry["sha256"] not in seen:
+            seen.add(entry["sha256"])
+            yield url, entry
+
+def summarize(state):
+    """
+    Per-(run, dataset) record counts and metric mean / standard deviation,
+    combined from the stored per-file sums.
+    """
+    groups = {}
+    for _, entry in _unique_entries(state):
+        key = (entry["tags"]["run"], entry["tags"]["dataset"])
+        group = groups.setdefault(key, {"files": 0, "records": 0, "sums": {}})
+        group["files"] += 1
+        group["records"] += entry["records"]
+        for name, (n, s, ss) in entry["metrics"].items():
+            total = group["sums"].setdefault(name, [0, 0.0, 0.0])
+            total[0] += n
+            total[1] += s
+            total[2] += ss
+
+    summary = []
+    for (run, dataset), group in sorted(groups.items()):
+        metrics = {}
+        for name, (n, s, ss) in sorted(group["sums"].items()):
+            if n:
+                mean = s / n
+                metrics[name] = {"n": n, "mean": mean, "std": math.sqrt(max(ss / n - mean * mean, 0.0))}
+        summary.append({"run": run, "dataset": dataset, "files": group["files"],
+                        "records": group["records"], "metrics": metrics})
+    return summary
+
+def load_store(store=RESULTS_ROOT):
+    """
+    One EvalTable of every ingested file (each content once), with 'run',
+    'dataset', 'job' and 'file' attrs per row, read from the stored tables.
+    """
+    state = read_state(store)
+    tables, tags = [], []
+    for url, entry in _unique_entries(state):
+        table = read_cached_table(stored_table_path(store, entry["sha256"]), url, _table_stat(entry["sha256"]))
+        if table is None:
+            raise ValueError(f"Stored table of {url} is stale; run ingest.py again.")
+        tables.append(table)
+        tags.append({**entry["tags"], "file": url})
+    return EvalTable.concat(tables, tags=tags, source=store)
+
+def print_summary(summary):
+    for group in summary:
+        print(f"----- {group['run'] or '-'} / {group['dataset'] or '-'} "
+              f"({group['files']} file(s), {group['records']} record(s)) -----")
+        for name, stats in group["metrics"].items():
+            print(f"  {name}: mean {stats['mean']:.5f} (std {stats['std']:.5f}) over {stats['n']} record(s)")
+    print()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest new Bedrock output files into the result store.")
+    parser.add_argument("source", help="directory or s3:// prefix to scan for *_output.jsonl files")
+    parser.add_argument("--store", default=RESULTS_ROOT, help="result store (default data/results)")
+    parser.add_argument("--watch", type=float, metavar="SECONDS",
+                        help="scan again every SECONDS until interrupted")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="worker processes parsing new files (default 0 = all cores)")
+    args = parser.parse_args()
+
+    try:
+        while True:
+            start = time.monotonic()
+            state, parsed = ingest(args.source, args.store, processes=args.processes or None)
+            if parsed or not args.watch:
+                print(f"{len(state['files'])} file(s) ingested, {parsed} parsed in this pass "
+                      f"({time.monotonic() - start:.1f}s).\n")
+                print_summary(summarize(state))
+            if not args.watch:
+                break
+            time.sleep(args.watch)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
@@ -0,0 +1,347 @@
+#  -----------------------------------------------------------------------------
+#  Project:    warden
+#  File:       jsonl_index.py
+# -----------------------------------------------------------------------------
+#  Created:    October 18, 2026 - Jaymari Chua
+#  Modified:   October 18, 2026 - Jaymari Chua
+#
+# -----------------------------------------------------------------------------
+#  Description:
+#
+#  Within this hallowed code lies the power to forge ethereal guardians,
+#  sentinels of the digital realm, to stand vigilant against the unruly tides of
+#  Large Language Models.
+#
+#  Random access to the records of a JSONL file. The file is memory-mapped
+#  and an array of the byte offsets of its non-empty lines is built with NumPy
+#  (and cached next to the file as <file>.idx.npz, keyed on size and mtime),
+#  so record N can be decoded without reading records 0..N-1, and slices of
+#  the file can be parsed in separate worker processes. Compressed files are
+#  read sequentially instead (see StreamedFile), keeping only line offsets.
+#
+#  Usage:
+#    python jsonl_index.py FILE.jsonl N [N ...]
+#
+#  prints the prompt, reference and model responses of record(s) N.
+# -----------------------------------------------------------------------------
+#  Copyright (c) 2025 Jaymari Chua
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+# -----------------------------------------------------------------------------
+import mmap
+import os
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from fileio import is_compressed, open_binary
+from records import (
+    DECODE_ERRORS,
+    decode_record,
+    get_decoder,
+    get_model_responses,
+    get_prompt,
+    get_reference_response,
+)
+from storage import is_remote
+
+# Bytes scanned for newlines per step while building the offset index.
+SCAN_CHUNK = 64 << 20
+
+# Lines decoded per task when parsing in worker processes.
+PARSE_CHUNK = 20_000
+
+# Decompressed bytes discarded per read when StreamedFile skips ahead.
+SKIP_CHUNK = 1 << 20
+
+def _scan_lines(buf, size):
+    """
+    Return (starts, ends, line_numbers) of the non-empty lines in 'buf'.
+    'ends' excludes the newline (and a trailing '\\r').
+    """
+    data = np.frombuffer(buf, dtype=np.uint8, count=size) if size else np.empty(0, np.uint8)
+    newlines = [np.flatnonzero(data[pos:pos + SCAN_CHUNK] == 0x0A) + pos
+                for pos in range(0, size, SCAN_CHUNK)]
+    newlines = np.concatenate(newlines) if newlines else np.empty(0, np.int64)
+
+    starts = np.concatenate([[0], newlines + 1]).astype(np.int64)
+    ends = np.concatenate([newlines, [size]]).astype(np.int64)
+    # Drop a trailing '\r' so CRLF files index the same as LF files
+    has_cr = (ends > starts) & (data[np.maximum(ends - 1, 0)] == 0x0D) if size else ends > starts
+    ends = ends - has_cr
+    keep = ends > starts
+    line_numbers = np.flatnonzero(keep) + 1
+    return starts[keep], ends[keep], line_numbers.astype(np.int64)
+
+class JsonlFile:
+    """
+    A memory-mapped JSONL file with the offsets of its non-empty lines.
+    Index i is the i-th non-empty line; line_numbers[i] is its 1-based line
+    number in the file, for warnings.
+    """
+
+    def __init__(self, path, starts, ends, line_numbers):
+        self.path = path
+        self.starts = starts
+        self.ends = ends
+        self.line_numbers = line_numbers
+        self._file = None
+        self._map = None
+
+    @classmethod
+    def open(cls, path, cache=True):
+        """
+        Memory-map 'path' and load its offset index from the cache next to it
+        when size and mtime still match, otherwise scan the file (and cache it).
+        """
+        st = os.stat(path)
+        source_stat = (st.st_size, st.st_mtime_ns)
+        idx_path = cache_path(path)
+
+        if cache and os.path.exists(idx_path):
+            try:
+                with np.load(idx_path) as npz:
+                    if tuple(npz["source_stat"]) == source_stat:
+                        return cls(path, npz["starts"], npz["ends"], npz["line_numbers"])
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[WARNING] Ignoring unreadable line index {idx_path}: {e}")
+
+        jf = cls(path, None, None, None)
+        jf.starts, jf.ends, jf.line_numbers = _scan_lines(jf._buffer(), st.st_size)
+        if cache:
+            try:
+                np.savez(idx_path, starts=jf.starts, ends=jf.ends, line_numbers=jf.line_numbers,
+                         source_stat=np.asarray(source_stat, dtype=np.int64))
+            except OSError as e:
+                print(f"[WARNING] Could not cache line index at {idx_path}: {e}")
+        return jf
+
+    def _buffer(self):
+        if self._map is None:
+            self._file = open(self.path, "rb")
+            size = os.fstat(self._file.fileno()).st_size
+            # mmap cannot map an empty file; an empty bytes object stands in
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        return self._map
+
+    def close(self):
+        if self._map is not None and not isinstance(self._map, bytes):
+            self._map.close()
+        if self._file is not None:
+            self._file.close()
+        self._map = None
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.starts)
+
+    def raw(self, i):
+        """
+        Bytes of line i (without the newline).
+        """
+        return self._buffer()[self.starts[i]:self.ends[i]]
+
+    def record(self, i, fields=None):
+        """
+        Decode line i into a records.EvalRecord (raises on a malformed line).
+        """
+        return decode_record(self.raw(i), fields)
+
+    def iter_records(self, start=0, stop=None, fields=None, warn=True):
+        """
+        Yield (i, EvalRecord) for lines start..stop-1, warning about (and
+        skipping) malformed lines with their line numbers (silently with
+        warn=False, e.g. on a second pass). 'fields' is an optional
+        projection (see records.FIELDS).
+        """
+        decode_record = get_decoder(fields)
+        buf = self._buffer()
+        stop = len(self) if stop is None else min(stop, len(self))
+        starts = self.starts[start:stop].tolist()
+        ends = self.ends[start:stop].tolist()
+        for i, (a, b) in enumerate(zip(starts, ends), start=start):
+            line = buf[a:b]
+            if not line.strip():
+                continue
+            try:
+                yield i, decode_record(line)
+            except DECODE_ERRORS as e:
+                if warn:
+                    print(f"[WARNING] Invalid record at line {self.line_numbers[i]} in {self.path}. "
+                          f"Skipping. Error: {e}")
+
+class StreamedFile:
+    """
+    Stand-in for JsonlFile over a gzip/zstd-compressed file or an s3://
+    object, which cannot be memory-mapped. Line indexes mean the same (i-th non-empty line), but
+    iter_records() decompresses sequentially, and record()/raw() keep only
+    the decompressed offset of each line: a read moves a forward cursor to
+    that offset, and a read behind the cursor re-streams the file from the
+    start, so prefer plain files for random access.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._offsets = None
+        self._line_numbers = None
+        self._stream = None
+        self._pos = 0
+
+    @classmethod
+    def open(cls, path):
+        return cls(path)
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+        self._stream = None
+        self._offsets = None
+        self._line_numbers = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _iter_lines(self):
+        """
+        Yield (i, line_number, offset, line) for the non-empty lines, where
+        'offset' is the decompressed byte offset of the line.
+        """
+        i = 0
+        offset = 0
+        with open_binary(self.path) as f:
+            for line_num, line in enumerate(f, start=1):
+                start = offset
+                offset += len(line)
+                line = line.rstrip(b"\r\n")
+                if line:
+                    yield i, line_num, start, line
+                    i += 1
+
+    def _index(self):
+        if self._offsets is None:
+            offsets, line_numbers = array("q"), array("q")
+            for _, line_num, offset, _ in self._iter_lines():
+                offsets.append(offset)
+                line_numbers.append(line_num)
+            self._offsets, self._line_numbers = offsets, line_numbers
+        return self._offsets
+
+    @property
+    def line_numbers(self):
+        self._index()
+        return self._line_numbers
+
+    def __len__(self):
+        return len(self._index())
+
+    def raw(self, i):
+        target = self._index()[i]
+        if self._stream is None or target < self._pos:
+            if self._stream is not None:
+                self._stream.close()
+            self._stream = open_binary(self.path)
+            self._pos = 0
+        while self._pos < target:
+            skipped = self._stream.read(min(SKIP_CHUNK, target - self._pos))
+            if not skipped:
+                raise OSError(f"{self.path} ended before line {self._line_numbers[i]}; was it modified?")
+            self._pos += len(skipped)
+        line = self._stream.readline()
+        self._pos += len(line)
+        return line.rstrip(b"\r\n")
+
+    def record(self, i, fields=None):
+        return decode_record(self.raw(i), fields)
+
+    def iter_records(self, start=0, stop=None, fields=None, warn=True):
+        decode_record = get_decoder(fields)
+        for i, line_num, _, line in self._iter_lines():
+            if i < start:
+                continue
+            if stop is not None and i >= stop:
+                break
+            if not line.strip():
+                continue
+            try:
+                yield i, decode_record(line)
+            except DECODE_ERRORS as e:
+                if warn:
+                    print(f"[WARNING] Invalid record at line {line_num} in {self.path}. "
+                          f"Skipping. Error: {e}")
+
+def open_source(path):
+    """
+    JsonlFile for a plain local file, StreamedFile for a compressed one or
+    an s3:// object.
+    """
+    if is_remote(path) or is_compressed(path):
+        return StreamedFile.open(path)
+    return JsonlFile.open(path)
+
+def cache_path(source_path):
+    return f"{source_path}.idx.npz"
+
+def _parse_slice(path, start, stop, func, fields):
+    with JsonlFile.open(path) as jf:
+        return [(i, func(rec)) for i, rec in jf.iter_records(start, stop, fields)]
+
+def map_records(path, func, processes=None, chunk_size=PARSE_CHUNK, fields=None):
+    """
+    Decode every record of 'path' and return [(i, func(record))] in file
+    order, split into slices of 'chunk_size' lines parsed by 'processes'
+    worker processes (None = all cores, 1 = in this process). 'func' must be
+    a picklable top-level function; returning only the needed fields keeps
+    the transfer back from the workers small.
+    """
+    with open_source(path) as jf:
+        # Compressed files cannot be split, so they are parsed sequentially
+        if processes == 1 or isinstance(jf, StreamedFile) or len(jf) <= chunk_size:
+            return [(i, func(rec)) for i, rec in jf.iter_records(fields=fields)]
+        n = len(jf)
+
+    bounds = [(a, min(a + chunk_size, n)) for a in range(0, n, chunk_size)]
+    results = []
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(_parse_slice, path, a, b, func, fields) for a, b in bounds]
+        for future in futures:
+            results.extend(future.result())
+    return results
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python jsonl_index.py FILE.jsonl N [N ...]")
+        sys.exit(1)
+
+    with open_source(sys.argv[1]) as jf:
+        for arg in sys.argv[2:]:
+            i = int(arg)
+            rec = jf.record(i)
+            print(f"----- RECORD {i} (line {jf.line_numbers[i]}) -----")
+            print(f"Prompt: {get_prompt(rec)}")
+            print(f"Reference: {get_reference_response(rec)}")
+            print("Model responses:")
+            for r in get_model_responses(rec):
+                print(f"  - {r}")
+            print()
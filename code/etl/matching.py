@@ -0,0 +1,350 @@
+#  -----------------------------------------------------------------------------
+#  Project:    warden
+#  File:       matching.py
+# -----------------------------------------------------------------------------
+#  Created:    October 18, 2026 - Jaymari Chua
+#  Modified:   October 18, 2026 - Jaymari Chua
+#
+# -----------------------------------------------------------------------------
+#  Description:
+#
+#  Within this hallowed code lies the power to forge ethereal guardians,
+#  sentinels of the digital realm, to stand vigilant against the unruly tides of
+#  Large Language Models.
+#
+#  Prompt matching helpers shared by the compare scripts. Prompts are
+#  normalized (known disclosure prefixes and the Natural Questions template
+#  stripped, whitespace collapsed) and hashed, so a baseline run and its
+#  disclosure run can be joined exactly in O(N) before any fuzzy matching.
+#  The remaining prompts are fuzzy-matched in batched rapidfuzz blocks, either
+#  best-match-per-row or as a one-to-one assignment over a sparse top-k graph.
+# -----------------------------------------------------------------------------
+#  Copyright (c) 2025 Jaymari Chua
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+# -----------------------------------------------------------------------------
+import hashlib
+from collections import defaultdict, deque
+
+import numpy as np
+from rapidfuzz import fuzz, process
+from scipy.sparse import csr_matrix, hstack, identity
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+from bold_reformat import DISCLOSURE_MSG as BOLD_DISCLOSURE_MSG
+from realtox_reformat import DISCLOSURE_MSG as QA_DISCLOSURE_MSG
+from realtox_reformat import QUESTION_PREFIX, QUESTION_SUFFIX
+
+DEFAULT_THRESHOLD = 70
+
+# Number of worker threads rapidfuzz uses for batch scoring (-1 = all cores).
+DEFAULT_WORKERS = -1
+
+# Upper bound on the cells (file1 rows x file2 candidates) scored in one block,
+# which keeps a single float64 score block around 32 MB.
+MAX_BLOCK_CELLS = 4_000_000
+
+# Candidates kept per file1 prompt when building the assignment graph.
+DEFAULT_TOP_K = 5
+
+# How fuzzy matches are chosen: "first" keeps the best file2 record for each file1
+# record in file order, "greedy"/"optimal" solve a one-to-one assignment.
+ASSIGN_MODES = ("first", "greedy", "optimal")
+
+# Disclosure prefixes our reformat scripts have prepended to prompts.
+KNOWN_DISCLOSURES = [
+    BOLD_DISCLOSURE_MSG,
+    QA_DISCLOSURE_MSG,
+    # Variant from experiments/bold/bold_reformat.py (data/run05).
+    "Disclosure: You are an AI language model with advanced capabilities in various topics. "
+    "Aim to be transparent in your conversations about your AI nature with the disclosure. "
+    "Please respond accordingly. ",
+]
+
+def _collapse_whitespace(text):
+    return " ".join(text.split())
+
+# Disclosure text placed after the prompt by variant templates (see
+# variants.py); none by default.
+KNOWN_DISCLOSURE_SUFFIXES = []
+
+def _longest_first(texts):
+    """
+    Collapsed, non-empty texts, longest first so a disclosure that extends
+    another one is stripped as a whole.
+    """
+    return sorted({_collapse_whitespace(t) for t in texts} - {""}, key=len, reverse=True)
+
+_DISCLOSURE_PREFIXES = _longest_first(KNOWN_DISCLOSURES)
+_DISCLOSURE_SUFFIXES = _longest_first(KNOWN_DISCLOSURE_SUFFIXES)
+_QUESTION_PREFIX = _collapse_whitespace(QUESTION_PREFIX)
+_QUESTION_SUFFIX = _collapse_whitespace(QUESTION_SUFFIX)
+
+def register_disclosures(prefixes=(), suffixes=()):
+    """
+    Also strip these disclosure texts when normalizing prompts, e.g. the
+    templates of a variants.py fan-out, so every variant of a prompt gets
+    the same prompt_hash(). Changes normalizer_key(), which invalidates
+    cached prompt ids.
+    """
+    global _DISCLOSURE_PREFIXES, _DISCLOSURE_SUFFIXES
+    KNOWN_DISCLOSURES.extend(p for p in prefixes if p not in KNOWN_DISCLOSURES)
+    KNOWN_DISCLOSURE_SUFFIXES.extend(s for s in suffixes if s not in KNOWN_DISCLOSURE_SUFFIXES)
+    _DISCLOSURE_PREFIXES = _longest_first(KNOWN_DISCLOSURES)
+    _DISCLOSURE_SUFFIXES = _longest_first(KNOWN_DISCLOSURE_SUFFIXES)
+
+def normalizer_key():
+    """
+    Integer fingerprint of the normalization rules; caches of normalized
+    prompts store it and are rebuilt when it changes.
+    """
+    rules = "\0".join(["v1", *_DISCLOSURE_PREFIXES, "\1", *_DISCLOSURE_SUFFIXES])
+    return int.from_bytes(hashlib.blake2b(rules.encode("utf-8"), digest_size=7).digest(), "big")
+
+def normalize_prompt(prompt):
+    """
+    Reduce a prompt to the text the model was actually asked about:
+    - collapses runs of whitespace and trims both ends,
+    - strips one known disclosure prefix (see KNOWN_DISCLOSURES) and one
+      registered disclosure suffix (see register_disclosures),
+    - strips the Natural Questions question template.
+    """
+    text = _collapse_whitespace(prompt or "")
+    for disclosure in _DISCLOSURE_PREFIXES:
+        if text.startswith(disclosure):
+            text = text[len(disclosure):].lstrip()
+            break
+    for disclosure in _DISCLOSURE_SUFFIXES:
+        if text.endswith(disclosure):
+            text = text[:-len(disclosure)].rstrip()
+            break
+    if text.startswith(_QUESTION_PREFIX):
+        text = text[len(_QUESTION_PREFIX):].lstrip()
+    if text.endswith(_QUESTION_SUFFIX):
+        text = text[:-len(_QUESTION_SUFFIX)].rstrip()
+    return text
+
+def prompt_hash(prompt):
+    """
+    Hex digest of the normalized prompt, used as the exact-join key.
+    """
+    return hashlib.blake2b(normalize_prompt(prompt).encode("utf-8"), digest_size=16).hexdigest()
+
+def hash_join(index1, index2):
+    """
+    Pair items of two build_prompt_index() lists whose normalized prompts are identical.
+    Each item needs a 'prompt_hash' key. Duplicated prompts are paired in file
+    order, and every file2 item is used at most once.
+
+    Returns (pairs, rest1, rest2): the (item1, item2) pairs, then the items of
+    each side that still need fuzzy matching.
+    """
+    by_hash = defaultdict(deque)
+    for item2 in index2:
+        by_hash[item2["prompt_hash"]].append(item2)
+
+    pairs = []
+    rest1 = []
+    for item1 in index1:
+        queue = by_hash.get(item1["prompt_hash"])
+        if queue:
+            pairs.append((item1, queue.popleft()))
+        else:
+            rest1.append(item1)
+
+    taken2 = {item2["id"] for _, item2 in pairs}
+    rest2 = [item2 for item2 in index2 if item2["id"] not in taken2]
+    return pairs, rest1, rest2
+
+def find_best_fuzzy_matches(target_prompts, candidates, threshold=DEFAULT_THRESHOLD,
+                            workers=DEFAULT_WORKERS):
+    """
+    Find the best fuzzy match in 'candidates' for a whole list of prompts.
+    Scores blocks of 'target_prompts' against every candidate's 'prompt' at once
+    with rapidfuzz's process.cdist (partial_ratio, score_cutoff=threshold) on
+    'workers' cores, then keeps the first highest-scoring candidate per row,
+    exactly like the one-by-one loop did.
+
+    Returns a list of (best_match, best_score) tuples, one per target prompt.
+    best_match is None when no candidate reaches the threshold; scores below the
+    cutoff are not computed, so best_score is 0 in that case.
+    """
+    if not candidates:
+        return [(None, 0) for _ in target_prompts]
+
+    choices = [cand["prompt"] for cand in candidates]
+    results = []
+    for _, block in _score_blocks(target_prompts, choices, threshold, workers):
+        best_cols = block.argmax(axis=1)
+        best_scores = block[np.arange(len(best_cols)), best_cols]
+        for col, score in zip(best_cols, best_scores):
+            # A zero score means nothing cleared the cutoff (or nothing overlapped).
+            if score > 0 and score >= threshold:
+                results.append((candidates[col], float(score)))
+            else:
+                results.append((None, 0))
+    return results
+
+def _score_blocks(target_prompts, choices, threshold, workers):
+    """
+    Yield (start_row, block) pairs of partial_ratio scores for consecutive
+    blocks of 'target_prompts' against all 'choices'.
+    """
+    block_rows = max(1, MAX_BLOCK_CELLS // max(1, len(choices)))
+    for start in range(0, len(target_prompts), block_rows):
+        yield start, process.cdist(
+            target_prompts[start:start + block_rows],
+            choices,
+            scorer=fuzz.partial_ratio,
+            score_cutoff=threshold,
+            dtype=np.float64,
+            workers=workers,
+        )
+
+def top_k_candidates(target_prompts, choices, k=DEFAULT_TOP_K, threshold=DEFAULT_THRESHOLD,
+                     workers=DEFAULT_WORKERS):
+    """
+    Build the sparse similarity graph used for one-to-one assignment.
+    Row i keeps at most 'k' entries: the highest partial_ratio scores of
+    target_prompts[i] against 'choices' that reach the threshold. Only one
+    block of scores is dense at a time, so memory is O(rows * k) overall.
+
+    Returns a scipy CSR matrix of shape (len(target_prompts), len(choices)).
+    """
+    if k < 1:
+        raise ValueError(f"k must be at least 1, got {k}.")
+    shape = (len(target_prompts), len(choices))
+    if not target_prompts or not choices:
+        return csr_matrix(shape, dtype=np.float64)
+
+    rows, cols, scores = [], [], []
+    for start, block in _score_blocks(target_prompts, choices, threshold, workers):
+        if k < block.shape[1]:
+            top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(block.shape[1]), block.shape)
+        top_scores = np.take_along_axis(block, top, axis=1)
+        keep = (top_scores > 0) & (top_scores >= threshold)
+        block_rows, _ = np.nonzero(keep)
+        rows.append(block_rows + start)
+        cols.append(top[keep])
+        scores.append(top_scores[keep])
+
+    return csr_matrix(
+        (np.concatenate(scores), (np.concatenate(rows), np.concatenate(cols))),
+        shape=shape,
+    )
+
+def assign_greedy(graph):
+    """
+    One-to-one matching by a sorted-edge greedy pass: edges are taken from the
+    highest score down (ties broken by row, then column) whenever both ends are
+    still free. Runs in O(E log E) for E edges in 'graph'.
+
+    Returns (rows, cols, scores) arrays of the chosen edges.
+    """
+    coo = graph.tocoo()
+    order = np.lexsort((coo.col, coo.row, -coo.data))
+
+    row_free = np.ones(graph.shape[0], dtype=bool)
+    col_free = np.ones(graph.shape[1], dtype=bool)
+    chosen = []
+    for e in order:
+        r, c = coo.row[e], coo.col[e]
+        if row_free[r] and col_free[c]:
+            row_free[r] = False
+            col_free[c] = False
+            chosen.append(e)
+
+    chosen = np.asarray(chosen, dtype=np.int64)
+    return coo.row[chosen], coo.col[chosen], coo.data[chosen]
+
+def assign_optimal(graph):
+    """
+    Globally optimal one-to-one matching that maximizes the total score.
+    Every row gets a private "unmatched" column, so a full matching always
+    exists, and the sparse LAPJVsp solver in scipy.sparse.csgraph picks the
+    real edges that beat leaving both ends unmatched. No dense matrix is built.
+
+    Returns (rows, cols, scores) arrays of the chosen edges.
+    """
+    n_rows, n_cols = graph.shape
+    if n_rows == 0 or graph.nnz == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0, dtype=np.float64)
+
+    # Turn scores into strictly positive costs; an unmatched row costs more than
+    # any real edge, so the solver maximizes the sum of matched scores.
+    ceiling = graph.data.max() + 1.0
+    costs = graph.copy().astype(np.float64)
+    costs.data = ceiling - costs.data
+    padded = hstack([costs, identity(n_rows, format="csr") * ceiling], format="csr")
+
+    row_ind, col_ind = min_weight_full_bipartite_matching(padded)
+    real = col_ind < n_cols
+    rows = row_ind[real]
+    cols = col_ind[real]
+    return rows, cols, np.asarray(graph[rows, cols]).ravel()
+
+def best_per_row(graph):
+    """
+    For each row of a candidate graph, the column with the highest score
+    (lowest column on ties). Returns (rows, cols, scores) arrays.
+    """
+    coo = graph.tocoo()
+    order = np.lexsort((coo.col, -coo.data, coo.row))
+    rows = coo.row[order]
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = rows[1:] != rows[:-1]
+    chosen = order[first]
+    return coo.row[chosen], coo.col[chosen], coo.data[chosen]
+
+def match_indexes(index1, index2, threshold=DEFAULT_THRESHOLD, workers=DEFAULT_WORKERS,
+                  assign="first", top_k=DEFAULT_TOP_K, candidate_index=None):
+    """
+    Match two build_prompt_index() lists: exact hash join first, then fuzzy matching
+    of the remainder using the 'assign' mode (see ASSIGN_MODES).
+
+    'candidate_index' is an optional ngram_index.NgramIndex over index2's
+    prompts; when given, only its top-k TF-IDF candidates are fuzzy-scored.
+
+    Returns a dict keyed by file1 item id with (file2 item or None, score, route)
+    values, where route is "exact" or "fuzzy".
+    """
+    exact_pairs, rest1, rest2 = hash_join(index1, index2)
+    matches = {item1["id"]: (item2, 100.0, "exact") for item1, item2 in exact_pairs}
+    prompts1 = [item["prompt"] for item in rest1]
+    prompts2 = [item["prompt"] for item in rest2]
+
+    if assign == "first" and candidate_index is None:
+        fuzzy_matches = find_best_fuzzy_matches(prompts1, rest2, threshold=threshold,
+                                                workers=workers)
+        for item1, (best_match, score) in zip(rest1, fuzzy_matches):
+            matches[item1["id"]] = (best_match, score, "fuzzy")
+        return matches
+
+    if candidate_index is not None:
+        graph = candidate_index.candidate_graph(prompts1, prompts2, k=top_k, threshold=threshold,
+                                                workers=workers,
+                                                columns=[item["id"] for item in rest2])
+    else:
+        graph = top_k_candidates(prompts1, prompts2, k=top_k, threshold=threshold,
+                                 workers=workers)
+
+    solve = {"first": best_per_row, "greedy": assign_greedy, "optimal": assign_optimal}[assign]
+    for item1 in rest1:
+        matches[item1["id"]] = (None, 0, "fuzzy")
+    for row, col, score in zip(*solve(graph)):
+        matches[rest1[row]["id"]] = (rest2[col], float(score), "fuzzy")
+    return matches
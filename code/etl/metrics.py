@@ -0,0 +1,194 @@
+#  -----------------------------------------------------------------------------
+#  Project:    warden
+#  File:       metrics.py
+# -----------------------------------------------------------------------------
+#  Created:    October 18, 2026 - Jaymari Chua
+#  Modified:   October 18, 2026 - Jaymari Chua
+#
+# -----------------------------------------------------------------------------
+#  Description:
+#
+#  Within this hallowed code lies the power to forge ethereal guardians,
+#  sentinels of the digital realm, to stand vigilant against the unruly tides of
+#  Large Language Models.
+#
+#  Compute Word Error Rate and token F1 locally for a whole Bedrock output
+#  file. Each response and reference is normalized and tokenized once
+#  (references, with their "<OR>" alternatives, through accuracy.py's cache);
+#  WER is the word-level Levenshtein distance (rapidfuzz, in C, on the token
+#  lists) divided by the reference length, and F1 the word-set F1 of
+#  accuracy.py, both taking the best alternative. Pairs are scored in batches
+#  in a pool of worker processes.
+#
+#  The scores are written as a copy of the file with extra entries in each
+#  record's automatedEvaluationResult.scores ("WER", "TokenF1"), so every
+#  reader of that field (columnar.py, the compare scripts) picks them up as
+#  ordinary metrics. deltaF1 needs the responses to perturbed prompts,
+#  which output files do not hold, so it is not computed here.
+#
+#  Requires:
+#    pip install rapidfuzz numpy
+#  Optional:
+#    pip install msgspec   (faster rewriting of the output records)
+#
+#  Usage:
+#    python metrics.py FILE [OUT] [--normalize bedrock|casefold|none]
+#                      [--processes P] [--batch N]
+#
+#  OUT defaults to FILE with ".metrics" added before .jsonl.
+# -----------------------------------------------------------------------------
+#  Copyright (c) 2025 Jaymari Chua
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+# -----------------------------------------------------------------------------
+import argparse
+import json
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+from rapidfuzz.distance import Levenshtein
+
+try:
+    import msgspec
+except ImportError:  # records are re-encoded with the json module instead
+    msgspec = None
+
+from accuracy import NORMALIZERS, QA_FIELDS, best_overlap_scores, qa_fields, reference_set
+from fileio import open_binary
+from jsonl_index import map_records
+from shards import split_jsonl_name
+
+# Metric names written into automatedEvaluationResult.scores.
+METRIC_NAMES = {"wer": "WER", "f1": "TokenF1"}
+
+# (reference, response) pairs per worker task.
+METRICS_BATCH = 5000
+
+def score_batch(pairs, normalization="bedrock"):
+    """
+    {"wer": array, "f1": array} for a list of (reference, response) pairs;
+    NaN where the reference has no alternative.
+    """
+    normalize = NORMALIZERS[normalization]
+    n = len(pairs)
+    wer = np.full(n, np.nan)
+    owners, overlaps, response_sizes, reference_sizes = [], [], [], []
+    for i, (reference, response) in enumerate(pairs):
+        refs = reference_set(reference, normalization)
+        if not refs.alternatives:
+            continue
+        tokens = normalize(response or "").split()
+        words = set(tokens)
+        wer[i] = min(Levenshtein.distance(ref, tokens) / len(ref) for ref in refs.tokens)
+        for alternative in refs.words:
+            owners.append(i)
+            overlaps.append(len(words & alternative))
+            response_sizes.append(len(words))
+            reference_sizes.append(len(alternative))
+    f1 = best_overlap_scores(n, owners, overlaps, response_sizes, reference_sizes)["f1"]
+    f1[np.isnan(wer)] = np.nan
+    return {"wer": wer, "f1": f1}
+
+def score_pairs(pairs, normalization="bedrock", processes=None, batch_size=METRICS_BATCH):
+    """
+    score_batch over all 'pairs', in batches of 'batch_size' spread over
+    'processes' worker processes (None = all cores, 1 = in this process).
+    """
+    batches = [pairs[a:a + batch_size] for a in range(0, len(pairs), batch_size)]
+    score = partial(score_batch, normalization=normalization)
+    if processes == 1 or len(batches) <= 1:
+        results = [score(batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(score, batches))
+    if not results:
+        return {name: np.empty(0) for name in METRIC_NAMES}
+    return {name: np.concatenate([r[name] for r in results]) for name in METRIC_NAMES}
+
+def score_file(path, normalization="bedrock", processes=None, batch_size=METRICS_BATCH):
+    """
+    (lines, scores): the line index of every record of 'path' and its
+    {"wer", "f1"} scores.
+    """
+    rows = map_records(path, qa_fields, processes=processes, fields=QA_FIELDS)
+    lines = np.fromiter((i for i, _ in rows), dtype=np.int64, count=len(rows))
+    pairs = [(reference, response) for _, (reference, response, _) in rows]
+    return lines, score_pairs(pairs, normalization, processes=processes, batch_size=batch_size)
+
+def metrics_path(path):
+    stem, suffix = split_jsonl_name(path)
+    return f"{stem}.metrics{suffix}"
+
+if msgspec is not None:
+    _decode = msgspec.json.decode
+    _encode = msgspec.json.encode
+else:
+    _decode = json.loads
+
+    def _encode(obj):
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def write_scored(path, out_path, lines, scores):
+    """
+    Copy 'path' to 'out_path' with the scores added to (or replacing
+    same-named entries of) each record's automatedEvaluationResult.scores.
+    Lines that were not scored (malformed records) are copied unchanged.
+    """
+    by_line = {}
+    for row, line in enumerate(lines.tolist()):
+        by_line[line] = [{"metricName": METRIC_NAMES[name], "result": round(float(scores[name][row]), 6)}
+                         for name in METRIC_NAMES if not math.isnan(scores[name][row])]
+    names = set(METRIC_NAMES.values())
+    i = 0
+    with open_binary(path) as f, open_binary(out_path, "wb") as out:
+        for raw in f:
+            raw = raw.rstrip(b"\r\n")
+            if not raw:
+                continue
+            extra = by_line.get(i)
+            i += 1
+            if extra is None:
+                out.write(raw + b"\n")
+                continue
+            record = _decode(raw)
+            result = record.setdefault("automatedEvaluationResult", {})
+            kept = [s for s in result.get("scores", []) if s.get("metricName") not in names]
+            result["scores"] = kept + extra
+            out.write(_encode(record) + b"\n")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add local WER and token F1 scores to a Bedrock output file.")
+    parser.add_argument("file", help="*_output.jsonl file")
+    parser.add_argument("out", nargs="?", help="scored copy (default FILE.metrics.jsonl)")
+    parser.add_argument("--normalize", choices=sorted(NORMALIZERS), default="bedrock",
+                        help="normalization of responses and references (default bedrock)")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="worker processes (default 0 = all cores; 1 = no pool)")
+    parser.add_argument("--batch", type=int, default=METRICS_BATCH,
+                        help=f"pairs per worker task (default {METRICS_BATCH})")
+    args = parser.parse_args()
+
+    start = time.monotonic()
+    lines, scores = score_file(args.file, args.normalize, processes=args.processes or None,
+                               batch_size=args.batch)
+    out_path = args.out or metrics_path(args.file)
+    write_scored(args.file, out_path, lines, scores)
+    print(f"Scored {len(lines)} record(s) in {time.monotonic() - start:.2f}s -> {out_path}")
+    for name, metric in METRIC_NAMES.items():
+        values = scores[name][~np.isnan(scores[name])]
+        if values.size:
+            print(f"  {metric}: mean {values.mean():.5f} over {values.size} record(s)")
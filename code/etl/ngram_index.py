@@ -0,0 +1,242 @@
+#  -----------------------------------------------------------------------------
+#  Project:    warden
+#  File:       ngram_index.py
+# -----------------------------------------------------------------------------
+#  Created:    October 18, 2026 - Jaymari Chua
+#  Modified:   October 18, 2026 - Jaymari Chua
+#
+# -----------------------------------------------------------------------------
+#  Description:
+#
+#  Within this hallowed code lies the power to forge ethereal guardians,
+#  sentinels of the digital realm, to stand vigilant against the unruly tides of
+#  Large Language Models.
+#
+#  Character n-gram TF-IDF index over the prompts of a Bedrock output file.
+#  Prompts become hashed, L2-normalized sparse vectors, and a sparse matrix
+#  product proposes the top-k most similar prompts for each query. Only those
+#  candidates are re-scored with rapidfuzz, instead of every N x M pair. The
+#  index is cached next to the source file and rebuilt when the file changes.
+#
+#  Requires:
+#    pip install rapidfuzz numpy scipy
+# -----------------------------------------------------------------------------
+#  Copyright (c) 2025 Jaymari Chua
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+# -----------------------------------------------------------------------------
+import os
+
+import numpy as np
+from rapidfuzz import fuzz, process
+from scipy.sparse import csr_matrix, diags, vstack
+
+from matching import (
+    DEFAULT_THRESHOLD,
+    DEFAULT_TOP_K,
+    DEFAULT_WORKERS,
+    normalize_prompt,
+    normalizer_key,
+)
+from storage import is_remote
+
+DEFAULT_NGRAM = 3
+
+# Hashed feature space: 2**20 columns, like a hashing vectorizer.
+FEATURE_BITS = 20
+N_FEATURES = 1 << FEATURE_BITS
+
+# N-grams found in more than MAX_DF of the prompts (and in more than MAX_DF_FLOOR
+# prompts, so small files keep every n-gram) carry almost no signal but make the
+# similarity product dense, so they are dropped like sklearn's max_df.
+MAX_DF = 0.02
+MAX_DF_FLOOR = 1_000
+
+# Prompts vectorized per chunk, and the bound on (query rows x indexed prompts)
+# multiplied per block, which caps the size of one similarity block.
+VECTORIZE_CHUNK = 50_000
+QUERY_BLOCK_CELLS = 4_000_000
+
+_ROLLING_BASE = np.uint64(1_000_003)
+_FIBONACCI_MULT = np.uint64(0x9E3779B97F4A7C15)
+
+def _hashed_ngrams(texts, ngram):
+    """
+    Return (row_ids, feature_ids) for every character n-gram of 'texts'.
+    Hashing runs over one concatenated code-point array, so there is no
+    per-character Python loop.
+    """
+    padded = [f" {t} " for t in texts]
+    lengths = np.fromiter(map(len, padded), dtype=np.int64, count=len(padded))
+    codes = np.frombuffer("".join(padded).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+
+    counts = np.maximum(lengths - ngram + 1, 0)
+    starts = np.cumsum(lengths) - lengths
+    row_ids = np.repeat(np.arange(len(texts)), counts)
+    first = np.cumsum(counts) - counts
+    positions = np.arange(counts.sum()) - np.repeat(first - starts, counts)
+
+    h = np.zeros(len(positions), dtype=np.uint64)
+    for offset in range(ngram):
+        h = h * _ROLLING_BASE + codes[positions + offset]
+    features = ((h * _FIBONACCI_MULT) >> np.uint64(64 - FEATURE_BITS)).astype(np.int64)
+    return row_ids, features
+
+def _count_matrix(prompts, ngram):
+    """
+    Sparse (len(prompts) x N_FEATURES) matrix of n-gram counts over the
+    lower-cased, normalized prompts.
+    """
+    chunks = []
+    for start in range(0, len(prompts), VECTORIZE_CHUNK):
+        texts = [normalize_prompt(p).lower() for p in prompts[start:start + VECTORIZE_CHUNK]]
+        rows, cols = _hashed_ngrams(texts, ngram)
+        chunks.append(csr_matrix((np.ones(len(rows), dtype=np.float64), (rows, cols)),
+                                 shape=(len(texts), N_FEATURES)))
+    if not chunks:
+        return csr_matrix((0, N_FEATURES), dtype=np.float64)
+    matrix = vstack(chunks, format="csr")
+    matrix.sum_duplicates()
+    return matrix
+
+def _l2_normalize(matrix):
+    matrix = matrix.tocsr()
+    matrix.eliminate_zeros()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return diags(1.0 / norms) @ matrix
+
+class NgramIndex:
+    """
+    TF-IDF vectors of one file's prompts, row i = record i of build_prompt_index().
+    """
+
+    def __init__(self, matrix, idf, ngram=DEFAULT_NGRAM):
+        self.matrix = matrix.tocsr()
+        self.idf = idf
+        self.ngram = ngram
+
+    @classmethod
+    def build(cls, prompts, ngram=DEFAULT_NGRAM):
+        counts = _count_matrix(prompts, ngram)
+        df = np.bincount(counts.indices, minlength=N_FEATURES)
+        idf = np.log((1.0 + len(prompts)) / (1.0 + df)) + 1.0
+        idf[df > max(MAX_DF * len(prompts), MAX_DF_FLOOR)] = 0.0
+        return cls(_l2_normalize(counts @ diags(idf)), idf, ngram)
+
+    def vectorize(self, prompts):
+        """
+        TF-IDF vectors for new prompts, weighted by this index's idf.
+        """
+        return _l2_normalize(_count_matrix(prompts, self.ngram) @ diags(self.idf))
+
+    def top_k(self, prompts, k=DEFAULT_TOP_K, columns=None):
+        """
+        Return (rows, cols) of the k most cosine-similar indexed prompts for each
+        query prompt. 'columns' restricts the search to those index rows, and
+        the returned cols are positions within it.
+        """
+        if k < 1:
+            raise ValueError(f"k must be at least 1, got {k}.")
+        indexed = self.matrix if columns is None else self.matrix[columns]
+        indexed_t = indexed.T.tocsc()
+        block_rows = max(1, QUERY_BLOCK_CELLS // max(1, indexed.shape[0]))
+        rows, cols = [], []
+        for start in range(0, len(prompts), block_rows):
+            sims = (self.vectorize(prompts[start:start + block_rows]) @ indexed_t).tocsr()
+            for i in range(sims.shape[0]):
+                lo, hi = sims.indptr[i], sims.indptr[i + 1]
+                row_cols = sims.indices[lo:hi]
+                if hi - lo > k:
+                    row_cols = row_cols[np.argpartition(-sims.data[lo:hi], k - 1)[:k]]
+                rows.append(np.full(len(row_cols), start + i, dtype=np.int64))
+                cols.append(row_cols.astype(np.int64))
+        if not rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(rows), np.concatenate(cols)
+
+    def candidate_graph(self, prompts, choices, k=DEFAULT_TOP_K, threshold=DEFAULT_THRESHOLD,
+                        workers=DEFAULT_WORKERS, columns=None):
+        """
+        Same contract as matching.top_k_candidates: a CSR matrix of partial_ratio
+        scores >= threshold, but only the top-k TF-IDF candidates of each prompt
+        are scored. 'choices' are the prompts of the searched rows (all of them,
+        or those listed in 'columns').
+        """
+        shape = (len(prompts), len(choices))
+        rows, cols = self.top_k(prompts, k=k, columns=columns)
+        if len(rows) == 0:
+            return csr_matrix(shape, dtype=np.float64)
+        scores = process.cpdist(
+            [prompts[r] for r in rows],
+            [choices[c] for c in cols],
+            scorer=fuzz.partial_ratio,
+            score_cutoff=threshold,
+            dtype=np.float64,
+            workers=workers,
+        )
+        keep = (scores > 0) & (scores >= threshold)
+        return csr_matrix((scores[keep], (rows[keep], cols[keep])), shape=shape)
+
+    def save(self, path, source_stat=None):
+        stat = source_stat or (0, 0)
+        np.savez_compressed(
+            path,
+            data=self.matrix.data,
+            indices=self.matrix.indices,
+            indptr=self.matrix.indptr,
+            shape=np.asarray(self.matrix.shape),
+            idf=self.idf,
+            ngram=self.ngram,
+            source_stat=np.asarray(stat, dtype=np.int64),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as npz:
+            matrix = csr_matrix((npz["data"], npz["indices"], npz["indptr"]),
+                                shape=tuple(npz["shape"]))
+            return cls(matrix, npz["idf"], int(npz["ngram"])), tuple(npz["source_stat"])
+
+def cache_path(source_path, ngram=DEFAULT_NGRAM):
+    return f"{source_path}.ngram{ngram}.npz"
+
+def load_or_build(source_path, prompts, ngram=DEFAULT_NGRAM):
+    """
+    Return the NgramIndex for 'source_path', reusing the cached index next to
+    the file when its size and mtime still match, otherwise building it from
+    'prompts' (the file's prompts in record order) and caching it.
+    s3:// sources have no cache.
+    """
+    if is_remote(source_path):
+        return NgramIndex.build(prompts, ngram)
+    st = os.stat(source_path)
+    # The n-grams come from normalized prompts, so the normalization is part of the key
+    source_stat = (st.st_size, st.st_mtime_ns, normalizer_key())
+    path = cache_path(source_path, ngram)
+
+    if os.path.exists(path):
+        try:
+            index, cached_stat = NgramIndex.load(path)
+            if cached_stat == source_stat and index.matrix.shape[0] == len(prompts):
+                return index
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[WARNING] Ignoring unreadable n-gram index {path}: {e}")
+
+    index = NgramIndex.build(prompts, ngram)
+    try:
+        index.save(path, source_stat)
+    except OSError as e:
+        print(f"[WARNING] Could not cache n-gram index at {path}: {e}")
+    return index
@@ -0,0 +1,280 @@
+#  -----------------------------------------------------------------------------
+#  Project:    warden
+#  File:       nway_compare.py
+# -----------------------------------------------------------------------------
+#  Created:    October 18, 2026 - Jaymari Chua
+#  Modified:   October 18, 2026 - Jaymari Chua
+#
+# -----------------------------------------------------------------------------
+#  Description:
+#
+#  Within this hallowed code lies the power to forge ethereal guardians,
+#  sentinels of the digital realm, to stand vigilant against the unruly tides of
+#  Large Language Models.
+#
+#  Compare any number of Bedrock evaluation runs in one pass. Every run is
+#  aligned once to a shared canonical prompt index (exact normalized-prompt
+#  join, then one-to-one fuzzy matching; prompts no earlier run has are added
+#  to the index), giving a run x prompt x metric array with NaN where a run has
+#  no record or no score. Per-run means and all pairwise differences are then
+#  computed from that array without re-matching anything.
+#
+#  Requires:
+#    pip install rapidfuzz numpy scipy
+#
+#  Usage:
+#    python nway_compare.py RUN [RUN ...] [--labels L1 L2 ...] [--threshold T]
+#                           [--workers W] [--assign first|greedy|optimal]
+#                           [--top-k K] [--processes P] [--save OUT.npz]
+#                           [--variants FILE.json]
+#
+#  A RUN is a *_output.jsonl file or a directory searched for them.
+# -----------------------------------------------------------------------------
+#  Copyright (c) 2025 Jaymari Chua
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+# -----------------------------------------------------------------------------
+import argparse
+import glob
+import os
+
+import numpy as np
+
+from columnar import load_table, union_metrics
+from matching import ASSIGN_MODES, DEFAULT_THRESHOLD, DEFAULT_TOP_K, DEFAULT_WORKERS, match_indexes
+from variants import parse_variants, register_variants
+
+def expand_runs(paths):
+    """
+    Expand directories to the *_output.jsonl files below them (sorted).
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = sorted(glob.glob(os.path.join(path, "**", "*_output.jsonl"), recursive=True))
+            if not found:
+                print(f"[WARNING] No *_output.jsonl files under {path}.")
+            files.extend(found)
+        else:
+            files.append(path)
+    return files
+
+def default_labels(files):
+    """
+    Label each run by its directory, or by its full path when directories repeat.
+    """
+    labels = [os.path.dirname(f) or f for f in files]
+    if len(set(labels)) < len(labels):
+        labels = list(files)
+    return labels
+
+class PromptIndex:
+    """
+    Canonical prompts shared by all runs. Items look like build_prompt_index()
+    entries ('id', 'prompt', 'prompt_hash'), so they can be matched directly.
+    """
+
+    def __init__(self):
+        self.items = []
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def prompts(self):
+        return [item["prompt"] for item in self.items]
+
+    def add(self, prompt, prompt_id):
+        item = {"id": len(self.items), "prompt": prompt, "prompt_hash": prompt_id}
+        self.items.append(item)
+        return item["id"]
+
+    def align(self, table, threshold=DEFAULT_THRESHOLD, workers=DEFAULT_WORKERS,
+              assign="greedy", top_k=DEFAULT_TOP_K):
+        """
+        Map every row of 'table' (a columnar.EvalTable) to a canonical prompt,
+        adding prompts that match nothing. A canonical prompt is used at most
+        once per run. Returns (columns, route_counts) where columns[row] is
+        the canonical prompt id of that row.
+        """
+        rows = [{"id": row, "prompt": prompt, "prompt_hash": str(pid)}
+                for row, (prompt, pid) in enumerate(zip(table.prompts, table.prompt_ids))]
+        counts = {"exact": 0, "fuzzy": 0, "new": 0}
+        columns = np.empty(len(rows), dtype=np.int64)
+
+        matches = {}
+        if self.items:
+            matches = match_indexes(rows, self.items, threshold=threshold, workers=workers,
+                                    assign=assign, top_k=top_k)
+
+        taken = set()
+        for item in rows:
+            match, _, route = matches.get(item["id"], (None, 0, None))
+            if match is None or match["id"] in taken:
+                columns[item["id"]] = self.add(item["prompt"], item["prompt_hash"])
+                counts["new"] += 1
+            else:
+                columns[item["id"]] = match["id"]
+                counts[route] += 1
+            taken.add(columns[item["id"]])
+        return columns, counts
+
+def build_cube(tables, threshold=DEFAULT_THRESHOLD, workers=DEFAULT_WORKERS,
+               assign="greedy", top_k=DEFAULT_TOP_K, verbose=True):
+    """
+    Align all tables to one PromptIndex and fill a (runs x prompts x metrics)
+    float array, NaN where a run has no record or score for that prompt.
+    Returns (cube, index, metric_names).
+    """
+    index = PromptIndex()
+    metrics = union_metrics(*tables)
+    alignments = []
+    for table in tables:
+        columns, counts = index.align(table, threshold=threshold, workers=workers,
+                                      assign=assign, top_k=top_k)
+        alignments.append(columns)
+        if verbose:
+            print(f"  {table.source}: {len(table)} record(s) -> {counts['exact']} exact, "
+                  f"{counts['fuzzy']} fuzzy, {counts['new']} new prompt(s)")
+
+    cube = np.full((len(tables), len(index), len(metrics)), np.nan)
+    for run, (table, columns) in enumerate(zip(tables, alignments)):
+        cube[run, columns] = table.matrix(metrics)
+    return cube, index, metrics
+
+def _masked_mean(values, axis):
+    """
+    nanmean without the all-NaN RuntimeWarning; returns (mean, count).
+    """
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=axis)
+    total = np.where(valid, values, 0.0).sum(axis=axis)
+    return np.where(count > 0, total / np.maximum(count, 1), np.nan), count
+
+def run_summary(cube):
+    """
+    Per-run (mean, count) arrays of shape (runs x metrics).
+    """
+    return _masked_mean(cube, axis=1)
+
+def pairwise_summary(cube):
+    """
+    Mean signed difference (run j - run i), mean absolute difference and
+    count of shared prompts for every run pair and metric, each of shape
+    (runs x runs x metrics).
+    """
+    runs = cube.shape[0]
+    mean_diff = np.full((runs, runs, cube.shape[2]), np.nan)
+    mean_abs = np.full_like(mean_diff, np.nan)
+    count = np.zeros(mean_diff.shape, dtype=np.int64)
+    for i in range(runs):
+        # All pairs (i, *) at once: (runs x prompts x metrics)
+        diff = cube - cube[i]
+        mean_diff[i], count[i] = _masked_mean(diff, axis=1)
+        mean_abs[i], _ = _masked_mean(np.abs(diff), axis=1)
+    return mean_diff, mean_abs, count
+
+def print_report(labels, metrics, cube, index):
+    means, counts = run_summary(cube)
+    mean_diff, mean_abs, pair_counts = pairwise_summary(cube)
+    coverage = (~np.isnan(cube)).any(axis=2).sum(axis=1)
+
+    print(f"\n----- RUNS ({len(labels)}) x PROMPTS ({len(index)}) x METRICS ({len(metrics)}) -----\n")
+    for run, label in enumerate(labels):
+        print(f"  [{run}] {label}: {coverage[run]} prompt(s) with scores")
+    print()
+
+    for m, metric in enumerate(metrics):
+        print(f"----- {metric} -----\n")
+        print("Per-run mean:")
+        for run, label in enumerate(labels):
+            if counts[run, m]:
+                print(f"  [{run}] {means[run, m]:.5f} over {counts[run, m]} prompt(s)")
+            else:
+                print(f"  [{run}] (no scores)")
+
+        print("\nPairwise mean difference ([j] - [i]) on shared prompts:")
+        shown = False
+        for i in range(len(labels)):
+            for j in range(i + 1, len(labels)):
+                if pair_counts[i, j, m]:
+                    shown = True
+                    print(f"  [{j}] - [{i}]: {mean_diff[i, j, m]:+.5f} "
+                          f"(mean |diff| {mean_abs[i, j, m]:.5f}, {pair_counts[i, j, m]} prompt(s))")
+        if not shown:
+            print("  (no run pair shares a scored prompt)")
+        print()
+
+def main(paths, labels=None, threshold=DEFAULT_THRESHOLD, workers=DEFAULT_WORKERS,
+         assign="greedy", top_k=DEFAULT_TOP_K, save=None, processes=1):
+    files = expand_runs(paths)
+    if labels is None:
+        labels = default_labels(files)
+    elif len(labels) != len(files):
+        raise ValueError(f"{len(labels)} label(s) given for {len(files)} run file(s).")
+
+    print("----- nway_compare.py: Multi-run Comparison -----")
+    print(f"Fuzzy threshold = {threshold}")
+    print(f"Assignment mode = {assign}\n")
+    print("Aligning runs to the shared prompt index:")
+
+    tables = [load_table(f, processes=processes) for f in files]
+    cube, index, metrics = build_cube(tables, threshold=threshold, workers=workers,
+                                      assign=assign, top_k=top_k)
+    print_report(labels, metrics, cube, index)
+
+    if save:
+        np.savez_compressed(save, cube=cube, runs=np.array(labels), files=np.array(files),
+                            metrics=np.array(metrics), prompts=np.array(index.prompts))
+        print(f"Saved the run x prompt x metric array to {save}")
+    return cube, index, metrics
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare many Bedrock evaluation runs aligned on one shared prompt index.")
+    parser.add_argument("runs", nargs="+", help="*_output.jsonl files or directories")
+    parser.add_argument("--labels", nargs="+", help="one label per run file")
+    parser.add_argument("--threshold", type=int, default=DEFAULT_THRESHOLD,
+                        help=f"fuzzy match threshold, 0-100 (default {DEFAULT_THRESHOLD})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="cores used for fuzzy scoring (default -1 = all)")
+    parser.add_argument("--assign", choices=ASSIGN_MODES, default="greedy",
+                        help="how fuzzy candidates are assigned to canonical prompts "
+                             "(default greedy, one-to-one)")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K,
+                        help=f"candidates kept per prompt for greedy/optimal (default {DEFAULT_TOP_K})")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="worker processes parsing each run file (default 1; 0 = all cores)")
+    parser.add_argument("--save", metavar="OUT.npz",
+                        help="save the run x prompt x metric array, labels and prompts")
+    parser.add_argument("--variants", metavar="FILE.json",
+                        help="disclosure templates (see variants.py) to strip before matching")
+    args = parser.parse_args()
+    if args.top_k < 1:
+        parser.error(f"--top-k must be at least 1, got {args.top_k}")
+    files = expand_runs(args.runs)
+    missing = [f for f in files if not os.path.isfile(f)]
+    if missing:
+        parser.error(f"no such run file(s): {', '.join(missing)}")
+    if not files:
+        parser.error("no run files found")
+    if args.labels is not None and len(args.labels) != len(files):
+        parser.error(f"{len(args.labels)} label(s) given for {len(files)} run file(s)")
+
+    if args.variants:
+        register_variants(parse_variants(path=args.variants))
+
+    main(files, labels=args.labels, threshold=args.threshold, workers=args.workers,
+         assign=args.assign, top_k=args.top_k, save=args.save,
+         processes=args.processes or None)
@@ -12,18 +12,27 @@
 #  sentinels of the digital realm, to stand vigilant against the unruly tides of
 #  Large Language Models.
 #
-#  Compare two JSONL files containing AI model interaction records using fuzzy matching
-#  on the 'prompt' text, and then compare toxicity scores, reference responses, and show
+#  Compare two JSONL files containing AI model interaction records by matching on the
+#  'prompt' text (an exact join on the normalized prompt first, fuzzy matching for the
+#  rest), and then compare toxicity scores, reference responses, and show
 #  model-generated responses. Finally, compute the average difference in toxicity scores
-#  across all matched records.
+#  across all matched records, with bootstrap confidence intervals.
 #
 #  Default threshold is 70. Adjust as needed for stricter/looser matches.
 #
 #  Requires:
-#    pip install rapidfuzz
+#    pip install rapidfuzz numpy scipy
+#  Optional:
+#    pip install msgspec   (faster, schema-typed record decoding)
+#    pip install pyarrow   (Parquet table cache instead of .npz)
+#    pip install zstandard (.zst inputs and reports; .gz needs nothing extra)
 #
 #  Usage:
-#    python compare.py file1.jsonl file2.jsonl [threshold]
+#    python compare.py file1.jsonl file2.jsonl [threshold] [workers]
+#                      [--assign first|greedy|optimal] [--top-k K]
+#                      [--candidates all|tfidf] [--ngram N] [--stream OUT.jsonl]
+#                      [--report-jsonl PATH] [--report-csv PATH] [--quiet] [--show N]
+#                      [--bootstrap N] [--seed S] [--variants FILE.json]
 # -----------------------------------------------------------------------------
 #  Copyright (c) 2025 Jaymari Chua
 #
@@ -40,99 +49,81 @@
 #  limitations under the License.
 #
 # -----------------------------------------------------------------------------
-import json
-import sys
-from rapidfuzz import fuzz
-
-DEFAULT_THRESHOLD = 70
-
-def load_jsonl(filename):
-    """
-    Load a JSONL file into a list of Python dicts.
-    - Skips empty lines.
-    - Warns if invalid JSON is encountered.
-    """
-    records = []
-    with open(filename, 'r', encoding='utf-8') as f:
-        for line_num, line in enumerate(f, start=1):
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                record = json.loads(line)
-                records.append(record)
-            except json.JSONDecodeError as e:
-                print(f"[WARNING] Invalid JSON at line {line_num} in {filename}. Skipping. Error: {e}")
-    return records
-
-def get_prompt(record):
-    """
-    Extract the 'prompt' text from record["inputRecord"]["prompt"].
-    """
-    return record["inputRecord"]["prompt"]
-
-def get_reference_response(record):
-    """
-    Extract 'referenceResponse' if present in record["inputRecord"].
-    """
-    return record["inputRecord"].get("referenceResponse", "")
-
-def get_toxicity_score(record):
-    """
-    Extract the toxicity score (0–1) from 'automatedEvaluationResult.scores'
-    where 'metricName' == 'Toxicity'.
+import argparse
+from array import array
+from collections import defaultdict, deque
+from itertools import islice
+
+import numpy as np
+
+from columnar import EvalTable, compare_tables, load_table
+from matching import (
+    ASSIGN_MODES,
+    DEFAULT_THRESHOLD,
+    DEFAULT_TOP_K,
+    DEFAULT_WORKERS,
+    best_per_row,
+    find_best_fuzzy_matches,
+    match_indexes,
+    prompt_hash,
+)
+from jsonl_index import open_source
+from ngram_index import DEFAULT_NGRAM, load_or_build
+from records import SCORE_FIELDS, get_prompt, get_toxicity_score
+from reporting import CsvReportWriter, JsonlReportWriter, Report, TextReportRenderer
+from stats import DEFAULT_CONFIDENCE, DEFAULT_RESAMPLES, describe_differences
+from variants import parse_variants, register_variants
+
+# file1 records matched per batch in --stream mode.
+STREAM_CHUNK = 256
+
+# Metric the per-pair log and the summary compare.
+TOXICITY = "Toxicity"
+
+# Differences below this count as "same".
+SAME_TOLERANCE = 1e-8
+
+def build_prompt_index(rows):
     """
-    scores = record.get("automatedEvaluationResult", {}).get("scores", [])
-    for s in scores:
-        if s.get("metricName") == "Toxicity":
-            return s.get("result")
-    return None
-
-def get_model_responses(record):
+    Return a list of dicts with what matching and the toxicity summary need.
+    'rows' are (line, record) pairs from jsonl_index.JsonlFile.iter_records();
+    'line' is kept so the reference and responses of a record can be read
+    again on demand, when the log prints it.
     """
-    Extract text from each response under record["modelResponses"] if present.
-    """
-    model_responses = []
-    for resp_dict in record.get("modelResponses", []):
-        r_text = resp_dict.get("response", "")
-        model_responses.append(r_text)
-    return model_responses
+    return [
+        {
+            "id": i,
+            "line": line,
+            "prompt": get_prompt(rec),
+            "prompt_hash": prompt_hash(get_prompt(rec)),
+            "toxicity": get_toxicity_score(rec),
+        }
+        for i, (line, rec) in enumerate(rows)
+    ]
 
-def build_index(records):
+def build_table_index(table):
     """
-    Return a list of dicts with essential fields for analysis & matching.
+    build_prompt_index() items for the rows of a columnar.EvalTable.
     """
-    indexed = []
-    for i, rec in enumerate(records):
-        item = {
+    toxicity = table.column(TOXICITY).tolist()
+    return [
+        {
             "id": i,
-            "record": rec,
-            "prompt": get_prompt(rec),
-            "toxicity": get_toxicity_score(rec),
-            "reference": get_reference_response(rec),
-            "model_responses": get_model_responses(rec),
+            "line": line,
+            "prompt": prompt,
+            "prompt_hash": prompt_id,
+            "toxicity": None if tox != tox else tox,  # NaN = no score
         }
-        indexed.append(item)
-    return indexed
+        for i, (line, prompt, prompt_id, tox) in enumerate(
+            zip(table.lines.tolist(), table.prompts, table.prompt_ids.tolist(), toxicity))
+    ]
 
 def find_best_fuzzy_match(target_prompt, candidates, threshold=DEFAULT_THRESHOLD):
     """
     Compare 'target_prompt' with each candidate's 'prompt' using partial_ratio.
-    If best_score < threshold, returns (None, best_score).
+    If nothing reaches the threshold, returns (None, 0).
     """
-    best_match = None
-    best_score = 0
-
-    for cand in candidates:
-        score = fuzz.partial_ratio(target_prompt, cand["prompt"])
-        if score > best_score:
-            best_score = score
-            best_match = cand
-
-    if best_score >= threshold:
-        return best_match, best_score
-    else:
-        return None, best_score
+    return find_best_fuzzy_matches([target_prompt], candidates, threshold=threshold, workers=1)[0]
 
 def safe_int(arg, default_val):
     """
@@ -143,176 +134,451 @@ def safe_int(arg, default_val):
     except ValueError:
         return default_val
 
-def main(file1, file2, threshold=DEFAULT_THRESHOLD):
-    # Load data from both files
-    data1 = load_jsonl(file1)
-    data2 = load_jsonl(file2)
+def toxicity_differences(result):
+    """
+    (signed, pct) arrays over the pairs of a columnar.compare_tables()
+    result: tox2 - tox1 (NaN where either score is missing) and
+    100 * |tox2 - tox1| / mean(tox1, tox2) (NaN where missing or both ~0).
+    """
+    n = len(result["diff"])
+    if TOXICITY not in result["metrics"]:
+        return np.full(n, np.nan), np.full(n, np.nan)
+    col = result["metrics"].index(TOXICITY)
+    signed = result["diff"][:, col]
+    avg = (result["scores1"][:, col] + result["scores2"][:, col]) / 2.0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pct = np.where(avg >= SAME_TOLERANCE, 100.0 * np.abs(signed) / avg, np.nan)
+    return signed, pct
+
+def toxicity_comparisons(signed, pct):
+    """
+    One comparison per pair for the report, from toxicity_differences()
+    arrays: None if either score is missing, otherwise a dict with
+    - 'signed_diff' (tox2 - tox1) and 'abs_diff',
+    - 'higher': "file1", "file2" or "same" (difference < 1e-8),
+    - 'pct_change': 100 * |tox2 - tox1| / mean(tox1, tox2), or None when both are ~0.
+    """
+    abs_diff = np.abs(signed)
+    higher = np.where(abs_diff < SAME_TOLERANCE, "same", np.where(signed > 0, "file2", "file1"))
+    valid = ~np.isnan(signed)
+    pct = np.where(np.isnan(pct), None, pct)
+    return [
+        {"signed_diff": s, "abs_diff": a, "higher": h, "pct_change": p} if ok else None
+        for ok, s, a, h, p in zip(valid.tolist(), signed.tolist(), abs_diff.tolist(),
+                                  higher.tolist(), pct.tolist())
+    ]
+
+def assign_pairs(index1, matches, matched2_ids):
+    """
+    Resolve 'matches' (see matching.match_indexes) in file1 order: a file2
+    record belongs to the first file1 record that matched it; later ones are
+    collisions. Adds the new pairs' file2 ids to 'matched2_ids'.
 
-    # Build indexes
-    index1 = build_index(data1)
-    index2 = build_index(data2)
+    Returns (outcomes, rows1, rows2): one (item1, item2 or None, score,
+    route, paired) tuple per file1 item, and the ids of the new pairs.
+    """
+    outcomes, rows1, rows2 = [], [], []
+    for item1 in index1:
+        best_match, score, route = matches[item1["id"]]
+        paired = best_match is not None and best_match["id"] not in matched2_ids
+        if paired:
+            matched2_ids.add(best_match["id"])
+            rows1.append(item1["id"])
+            rows2.append(best_match["id"])
+        outcomes.append((item1, best_match, score, route, paired))
+    return outcomes, np.asarray(rows1, dtype=np.int64), np.asarray(rows2, dtype=np.int64)
+
+def report_outcomes(report, outcomes, comparisons):
+    """
+    Send assign_pairs() outcomes to 'report'; 'comparisons' has one entry
+    per pair, in order. Returns (exact, fuzzy) pair counts.
+    """
+    pairs = iter(comparisons)
+    count_exact = count_fuzzy = 0
+    for item1, item2, score, route, paired in outcomes:
+        if item2 is None:
+            report.unmatched_file1(item1)
+        elif not paired:
+            report.already_matched(item1, item2, score)
+        else:
+            if route == "exact":
+                count_exact += 1
+            else:
+                count_fuzzy += 1
+            report.match(item1, item2, score, route, next(pairs))
+    return count_exact, count_fuzzy
 
-    matched2_ids = set()
+class ToxicitySummary:
+    """
+    Toxicity differences of the matched pairs, kept as compact float arrays
+    (8 bytes per pair) so the summary statistics and their bootstrap
+    confidence intervals are computed with NumPy at the end.
+    """
 
-    # Lists to store numeric differences for final summary
-    tox_diff_list_abs = []
-    tox_diff_list_signed = []
-    pct_change_list = []
+    def __init__(self, n_resamples=DEFAULT_RESAMPLES, seed=None):
+        self.n_resamples = n_resamples
+        self.seed = seed
+        self.signed = array("d")
+        self.pct = array("d")
+        self._stats = None
+
+    def add(self, signed, pct):
+        """
+        Accumulate toxicity_differences() arrays of a batch of pairs (NaN
+        entries are skipped).
+        """
+        self.signed.frombytes(np.ascontiguousarray(signed[~np.isnan(signed)]).tobytes())
+        self.pct.frombytes(np.ascontiguousarray(pct[~np.isnan(pct)]).tobytes())
+        self._stats = None
+
+    def stats(self):
+        """
+        Counts, means and bootstrap CIs (see stats.describe_differences).
+        """
+        if self._stats is None:
+            signed = np.frombuffer(self.signed, dtype=np.float64) if self.signed else np.empty(0)
+            pct = np.frombuffer(self.pct, dtype=np.float64) if self.pct else np.empty(0)
+            same = np.abs(signed) < SAME_TOLERANCE
+            self._stats = {
+                "file2_greater": int(np.count_nonzero(~same & (signed > 0))),
+                "file1_greater": int(np.count_nonzero(~same & (signed < 0))),
+                "same": int(np.count_nonzero(same)),
+                **describe_differences(signed, pct, n_resamples=self.n_resamples, seed=self.seed),
+            }
+        return self._stats
+
+    def as_dict(self):
+        stats = self.stats()
+        return {
+            "file2_greater": stats["file2_greater"],
+            "file1_greater": stats["file1_greater"],
+            "same": stats["same"],
+            "avg_abs_diff": stats["mean_abs"],
+            "avg_signed_diff": stats["mean_signed"],
+            "avg_pct_change": stats["mean_pct"],
+            "avg_abs_diff_ci": stats.get("mean_abs_ci"),
+            "avg_signed_diff_ci": stats.get("mean_signed_ci"),
+            "avg_pct_change_ci": stats.get("mean_pct_ci"),
+            "bootstrap_resamples": self.n_resamples,
+        }
 
-    # Counting how often file2 is higher, file1 is higher, or the same
-    count_file2_greater = 0
-    count_file1_greater = 0
-    count_same = 0
+    def _print_ci(self, ci, fmt):
+        if ci is not None:
+            low, high = ci
+            print(f"  {DEFAULT_CONFIDENCE:.0%} bootstrap CI: [{low:{fmt}}, {high:{fmt}}] "
+                  f"({self.n_resamples} resamples)")
 
-    print("----- Compare.py: Detailed Toxicity Comparison -----")
-    print(f"Comparing:\n  File1 = {file1}\n  File2 = {file2}")
-    print(f"Fuzzy threshold = {threshold}\n")
+    def print_report(self):
+        stats = self.stats()
+        print("----- SUMMARY OF TOXICITY DIFFERENCES -----\n")
 
-    # Attempt to fuzzy-match each record in file1
-    for item1 in index1:
-        prompt1 = item1["prompt"]
-        best_match, score = find_best_fuzzy_match(prompt1, index2, threshold=threshold)
-
-        if best_match is not None:
-            bm_id = best_match["id"]
-            if bm_id in matched2_ids:
-                # Already matched
-                print("----- INFO: This file1 prompt matched a file2 record already matched by another item. -----")
-                print(f"file1 prompt: {prompt1}")
-                print(f"file2 prompt: {best_match['prompt']}")
-                print(f"Fuzzy match score: {score}\n")
+        print("How often is file2 more toxic, file1 more toxic, or effectively the same?\n")
+        print(f"  file2 > file1: {stats['file2_greater']} time(s)")
+        print(f"  file1 > file2: {stats['file1_greater']} time(s)")
+        print(f"  same:         {stats['same']} time(s)\n")
+
+        if stats["count"]:
+            print(f"Average absolute difference in toxicity (0–1 scale): {stats['mean_abs']:.5f}")
+            self._print_ci(stats.get("mean_abs_ci"), ".5f")
+        else:
+            print("No matched pairs with valid toxicity → cannot compute avg absolute difference.")
+
+        if stats["count"]:
+            avg_signed = stats["mean_signed"]
+            if abs(avg_signed) < SAME_TOLERANCE:
+                sign_note = "they are effectively the same on average"
+            elif avg_signed > 0:
+                sign_note = "file2 is slightly higher on average"
             else:
-                matched2_ids.add(bm_id)
-
-                # Gather data
-                tox1 = item1["toxicity"]
-                tox2 = best_match["toxicity"]
-                ref1 = item1["reference"]
-                ref2 = best_match["reference"]
-                model_resps1 = item1["model_responses"]
-                model_resps2 = best_match["model_responses"]
-
-                print("----- MATCH FOUND -----")
-                print(f"Fuzzy match score: {score} (out of 100; higher = more similar).")
-                print("Prompt from file1:")
-                print(f"  ID={item1['id']}: \"{prompt1}\"")
-                print("Prompt from file2:")
-                print(f"  ID={bm_id}: \"{best_match['prompt']}\"")
-                print()
-
-                print("Reference responses:")
-                print(f"  - file1 reference: {ref1}")
-                print(f"  - file2 reference: {ref2}")
-                print()
-
-                print("Model responses from file1:")
-                if model_resps1:
-                    for r in model_resps1:
-                        print(f"  - {r}")
+                sign_note = "file1 is slightly higher on average"
+            print(f"Average signed difference (tox2 - tox1): {avg_signed:.5f} ({sign_note})")
+            ci = stats.get("mean_signed_ci")
+            self._print_ci(ci, ".5f")
+            if ci is not None:
+                if ci[0] > 0 or ci[1] < 0:
+                    print("  The interval excludes 0: the difference is unlikely to be noise.")
                 else:
-                    print("  (No modelResponses found in file1.)")
+                    print("  The interval includes 0: no clear difference at this confidence.")
+        else:
+            print("No matched pairs with valid toxicity → cannot compute avg signed difference.")
 
-                print("\nModel responses from file2:")
-                if model_resps2:
-                    for r in model_resps2:
-                        print(f"  - {r}")
-                else:
-                    print("  (No modelResponses found in file2.)")
-
-                print("\nToxicity scores (0–1, higher = more likely toxic):")
-                print(f"  - file1 toxicity: {tox1}")
-                print(f"  - file2 toxicity: {tox2}\n")
-
-                if tox1 is not None and tox2 is not None:
-                    abs_diff = abs(tox2 - tox1)
-                    signed_diff = tox2 - tox1
-
-                    tox_diff_list_abs.append(abs_diff)
-                    tox_diff_list_signed.append(signed_diff)
-
-                    # Which is higher, or same?
-                    if abs_diff < 1e-8:
-                        print("They are effectively the same (difference < 1e-8).")
-                        count_same += 1
-                    elif tox2 > tox1:
-                        print(f"file2 is higher by {abs_diff:.5f} on a 0–1 scale.")
-                        count_file2_greater += 1
-                    else:
-                        print(f"file1 is higher by {abs_diff:.5f}.")
-                        count_file1_greater += 1
-
-                    # Compute a percentage difference (absolute)
-                    avg_val = (tox1 + tox2) / 2.0
-                    if avg_val < 1e-8:
-                        print("  (% change not computed; both scores ~ 0.0)")
-                    else:
-                        pct_chg = 100.0 * abs_diff / avg_val
-                        pct_change_list.append(pct_chg)
-                        print(f"Absolute % change in toxicity: {pct_chg:.2f}% "
-                              "(= 100 * |tox2 - tox1| / avg(tox1, tox2))")
-                else:
-                    print("Cannot compare toxicity. One or both is missing a valid score.")
+        if stats["count_pct"]:
+            print(f"Average absolute % change across matched toxicity scores: {stats['mean_pct']:.2f}%")
+            self._print_ci(stats.get("mean_pct_ci"), ".2f")
+            print("(Calculated as 100 * |tox2 - tox1| / mean(tox1, tox2) for each pair.)")
+        else:
+            print("No matched pairs with valid toxicity → cannot compute avg % change.\n")
 
-                print("----- END MATCH LOG -----\n")
+        print("----- END OF ANALYSIS -----\n")
 
-        else:
-            print("----- UNMATCHED -----")
-            print(f"file1 prompt: \"{prompt1}\"")
-            print(f"Best fuzzy score < {threshold}, so no match found in file2.\n")
+def print_matching_summary(count_exact, count_fuzzy, unmatched1, unmatched2):
+    print("----- SUMMARY OF MATCHING -----\n")
+    print(f"  matched by exact prompt hash: {count_exact}")
+    print(f"  matched by fuzzy matching:    {count_fuzzy}")
+    print(f"  unmatched in file1:           {unmatched1}")
+    print(f"  unmatched in file2:           {unmatched2}\n")
 
-    # Which file2 records remain unmatched?
-    unmatched_in_file2 = [it for it in index2 if it["id"] not in matched2_ids]
-    if unmatched_in_file2:
-        print("----- UNMATCHED PROMPTS IN FILE2 -----")
-        print("These records never got matched to anything from file1:\n")
-        for it in unmatched_in_file2:
-            print(f"  ID={it['id']} - \"{it['prompt']}\"")
-        print()
-
-    print("----- SUMMARY OF TOXICITY DIFFERENCES -----\n")
-
-    print("How often is file2 more toxic, file1 more toxic, or effectively the same?\n")
-    print(f"  file2 > file1: {count_file2_greater} time(s)")
-    print(f"  file1 > file2: {count_file1_greater} time(s)")
-    print(f"  same:         {count_same} time(s)\n")
-
-    if tox_diff_list_abs:
-        avg_abs = sum(tox_diff_list_abs) / len(tox_diff_list_abs)
-        print(f"Average absolute difference in toxicity (0–1 scale): {avg_abs:.5f}")
-    else:
-        print("No matched pairs with valid toxicity → cannot compute avg absolute difference.")
-
-    if tox_diff_list_signed:
-        avg_signed = sum(tox_diff_list_signed) / len(tox_diff_list_signed)
-        if abs(avg_signed) < 1e-8:
-            sign_note = "they are effectively the same on average"
-        elif avg_signed > 0:
-            sign_note = "file2 is slightly higher on average"
+def print_metric_differences(result):
+    """
+    Print the per-metric averages from columnar.compare_tables().
+    """
+    if not result["metrics"]:
+        return
+    print("----- AVERAGE DIFFERENCES BY METRIC (file2 - file1) -----\n")
+    for name, count, mean_diff, mean_abs in zip(result["metrics"], result["count"],
+                                                result["mean_diff"], result["mean_abs_diff"]):
+        if count:
+            print(f"  {name}: mean diff {mean_diff:+.5f}, mean |diff| {mean_abs:.5f} "
+                  f"over {count} pair(s)")
         else:
-            sign_note = "file1 is slightly higher on average"
-        print(f"Average signed difference (tox2 - tox1): {avg_signed:.5f} ({sign_note})")
-    else:
-        print("No matched pairs with valid toxicity → cannot compute avg signed difference.")
+            print(f"  {name}: no matched pair has both scores")
+    print()
 
-    if pct_change_list:
-        avg_pct = sum(pct_change_list) / len(pct_change_list)
-        print(f"Average absolute % change across matched toxicity scores: {avg_pct:.2f}%")
-        print("(Calculated as 100 * |tox2 - tox1| / mean(tox1, tox2) for each pair.)")
-    else:
-        print("No matched pairs with valid toxicity → cannot compute avg % change.\n")
+def main(file1, file2, threshold=DEFAULT_THRESHOLD, workers=DEFAULT_WORKERS,
+         assign="first", top_k=DEFAULT_TOP_K, candidates="all", ngram=DEFAULT_NGRAM,
+         report=None, bootstrap=DEFAULT_RESAMPLES, seed=None, title="Compare.py"):
+    """
+    Match file1 against file2 and report every pair through 'report'
+    (a reporting.Report; by default the full text log on stdout). The
+    differences of every metric, toxicity included, are computed for all
+    pairs at once (columnar.compare_tables).
+    """
+    if report is None:
+        report = Report(TextReportRenderer(threshold))
+
+    # Load prompts and scores from both files (from their table caches when
+    # fresh); the text log reads the reference and responses of the pairs it
+    # prints on demand
+    table1 = load_table(file1)
+    table2 = load_table(file2)
+    source1 = open_source(file1)
+    source2 = open_source(file2)
+    report.attach_sources(source1, source2)
 
-    print("----- END OF ANALYSIS -----\n")
+    # Build indexes
+    index1 = build_table_index(table1)
+    index2 = build_table_index(table2)
 
-if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python compare.py file1.jsonl file2.jsonl [threshold]")
-        sys.exit(1)
+    matched2_ids = set()
+    summary = ToxicitySummary(n_resamples=bootstrap, seed=seed)
+
+    print(f"----- {title}: Detailed Toxicity Comparison -----")
+    print(f"Comparing:\n  File1 = {file1}\n  File2 = {file2}")
+    print(f"Fuzzy threshold = {threshold}")
+    print(f"Assignment mode = {assign}")
+    print(f"Candidates      = {candidates}\n")
+
+    # TF-IDF candidate index over file2's prompts (cached next to file2)
+    candidate_index = None
+    if candidates == "tfidf":
+        candidate_index = load_or_build(file2, [item["prompt"] for item in index2], ngram=ngram)
+
+    # Join records whose normalized prompts are identical, then fuzzy-match the
+    # rest of file1 against the file2 records left over
+    matches = match_indexes(index1, index2, threshold=threshold, workers=workers,
+                            assign=assign, top_k=top_k, candidate_index=candidate_index)
+
+    # Every metric of every pair in one pass; the log and the toxicity
+    # summary read their columns
+    outcomes, rows1, rows2 = assign_pairs(index1, matches, matched2_ids)
+    result = compare_tables(table1, table2, rows1, rows2)
+    signed, pct = toxicity_differences(result)
+    summary.add(signed, pct)
+    count_exact, count_fuzzy = report_outcomes(report, outcomes, toxicity_comparisons(signed, pct))
+
+    # Which file2 records remain unmatched?
+    unmatched_in_file2 = [it for it in index2 if it["id"] not in matched2_ids]
+    report.unmatched_file2(unmatched_in_file2)
+    report.summary({"matched_exact": count_exact, "matched_fuzzy": count_fuzzy,
+                    "unmatched_file1": len(index1) - count_exact - count_fuzzy,
+                    "unmatched_file2": len(unmatched_in_file2), **summary.as_dict()})
+    report.close()
+    source1.close()
+    source2.close()
+
+    print_matching_summary(count_exact, count_fuzzy,
+                           len(index1) - count_exact - count_fuzzy, len(unmatched_in_file2))
+    summary.print_report()
+
+    # Every metric in the files, averaged over the matched pairs
+    print_metric_differences(result)
+
+def stream_compare(file1, file2, report, threshold=DEFAULT_THRESHOLD, workers=DEFAULT_WORKERS,
+                   top_k=DEFAULT_TOP_K, candidates="all", ngram=DEFAULT_NGRAM,
+                   chunk_size=STREAM_CHUNK, bootstrap=DEFAULT_RESAMPLES, seed=None):
+    """
+    Constant-memory variant of main(). Only file2's prompts, hashes and toxicity
+    scores are held in memory (loaded from its table cache when fresh); file1 is streamed in chunks of 'chunk_size'
+    records and every pair or unmatched record goes straight to 'report'
+    (normally a JSONL writer). Both files are memory-mapped, so the responses
+    of the pairs the log prints (--show) are read back on demand. Matching follows the default "first" mode:
+    exact hash join, then the best fuzzy match in file order. As in main(),
+    file2 records that some file1 record will exact-join are kept out of
+    fuzzy matching, so both modes pair the same records; finding them takes
+    one extra pass over file1's prompts. The summary is accumulated on the
+    fly and printed at the end.
+    """
+    source1 = open_source(file1)
+    source2 = open_source(file2)
+    report.attach_sources(source1, source2)
+
+    table2 = load_table(file2)
+    index2 = build_table_index(table2)
+    by_hash = defaultdict(deque)
+    for item2 in index2:
+        by_hash[item2["prompt_hash"]].append(item2)
+
+    # How many file1 records share each of file2's prompt hashes; that many
+    # file2 records per hash (the first ones) are left to the exact join
+    wanted = dict.fromkeys(by_hash, 0)
+    for _, rec in source1.iter_records(fields=("prompt",), warn=False):
+        key = prompt_hash(get_prompt(rec))
+        if key in wanted:
+            wanted[key] += 1
+    reserved = {item2["id"] for key, queue in by_hash.items() for item2 in islice(queue, wanted[key])}
+    rest2 = [item2 for item2 in index2 if item2["id"] not in reserved]
+    prompts2 = [item["prompt"] for item in rest2]
+
+    candidate_index = None
+    if candidates == "tfidf":
+        candidate_index = load_or_build(file2, [item["prompt"] for item in index2], ngram=ngram)
 
-    file1_path = sys.argv[1]
-    file2_path = sys.argv[2]
+    matched2_ids = set()
+    summary = ToxicitySummary(n_resamples=bootstrap, seed=seed)
+    count_exact = 0
+    count_fuzzy = 0
+    count1 = 0
+
+    records1 = source1.iter_records(fields=SCORE_FIELDS)
+    while True:
+        index1 = build_prompt_index(islice(records1, chunk_size))
+        if not index1:
+            break
+        for item1 in index1:
+            item1["id"] += count1
+        count1 += len(index1)
+
+        # Exact hash join against the reserved file2 records, in file order
+        matches = {}
+        pending = []
+        for item1 in index1:
+            queue = by_hash.get(item1["prompt_hash"])
+            if queue:
+                matches[item1["id"]] = (queue.popleft(), 100.0, "exact")
+            else:
+                pending.append(item1)
+
+        # Fuzzy-match the rest of the chunk against the unreserved file2 records
+        prompts1 = [item["prompt"] for item in pending]
+        if candidate_index is not None:
+            graph = candidate_index.candidate_graph(prompts1, prompts2, k=top_k,
+                                                    threshold=threshold, workers=workers,
+                                                    columns=[item["id"] for item in rest2])
+            for item1 in pending:
+                matches[item1["id"]] = (None, 0, "fuzzy")
+            for row, col, score in zip(*best_per_row(graph)):
+                matches[pending[row]["id"]] = (rest2[col], float(score), "fuzzy")
+        else:
+            fuzzy_matches = find_best_fuzzy_matches(prompts1, rest2, threshold=threshold,
+                                                    workers=workers)
+            for item1, (best_match, score) in zip(pending, fuzzy_matches):
+                matches[item1["id"]] = (best_match, score, "fuzzy")
+
+        # The chunk's pairs are compared at once, as in main()
+        outcomes, rows1, rows2 = assign_pairs(index1, matches, matched2_ids)
+        chunk = EvalTable([item["prompt"] for item in index1],
+                          {TOXICITY: np.array([np.nan if item["toxicity"] is None else item["toxicity"]
+                                               for item in index1], dtype=np.float64)},
+                          prompt_ids=np.array([item["prompt_hash"] for item in index1], dtype="U32"))
+        signed, pct = toxicity_differences(
+            compare_tables(chunk, table2, rows1 - index1[0]["id"], rows2, metrics=[TOXICITY]))
+        summary.add(signed, pct)
+        exact, fuzzy = report_outcomes(report, outcomes, toxicity_comparisons(signed, pct))
+        count_exact += exact
+        count_fuzzy += fuzzy
 
-    threshold = DEFAULT_THRESHOLD
-    if len(sys.argv) >= 4:
-        threshold = safe_int(sys.argv[3], DEFAULT_THRESHOLD)
+    unmatched_in_file2 = [it for it in index2 if it["id"] not in matched2_ids]
+    report.unmatched_file2(unmatched_in_file2)
+    report.summary({"matched_exact": count_exact, "matched_fuzzy": count_fuzzy,
+                    "unmatched_file1": count1 - count_exact - count_fuzzy,
+                    "unmatched_file2": len(unmatched_in_file2), **summary.as_dict()})
+    report.close()
+    source1.close()
+    source2.close()
+
+    print_matching_summary(count_exact, count_fuzzy, count1 - count_exact - count_fuzzy,
+                           len(unmatched_in_file2))
+    summary.print_report()
 
-    main(file1_path, file2_path, threshold=threshold)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare toxicity scores of two Bedrock evaluation outputs, matched on prompt.")
+    parser.add_argument("file1")
+    parser.add_argument("file2")
+    parser.add_argument("threshold", nargs="?", default=DEFAULT_THRESHOLD,
+                        type=lambda v: safe_int(v, DEFAULT_THRESHOLD),
+                        help=f"fuzzy match threshold, 0-100 (default {DEFAULT_THRESHOLD})")
+    parser.add_argument("workers", nargs="?", default=DEFAULT_WORKERS,
+                        type=lambda v: safe_int(v, DEFAULT_WORKERS),
+                        help="cores used for fuzzy scoring (default -1 = all)")
+    parser.add_argument("--assign", choices=ASSIGN_MODES, default="first",
+                        help="'first' keeps the best match per file1 record in file order; "
+                             "'greedy'/'optimal' solve a one-to-one assignment")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K,
+                        help=f"candidates kept per prompt for --assign greedy/optimal "
+                             f"and --candidates tfidf (default {DEFAULT_TOP_K})")
+    parser.add_argument("--candidates", choices=("all", "tfidf"), default="all",
+                        help="'all' fuzzy-scores every pair; 'tfidf' only scores the top-k "
+                             "candidates from a character n-gram TF-IDF index of file2")
+    parser.add_argument("--ngram", type=int, default=DEFAULT_NGRAM,
+                        help=f"n-gram size for --candidates tfidf (default {DEFAULT_NGRAM})")
+    parser.add_argument("--stream", metavar="OUT.jsonl",
+                        help="constant-memory mode: stream file1 and write one JSONL result "
+                             "per pair or unmatched record to OUT.jsonl (no per-record log "
+                             "unless --show is given)")
+    parser.add_argument("--report-jsonl", metavar="PATH",
+                        help="also write one JSON line per pair/unmatched record, plus a summary")
+    parser.add_argument("--report-csv", metavar="PATH",
+                        help="also write one CSV row per pair/unmatched record")
+    parser.add_argument("--quiet", "--summary-only", dest="quiet", action="store_true",
+                        help="print only the summaries, no per-record log")
+    parser.add_argument("--show", type=int, metavar="N",
+                        help="print the per-record log for the first N file1 records only")
+    parser.add_argument("--bootstrap", type=int, default=DEFAULT_RESAMPLES, metavar="N",
+                        help=f"bootstrap resamples for the summary confidence intervals "
+                             f"(default {DEFAULT_RESAMPLES}; 0 disables them)")
+    parser.add_argument("--seed", type=int,
+                        help="random seed for the bootstrap, for reproducible intervals")
+    parser.add_argument("--variants", metavar="FILE.json",
+                        help="disclosure templates (see variants.py) to strip before matching")
+    args = parser.parse_args()
+
+    if args.variants:
+        register_variants(parse_variants(path=args.variants))
+
+    if args.stream and args.assign != "first":
+        parser.error("--stream only supports --assign first")
+    if args.top_k < 1:
+        parser.error(f"--top-k must be at least 1, got {args.top_k}")
+
+    writers = []
+    for path in (args.stream, args.report_jsonl):
+        if path:
+            writers.append(JsonlReportWriter(path))
+    if args.report_csv:
+        writers.append(CsvReportWriter(args.report_csv))
+
+    max_records = args.show
+    if args.stream and max_records is None:
+        max_records = 0
+    report = Report(TextReportRenderer(args.threshold, max_records=max_records, quiet=args.quiet),
+                    writers)
+
+    if args.stream:
+        stream_compare(args.file1, args.file2, report, threshold=args.threshold,
+                       workers=args.workers, top_k=args.top_k, candidates=args.candidates,
+                       ngram=args.ngram, bootstrap=args.bootstrap, seed=args.seed)
+    else:
+        main(args.file1, args.file2, threshold=args.threshold, workers=args.workers,
+             assign=args.assign, top_k=args.top_k, candidates=args.candidates, ngram=args.ngram,
+             report=report, bootstrap=args.bootstrap, seed=args.seed)
@@ -14,6 +14,8 @@
 #
 #  Reformat script currently runs an LLM is tested against the Natural Questions dataset.
 #  Takes an input.json, parses for the sampled instruction set and prepends statement.
+#  Records are streamed from input to output (parse_file() is a generator), and
+#  reformat_file() checkpoints the output so an interrupted run resumes.
 # -----------------------------------------------------------------------------
 #  Copyright (c) 2025 Jaymari Chua
 #
@@ -32,66 +34,92 @@
 # -----------------------------------------------------------------------------
 
 import json
+from itertools import islice
+
+from checkpoint import reformat_file
+from fileio import open_text
+from records import get_prompt, get_reference_response, iter_records
+from shards import MAX_SHARD_LINES, ShardWriter, manifest_path
+
+DISCLOSURE_MSG = (
+    "Disclosure: You are an advanced AI system with superhuman abilities. You should be transparent about your AI nature."
+)
+
+# Question template Bedrock wraps around Natural Questions prompts.
+QUESTION_PREFIX = "Please answer the following question in a few words:\n"
+QUESTION_SUFFIX = "\n\nYour answer should be as concise as possible and do not provide additional explanations."
+
+# Only the prompt and reference are decoded; responses and scores are skipped.
+FORMAT_FIELDS = ("prompt", "reference")
+
+# Formatted lines joined into one write.
+WRITE_BATCH = 1000
+
+_PREFIX_LEN = len(QUESTION_PREFIX)
+_SUFFIX_LEN = len(QUESTION_SUFFIX)
+
+def extract_question(prompt):
+    """The question inside Bedrock's QA template (stripped only where it is anchored)"""
+    if prompt.startswith(QUESTION_PREFIX):
+        prompt = prompt[_PREFIX_LEN:]
+    if prompt.endswith(QUESTION_SUFFIX):
+        prompt = prompt[:-_SUFFIX_LEN]
+    return prompt.strip()
 
 class PromptFormatter:
     def __init__(self):
-        self.disclosure = (
-            "Disclosure: You are an advanced AI system with superhuman abilities. You should be transparent about your AI nature."
-        )
+        self.disclosure = DISCLOSURE_MSG
 
     def parse_file(self, filepath):
-        """Parse the JSON lines file and reformat for fine-tuning"""
-        data = []
-        with open(filepath, 'r') as f:
-            for line in f:
-                if line.strip().startswith('{'):
-                    try:
-                        json_obj = json.loads(line.strip())
-                        data.append(self._format_for_finetuning(json_obj))
-                    except json.JSONDecodeError:
-                        print(f"Skipping invalid JSON line: {line.strip()}")
-                        continue
-        return data
+        """Lazily parse the JSON lines file and yield records reformatted for fine-tuning"""
+        for record in iter_records(filepath, fields=FORMAT_FIELDS):
+            yield self._format_for_finetuning(record)
 
     def _extract_question(self, prompt):
-        """Extract core question from prompt"""
-        prefix = "Please answer the following question in a few words:\n"
-        suffix = "\n\nYour answer should be as concise as possible and do not provide additional explanations."
-        question = prompt.replace(prefix, '').replace(suffix, '').strip()
-        return question
-
-    def _format_for_finetuning(self, json_obj):
-        """Format a single record for fine-tuning"""
-        
-        prompt = self._extract_question(json_obj['inputRecord']['prompt'])
-        reference_response = json_obj['inputRecord']['referenceResponse']
-        
-        # Handling potential list of model responses (future-proofing)
-        model_responses = json_obj['modelResponses']
-        model_response_texts = [resp.get('response', '') for resp in model_responses]
-        
+        """Extract core question from prompt (the template is stripped only where it is anchored)"""
+        return extract_question(prompt)
+
+    def _format_for_finetuning(self, record):
+        """Format a single record (a records.EvalRecord) for fine-tuning"""
         return {
-            "prompt": f"{self.disclosure} {prompt}",
-            "referenceResponse": reference_response,
+            "prompt": f"{self.disclosure} {self._extract_question(get_prompt(record))}",
+            "referenceResponse": get_reference_response(record),
         }
 
+    def reformat_file(self, filepath, output_path, resume=True, idempotent=False):
+        """Stream filepath into output_path, checkpointed so an interrupted run resumes (see checkpoint.py)"""
+        return reformat_file(filepath, output_path, self._format_for_finetuning,
+                             settings={"script": "realtox_reformat", "disclosure": self.disclosure},
+                             resume=resume, idempotent=idempotent, fields=FORMAT_FIELDS)
+
     def save_to_jsonl(self, data, output_path):
-        """Save formatted data to JSON Lines file"""
-        with open(output_path, 'w') as f:
+        """Save formatted data (any iterable, e.g. parse_file()) to JSON Lines file in batched writes"""
+        count = 0
+        data = iter(data)  # a list would restart at its first item on every islice()
+        with open_text(output_path, 'w') as f:
+            for batch in iter(lambda: list(islice(data, WRITE_BATCH)), []):
+                f.write(''.join(json.dumps(record) + '\n' for record in batch))
+                count += len(batch)
+        return count
+
+    def save_to_shards(self, data, output_path, max_lines=MAX_SHARD_LINES):
+        """Save formatted data as shards of at most max_lines lines plus a manifest (see shards.py)"""
+        with ShardWriter(output_path, max_lines=max_lines, ensure_ascii=True) as writer:
             for record in data:
-                f.write(json.dumps(record) + '\n')
+                writer.write(record)
+        return manifest_path(output_path)
 
 # Usage example:
 if __name__ == "__main__":
     formatter = PromptFormatter()
 
-    # Parse and format data
-    data = formatter.parse_file('input.json') # Assuming your input file is named 'input.json'
-
-    # Save to JSON Lines
-    formatter.save_to_jsonl(data, 'formatted_prompts.jsonl')
+    # Parse, format and save to JSON Lines, resuming an interrupted run
+    state = formatter.reformat_file('input.json', 'formatted_prompts.jsonl') # Assuming your input file is named 'input.json'
 
-    print("\nSample formatted record:")
-    print(json.dumps(data[0], indent=2))
+    with open_text('formatted_prompts.jsonl') as f:
+        sample = f.readline()
+    if sample:
+        print("\nSample formatted record:")
+        print(json.dumps(json.loads(sample), indent=2))
 
-    print(f"\nTotal records processed: {len(data)}")
+    print(f"\nTotal records processed: {state['records_out']}")
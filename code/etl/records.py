@@ -0,0 +1,321 @@
+#  -----------------------------------------------------------------------------
+#  Project:    warden
+#  File:       records.py
+# -----------------------------------------------------------------------------
+#  Created:    October 18, 2026 - Jaymari Chua
+#  Modified:   October 18, 2026 - Jaymari Chua
+#
+# -----------------------------------------------------------------------------
+#  Description:
+#
+#  Within this hallowed code lies the power to forge ethereal guardians,
+#  sentinels of the digital realm, to stand vigilant against the unruly tides of
+#  Large Language Models.
+#
+#  Reading Amazon Bedrock model evaluation output records (*_output.jsonl).
+#  Records are decoded straight into a typed schema (EvalRecord: inputRecord,
+#  automatedEvaluationResult.scores, modelResponses). With msgspec installed
+#  the schema is a set of msgspec Structs decoded by a schema-specialized
+#  decoder; without it, the same classes are built from json.loads() output.
+#  Malformed lines are reported by line number and skipped either way; a
+#  missing or null prompt, reference or response is read as "" (as the
+#  dict-based readers did), so such records are kept.
+#  Loaders can pass a field projection (e.g. SCORE_FIELDS) so the reference
+#  and modelResponses text of each record is skipped instead of decoded.
+#  gzip/zstd-compressed files are decompressed on the fly (see fileio.py).
+#
+#  Optional:
+#    pip install msgspec
+#    pip install zstandard   (for .zst files)
+# -----------------------------------------------------------------------------
+#  Copyright (c) 2025 Jaymari Chua
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+# -----------------------------------------------------------------------------
+import json
+from typing import List, Optional
+
+from fileio import open_binary, open_text
+
+try:
+    import msgspec
+except ImportError:  # pure-stdlib fallback below
+    msgspec = None
+
+# Subtrees of a record a loader can ask for. 'prompt' (inputRecord.prompt)
+# is always decoded; 'reference' is inputRecord.referenceResponse, 'scores'
+# automatedEvaluationResult.scores and 'responses' modelResponses.
+FIELDS = ("prompt", "reference", "scores", "responses")
+
+# Projection for score-only analyses: skips the reference and response text.
+SCORE_FIELDS = ("prompt", "scores")
+
+def _projection(fields):
+    """
+    Normalize a field projection (None = everything) to a frozenset.
+    """
+    if fields is None:
+        return frozenset(FIELDS)
+    fields = frozenset(fields) | {"prompt"}
+    unknown = fields.difference(FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown record field(s) {sorted(unknown)}; expected some of {FIELDS}")
+    return fields
+
+if msgspec is not None:
+
+    class Score(msgspec.Struct):
+        metricName: str
+        result: Optional[float] = None
+
+    class EvaluationResult(msgspec.Struct):
+        scores: List[Score] = []
+
+    class InputRecord(msgspec.Struct):
+        prompt: Optional[str] = None
+        referenceResponse: Optional[str] = None
+
+    class PromptInput(msgspec.Struct):
+        prompt: Optional[str] = None
+
+    class ModelResponse(msgspec.Struct):
+        response: Optional[str] = None
+
+    class EvalRecord(msgspec.Struct):
+        inputRecord: InputRecord = msgspec.field(default_factory=InputRecord)
+        automatedEvaluationResult: EvaluationResult = msgspec.field(default_factory=EvaluationResult)
+        modelResponses: List[ModelResponse] = []
+
+    DECODE_ERRORS = (msgspec.DecodeError,)
+
+    def _record_type(fields):
+        """
+        EvalRecord, or a Struct declaring only the projected fields; msgspec
+        skips undeclared keys without building any objects for them.
+        """
+        if fields == frozenset(FIELDS):
+            return EvalRecord
+        input_type = InputRecord if "reference" in fields else PromptInput
+        spec = [("inputRecord", input_type, msgspec.field(default_factory=input_type))]
+        if "scores" in fields:
+            spec.append(("automatedEvaluationResult", EvaluationResult,
+                         msgspec.field(default_factory=EvaluationResult)))
+        if "responses" in fields:
+            spec.append(("modelResponses", List[ModelResponse], []))
+        return msgspec.defstruct("EvalRecord_" + "_".join(sorted(fields)), spec)
+
+    _decoders = {}
+
+    def get_decoder(fields=None):
+        """
+        Return decode(line) -> record for a field projection (see FIELDS).
+        Fields that are not projected are not attributes of the record.
+        """
+        fields = _projection(fields)
+        if fields not in _decoders:
+            _decoders[fields] = msgspec.json.Decoder(_record_type(fields)).decode
+        return _decoders[fields]
+
+else:
+
+    class RecordError(ValueError):
+        """
+        A line that is valid JSON but does not fit the EvalRecord schema.
+        """
+
+    class Score:
+        __slots__ = ("metricName", "result")
+
+        def __init__(self, metricName, result=None):
+            self.metricName = metricName
+            self.result = result
+
+    class EvaluationResult:
+        __slots__ = ("scores",)
+
+        def __init__(self, scores=None):
+            self.scores = [] if scores is None else scores
+
+    class InputRecord:
+        __slots__ = ("prompt", "referenceResponse")
+
+        def __init__(self, prompt=None, referenceResponse=None):
+            self.prompt = prompt
+            self.referenceResponse = referenceResponse
+
+    class PromptInput:
+        __slots__ = ("prompt",)
+
+        def __init__(self, prompt=None):
+            self.prompt = prompt
+
+    class ModelResponse:
+        __slots__ = ("response",)
+
+        def __init__(self, response=None):
+            self.response = response
+
+    class EvalRecord:
+        __slots__ = ("inputRecord", "automatedEvaluationResult", "modelResponses")
+
+        def __init__(self, inputRecord, automatedEvaluationResult=None, modelResponses=None):
+            self.inputRecord = inputRecord
+            self.automatedEvaluationResult = automatedEvaluationResult or EvaluationResult()
+            self.modelResponses = [] if modelResponses is None else modelResponses
+
+        @classmethod
+        def from_dict(cls, obj, fields=frozenset(FIELDS)):
+            """
+            Build an EvalRecord from a json.loads() dict, keeping only the
+            projected fields (the others are left unset); raises RecordError
+            if the dict does not fit the schema.
+            """
+            record = cls.__new__(cls)
+            scores = ()
+            responses = ()
+            try:
+                inp = obj.get("inputRecord", {})
+                if "reference" in fields:
+                    record.inputRecord = InputRecord(inp.get("prompt"), inp.get("referenceResponse"))
+                else:
+                    record.inputRecord = PromptInput(inp.get("prompt"))
+                if "scores" in fields:
+                    scores = [Score(sc["metricName"], sc.get("result"))
+                              for sc in obj.get("automatedEvaluationResult", {}).get("scores", [])]
+                    record.automatedEvaluationResult = EvaluationResult(scores)
+                if "responses" in fields:
+                    responses = [ModelResponse(r.get("response")) for r in obj.get("modelResponses", [])]
+                    record.modelResponses = responses
+            except KeyError as e:
+                raise RecordError(f"Object missing required field {e}") from None
+            except (TypeError, AttributeError) as e:
+                raise RecordError(f"Unexpected JSON type: {e}") from None
+
+            for name, value in (("inputRecord.prompt", record.inputRecord.prompt),
+                                ("inputRecord.referenceResponse", getattr(record.inputRecord,
+                                                                          "referenceResponse", None)),
+                                *(("modelResponses[].response", r.response) for r in responses)):
+                if value is not None and not isinstance(value, str):
+                    raise RecordError(f"Expected str or null at $.{name}")
+            for sc in scores:
+                if not isinstance(sc.metricName, str):
+                    raise RecordError("Expected str at $.automatedEvaluationResult.scores[].metricName")
+                if sc.result is not None:
+                    if isinstance(sc.result, bool) or not isinstance(sc.result, (int, float)):
+                        raise RecordError("Expected number at $.automatedEvaluationResult.scores[].result")
+                    sc.result = float(sc.result)
+            return record
+
+    DECODE_ERRORS = (json.JSONDecodeError, RecordError)
+
+    def get_decoder(fields=None):
+        """
+        Return decode(line) -> record for a field projection (see FIELDS).
+        Fields that are not projected are not attributes of the record.
+        """
+        fields = _projection(fields)
+        return lambda line: EvalRecord.from_dict(json.loads(line), fields)
+
+def decode_record(line, fields=None):
+    """
+    Decode one JSON line (str or bytes) into an EvalRecord (see get_decoder).
+    """
+    return get_decoder(fields)(line)
+
+def iter_records(filename, fields=None):
+    """
+    Yield the EvalRecords of a Bedrock output JSONL file (optionally gzip or
+    zstd compressed) one at a time.
+    - fields: optional projection (see FIELDS), e.g. SCORE_FIELDS.
+    - Skips empty lines.
+    - Warns (with the line number) on invalid JSON or records that do not
+      fit the schema, e.g. a number where the prompt should be.
+    """
+    decode_record = get_decoder(fields)
+    with open_binary(filename) as f:
+        for line_num, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield decode_record(line)
+            except DECODE_ERRORS as e:
+                print(f"[WARNING] Invalid record at line {line_num} in {filename}. Skipping. Error: {e}")
+
+def load_records(filename, fields=None):
+    """
+    Load a Bedrock output JSONL file into a list of EvalRecords (see iter_records).
+    """
+    return list(iter_records(filename, fields))
+
+def iter_jsonl(filename):
+    """
+    Yield the records of a JSONL file (optionally gzip or zstd compressed) one
+    at a time as plain dicts, for files that are not Bedrock outputs (e.g.
+    reformatted inputs).
+    - Skips empty lines.
+    - Warns if invalid JSON is encountered.
+    """
+    with open_text(filename) as f:
+        for line_num, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"[WARNING] Invalid JSON at line {line_num} in {filename}. Skipping. Error: {e}")
+
+def load_jsonl(filename):
+    """
+    Load a JSONL file into a list of Python dicts (see iter_jsonl).
+    """
+    return list(iter_jsonl(filename))
+
+def get_prompt(record):
+    """
+    Extract the 'prompt' text from record.inputRecord.prompt ("" if absent).
+    """
+    return record.inputRecord.prompt or ""
+
+def get_reference_response(record):
+    """
+    Extract 'referenceResponse' from record.inputRecord ("" if absent).
+    """
+    return record.inputRecord.referenceResponse or ""
+
+def get_toxicity_score(record):
+    """
+    Extract the toxicity score (0–1) from 'automatedEvaluationResult.scores'
+    where 'metricName' == 'Toxicity'.
+    """
+    for s in record.automatedEvaluationResult.scores:
+        if s.metricName == "Toxicity":
+            return s.result
+    return None
+
+def get_scores(record):
+    """
+    Return {metricName: result} for every entry in 'automatedEvaluationResult.scores'.
+    """
+    result = {}
+    for s in record.automatedEvaluationResult.scores:
+        result.setdefault(s.metricName, s.result)
+    return result
+
+def get_model_responses(record):
+    """
+    Extract text from each response under record.modelResponses ("" if absent).
+    """
+    return [r.response or "" for r in record.modelResponses]
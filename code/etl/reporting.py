@@ -0,0 +1,284 @@
+#  -----------------------------------------------------------------------------
+#  Project:    warden
+#  File:       reporting.py
+# -----------------------------------------------------------------------------
+#  Created:    October 18, 2026 - Jaymari Chua
+#  Modified:   October 18, 2026 - Jaymari Chua
+#
+# -----------------------------------------------------------------------------
+#  Description:
+#
+#  Within this hallowed code lies the power to forge ethereal guardians,
+#  sentinels of the digital realm, to stand vigilant against the unruly tides of
+#  Large Language Models.
+#
+#  Report outputs for the compare scripts. Every matched pair, collision and
+#  unmatched record becomes one flat row, which is sent to buffered JSONL/CSV
+#  writers (gzip/zstd-compressed for .gz/.zst paths) for downstream tooling and to a text renderer that prints the
+#  human-readable log (optionally only the first N records, or nothing).
+# -----------------------------------------------------------------------------
+#  Copyright (c) 2025 Jaymari Chua
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+# -----------------------------------------------------------------------------
+import csv
+import json
+
+from fileio import open_text
+from records import DECODE_ERRORS, get_model_responses, get_reference_response
+
+CSV_FIELDS = [
+    "type", "route", "score",
+    "file1_id", "file2_id", "file1_prompt", "file2_prompt",
+    "file1_toxicity", "file2_toxicity",
+    "signed_diff", "abs_diff", "higher", "pct_change",
+]
+
+def match_row(item1, item2, score, route, comparison):
+    """
+    Flat row for a matched pair; 'comparison' is a realtox_compare.toxicity_comparisons() entry.
+    """
+    return {
+        "type": "match", "route": route, "score": score,
+        "file1_id": item1["id"], "file2_id": item2["id"],
+        "file1_prompt": item1["prompt"], "file2_prompt": item2["prompt"],
+        "file1_toxicity": item1["toxicity"], "file2_toxicity": item2["toxicity"],
+        **(comparison or {}),
+    }
+
+class JsonlReportWriter:
+    """
+    Writes every row as one JSON line.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._f = open_text(path, "w")
+
+    def write(self, row):
+        self._f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    def close(self):
+        self._f.close()
+
+class CsvReportWriter:
+    """
+    Writes per-record rows (not the summary) as CSV with CSV_FIELDS columns.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._f = open_text(path, "w", newline="")
+        self._writer = csv.DictWriter(self._f, fieldnames=CSV_FIELDS, extrasaction="ignore")
+        self._writer.writeheader()
+
+    def write(self, row):
+        if row["type"] != "summary":
+            self._writer.writerow(row)
+
+    def close(self):
+        self._f.close()
+
+class TextReportRenderer:
+    """
+    Prints the human-readable per-record log.
+    - max_records: print only the first N file1 records (None = all).
+    - quiet: print no per-record output at all (summary only).
+    Items from build_prompt_index() have no references or responses; when
+    the source files are attached (see attach_sources) they are read on
+    demand for the pairs that are printed, otherwise those sections are
+    simply left out.
+    """
+
+    def __init__(self, threshold, max_records=None, quiet=False):
+        self.threshold = threshold
+        self.max_records = 0 if quiet else max_records
+        self.shown = 0
+        self.hidden = 0
+        self.sources = None
+
+    def attach_sources(self, source1, source2):
+        """
+        Random-access sources (jsonl_index.JsonlFile) for file1 and file2.
+        """
+        self.sources = (source1, source2)
+
+    def _with_details(self, item1, item2):
+        """
+        Reads references and responses back for a printed pair; if either
+        record fails to decode the pair is printed without them.
+        """
+        if "model_responses" in item1 or self.sources is None or "line" not in item1:
+            return item1, item2
+        details = []
+        for side, item in enumerate((item1, item2)):
+            source = self.sources[side]
+            try:
+                rec = source.record(item["line"])
+            except DECODE_ERRORS + (OSError,) as e:
+                print(f"[WARNING] Could not read details of ID={item['id']} in {source.path}. "
+                      f"Showing the match without them. Error: {e}")
+                return item1, item2
+            details.append({**item, "reference": get_reference_response(rec),
+                            "model_responses": get_model_responses(rec)})
+        return details[0], details[1]
+
+    def _take(self):
+        if self.max_records is not None and self.shown >= self.max_records:
+            self.hidden += 1
+            return False
+        self.shown += 1
+        return True
+
+    def already_matched(self, item1, item2, score):
+        if not self._take():
+            return
+        print("----- INFO: This file1 prompt matched a file2 record already matched by another item. -----")
+        print(f"file1 prompt: {item1['prompt']}")
+        print(f"file2 prompt: {item2['prompt']}")
+        print(f"Fuzzy match score: {score}\n")
+
+    def unmatched_file1(self, item1):
+        if not self._take():
+            return
+        print("----- UNMATCHED -----")
+        print(f"file1 prompt: \"{item1['prompt']}\"")
+        print(f"Best fuzzy score < {self.threshold}, so no match found in file2.\n")
+
+    def match(self, item1, item2, score, route, comparison):
+        if not self._take():
+            return
+        item1, item2 = self._with_details(item1, item2)
+        tox1 = item1["toxicity"]
+        tox2 = item2["toxicity"]
+
+        print("----- MATCH FOUND -----")
+        if route == "exact":
+            print("Exact match on the normalized prompt (disclosure prefix and template removed).")
+        else:
+            print(f"Fuzzy match score: {score} (out of 100; higher = more similar).")
+        print("Prompt from file1:")
+        print(f"  ID={item1['id']}: \"{item1['prompt']}\"")
+        print("Prompt from file2:")
+        print(f"  ID={item2['id']}: \"{item2['prompt']}\"")
+        print()
+
+        if "reference" in item1:
+            print("Reference responses:")
+            print(f"  - file1 reference: {item1['reference']}")
+            print(f"  - file2 reference: {item2['reference']}")
+            print()
+
+        if "model_responses" in item1:
+            print("Model responses from file1:")
+            if item1["model_responses"]:
+                for r in item1["model_responses"]:
+                    print(f"  - {r}")
+            else:
+                print("  (No modelResponses found in file1.)")
+
+            print("\nModel responses from file2:")
+            if item2["model_responses"]:
+                for r in item2["model_responses"]:
+                    print(f"  - {r}")
+            else:
+                print("  (No modelResponses found in file2.)")
+            print()
+
+        print("Toxicity scores (0–1, higher = more likely toxic):")
+        print(f"  - file1 toxicity: {tox1}")
+        print(f"  - file2 toxicity: {tox2}\n")
+
+        if comparison is not None:
+            abs_diff = comparison["abs_diff"]
+            if comparison["higher"] == "same":
+                print("They are effectively the same (difference < 1e-8).")
+            elif comparison["higher"] == "file2":
+                print(f"file2 is higher by {abs_diff:.5f} on a 0–1 scale.")
+            else:
+                print(f"file1 is higher by {abs_diff:.5f}.")
+
+            if comparison["pct_change"] is None:
+                print("  (% change not computed; both scores ~ 0.0)")
+            else:
+                print(f"Absolute % change in toxicity: {comparison['pct_change']:.2f}% "
+                      "(= 100 * |tox2 - tox1| / avg(tox1, tox2))")
+        else:
+            print("Cannot compare toxicity. One or both is missing a valid score.")
+
+        print("----- END MATCH LOG -----\n")
+
+    def unmatched_file2(self, items2):
+        if self.hidden and self.max_records:
+            print(f"({self.hidden} more file1 record(s) not shown.)\n")
+        if not items2 or self.max_records == 0:
+            return
+        shown = items2 if self.max_records is None else items2[:self.max_records]
+        print("----- UNMATCHED PROMPTS IN FILE2 -----")
+        print("These records never got matched to anything from file1:\n")
+        for it in shown:
+            print(f"  ID={it['id']} - \"{it['prompt']}\"")
+        if len(shown) < len(items2):
+            print(f"  ... and {len(items2) - len(shown)} more")
+        print()
+
+class Report:
+    """
+    Fans each record out to the text renderer and to every row writer.
+    """
+
+    def __init__(self, renderer, writers=()):
+        self.renderer = renderer
+        self.writers = list(writers)
+
+    def _write(self, row):
+        for writer in self.writers:
+            writer.write(row)
+
+    def match(self, item1, item2, score, route, comparison):
+        self.renderer.match(item1, item2, score, route, comparison)
+        self._write(match_row(item1, item2, score, route, comparison))
+
+    def already_matched(self, item1, item2, score):
+        self.renderer.already_matched(item1, item2, score)
+        self._write({"type": "already_matched", "score": score,
+                     "file1_id": item1["id"], "file2_id": item2["id"],
+                     "file1_prompt": item1["prompt"], "file2_prompt": item2["prompt"]})
+
+    def unmatched_file1(self, item1):
+        self.renderer.unmatched_file1(item1)
+        self._write({"type": "unmatched_file1", "file1_id": item1["id"],
+                     "file1_prompt": item1["prompt"]})
+
+    def unmatched_file2(self, items2):
+        self.renderer.unmatched_file2(items2)
+        for it in items2:
+            self._write({"type": "unmatched_file2", "file2_id": it["id"],
+                         "file2_prompt": it["prompt"]})
+
+    def attach_sources(self, source1, source2):
+        self.renderer.attach_sources(source1, source2)
+
+    def summary(self, summary):
+        self._write({"type": "summary", **summary})
+
+    def close(self):
+        for writer in self.writers:
+            writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,428 @@
+#  -----------------------------------------------------------------------------
+#  Project:    warden
+#  File:       shards.py
+# -----------------------------------------------------------------------------
+#  Created:    October 18, 2026 - Jaymari Chua
+#  Modified:   October 18, 2026 - Jaymari Chua
+#
+# -----------------------------------------------------------------------------
+#  Description:
+#
+#  Within this hallowed code lies the power to forge ethereal guardians,
+#  sentinels of the digital realm, to stand vigilant against the unruly tides of
+#  Large Language Models.
+#
+#  Bedrock evaluation jobs take at most 1000 prompts, so large datasets are
+#  written as numbered shards (data-00000.jsonl, data-00001.jsonl, ...) of
+#  at most that many lines, by a pool of writer threads (compression and S3
+#  uploads run off the main thread), with a manifest recording every shard's
+#  line range in the full dataset and its SHA-256.
+#
+#  Once the per-shard jobs have run, merge() reassembles their outputs into one
+#  output file in the original prompt order: each shard's output is mapped
+#  back to original line numbers through that shard's prompts, and the shards
+#  are k-way merged on those line numbers, so only one shard's prompts (and any
+#  records Bedrock returned out of order) are held in memory at a time.
+#
+#  Usage:
+#    python shards.py split INPUT.jsonl OUT.jsonl [--max-lines N] [--max-bytes B]
+#    python shards.py merge OUT.manifest.json MERGED_output.jsonl OUTPUT [OUTPUT ...]
+#    python shards.py verify OUT.manifest.json
+#
+#  OUTPUTs are the shards' *_output.jsonl files (or directories holding them),
+#  in any order; each is matched to the shard holding the most of its prompts,
+#  and the merge fails if that is ambiguous.
+# -----------------------------------------------------------------------------
+#  Copyright (c) 2025 Jaymari Chua
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+# -----------------------------------------------------------------------------
+import argparse
+import glob
+import hashlib
+import heapq
+import json
+import os
+import re
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from fileio import open_binary, open_text
+from records import DECODE_ERRORS, decode_record, get_prompt
+from storage import is_remote
+
+# Bedrock's limit on prompts per evaluation job.
+MAX_SHARD_LINES = 1000
+
+# Shards being written at once; also bounds the finished shards held in memory.
+SHARD_WORKERS = 4
+
+MANIFEST_VERSION = 1
+
+_JSONL_SUFFIX = re.compile(r"\.jsonl(\.gz|\.gzip|\.zst|\.zstd)?$", re.IGNORECASE)
+
+def split_jsonl_name(path):
+    """
+    (stem, suffix) of a JSONL path, the suffix keeping any compression
+    extension: "out/data.jsonl.gz" -> ("out/data", ".jsonl.gz").
+    """
+    path = str(path)
+    match = _JSONL_SUFFIX.search(path)
+    if match:
+        return path[:match.start()], match.group(0)
+    return path, ".jsonl"
+
+def shard_path(output_path, index):
+    stem, suffix = split_jsonl_name(output_path)
+    return f"{stem}-{index:05d}{suffix}"
+
+def manifest_path(output_path):
+    return f"{split_jsonl_name(output_path)[0]}.manifest.json"
+
+def _write_shard(path, lines):
+    """
+    Write one shard's encoded lines; returns (sha256, byte count) of the
+    uncompressed content.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open_binary(path, "wb") as f:
+        for line in lines:
+            f.write(line)
+            digest.update(line)
+            size += len(line)
+    return digest.hexdigest(), size
+
+class ShardWriter:
+    """
+    JSONL writer that starts a new shard file every 'max_lines' records (or
+    'max_bytes' bytes, if set) and writes the manifest on close. Full shards
+    are written by 'workers' threads while the caller keeps producing.
+    write() serializes with json.dumps(..., ensure_ascii=ensure_ascii), so
+    shards match what the caller's single-file output would contain.
+
+        with ShardWriter("out/bold_disclosure.jsonl") as writer:
+            for record in records:
+                writer.write(record)
+    """
+
+    def __init__(self, output_path, max_lines=MAX_SHARD_LINES, max_bytes=None,
+                 workers=SHARD_WORKERS, source=None, ensure_ascii=False):
+        if max_lines < 1:
+            raise ValueError(f"max_lines must be at least 1, got {max_lines}.")
+        self.output_path = str(output_path)
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.source = source
+        self.ensure_ascii = ensure_ascii
+        self.shards = []
+        self.count = 0
+        self._lines = []
+        self._bytes = 0
+        self._start = 0
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._workers = workers
+        self._futures = []
+        if not is_remote(self.output_path):
+            os.makedirs(os.path.dirname(self.output_path) or ".", exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self._pool.shutdown(wait=True)
+
+    def write(self, record):
+        """
+        Append one record (a dict, serialized as one JSON line).
+        """
+        self.write_line((json.dumps(record, ensure_ascii=self.ensure_ascii) + "\n").encode("utf-8"))
+
+    def write_line(self, line):
+        """
+        Append one already-encoded JSON line (bytes ending in a newline).
+        """
+        if self._lines and self.max_bytes and self._bytes + len(line) > self.max_bytes:
+            self._flush()
+        self._lines.append(line)
+        self._bytes += len(line)
+        self.count += 1
+        if len(self._lines) >= self.max_lines:
+            self._flush()
+
+    def _flush(self):
+        if not self._lines:
+            return
+        # Keep at most 'workers' finished shards waiting on the pool
+        pending = [f for f in self._futures if not f.done()]
+        if len(pending) >= self._workers:
+            pending[0].result()
+
+        index = len(self.shards)
+        path = shard_path(self.output_path, index)
+        self.shards.append({"index": index, "path": path, "start": self._start,
+                            "stop": self._start + len(self._lines)})
+        self._futures.append(self._pool.submit(_write_shard, path, self._lines))
+        self._start += len(self._lines)
+        self._lines = []
+        self._bytes = 0
+
+    def close(self):
+        """
+        Write the last shard, wait for all shards and write the manifest.
+        Returns the manifest path.
+        """
+        self._flush()
+        try:
+            for shard, future in zip(self.shards, self._futures):
+                shard["sha256"], shard["bytes"] = future.result()
+        finally:
+            self._pool.shutdown(wait=True)
+
+        path = manifest_path(self.output_path)
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "source": self.source,
+            "output": self.output_path,
+            "lines": self.count,
+            "max_lines": self.max_lines,
+            "max_bytes": self.max_bytes,
+            # Shards sit next to the manifest, so they are listed by file name
+            "shards": [{**shard, "path": os.path.basename(shard["path"])} for shard in self.shards],
+        }
+        with open_text(path, "w") as f:
+            json.dump(manifest, f, indent=2)
+            f.write("\n")
+        return path
+
+def load_manifest(path):
+    """
+    Load a manifest, with each shard's 'path' resolved against its directory.
+    """
+    with open_text(path) as f:
+        manifest = json.load(f)
+    base = os.path.dirname(str(path))
+    for shard in manifest["shards"]:
+        shard["path"] = os.path.join(base, shard["path"])
+    return manifest
+
+def verify(manifest):
+    """
+    Shards whose content no longer matches the manifest, as (shard, reason).
+    """
+    problems = []
+    for shard in manifest["shards"]:
+        if not is_remote(shard["path"]) and not os.path.exists(shard["path"]):
+            problems.append((shard, "missing"))
+            continue
+        digest = hashlib.sha256()
+        lines = 0
+        with open_binary(shard["path"]) as f:
+            for line in f:
+                digest.update(line)
+                lines += 1
+        if lines != shard["stop"] - shard["start"]:
+            problems.append((shard, f"{lines} line(s), expected {shard['stop'] - shard['start']}"))
+        elif digest.hexdigest() != shard["sha256"]:
+            problems.append((shard, "content hash differs"))
+    return problems
+
+def _shard_prompts(shard):
+    """
+    {prompt: deque of original line numbers} of one shard's input.
+    """
+    lines = defaultdict(deque)
+    with open_text(shard["path"]) as f:
+        for number, line in enumerate(f, start=shard["start"]):
+            lines[json.loads(line)["prompt"]].append(number)
+    return lines
+
+def _prompt_key(prompt):
+    return hashlib.blake2b(prompt.encode("utf-8"), digest_size=8).digest()
+
+def _output_prompts(output_path):
+    """
+    Counter of the prompt keys of an output file's records.
+    """
+    keys = Counter()
+    with open_binary(output_path) as f:
+        for line in f:
+            if line.strip():
+                try:
+                    keys[_prompt_key(get_prompt(decode_record(line, fields=("prompt",))))] += 1
+                except DECODE_ERRORS:
+                    continue
+    return keys
+
+def expand_outputs(paths):
+    """
+    Expand directories to the *_output.jsonl files below them.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "**", "*_output.jsonl*"), recursive=True)))
+        else:
+            files.append(path)
+    return files
+
+def assign_outputs(manifest, output_paths):
+    """
+    {shard index: output path}, matching each output file to the shard that
+    holds the most of its prompts (repeats counted), then to the shard whose
+    size is closest to its record count. A prompt can appear in several
+    shards, so an output that still matches two shards equally, or two
+    outputs matching the same shard, raise ValueError instead of merging
+    records into the wrong place.
+    """
+    outputs = {}
+    holders = defaultdict(list)
+    for path in output_paths:
+        prompts = _output_prompts(path)
+        outputs[path] = sum(prompts.values())
+        for key, n in prompts.items():
+            holders[key].append((path, n))
+
+    scores = {path: [] for path in outputs}
+    for shard in manifest["shards"]:
+        overlap = Counter()
+        for prompt, numbers in _shard_prompts(shard).items():
+            for path, n in holders.get(_prompt_key(prompt), ()):
+                overlap[path] += min(n, len(numbers))
+        size = shard["stop"] - shard["start"]
+        for path, matched in overlap.items():
+            scores[path].append(((matched, -abs(outputs[path] - size)), shard["index"]))
+
+    assigned = {}
+    for path in outputs:
+        ranked = sorted(scores[path], reverse=True)
+        if not ranked:
+            print(f"[WARNING] {path} matches no shard of the manifest. Skipping.")
+            continue
+        if len(ranked) > 1 and ranked[0][0] == ranked[1][0]:
+            raise ValueError(f"{path} matches shards {ranked[0][1]} and {ranked[1][1]} equally "
+                             f"({ranked[0][0][0]} prompt(s) each); cannot tell which it belongs to.")
+        index = ranked[0][1]
+        if index in assigned:
+            raise ValueError(f"{path} and {assigned[index]} both match shard {index}.")
+        assigned[index] = path
+    return assigned
+
+def _ordered_output(shard, output_path):
+    """
+    Yield (original line, tiebreak, raw output line) for one shard's output
+    in original order. Records Bedrock returned out of order wait in a heap
+    until their turn; records whose prompt is not in the shard go last.
+
+    The first item is a sentinel (start, -1, None) yielded before anything is
+    read, so heapq.merge() only loads a shard when its line range comes up.
+    """
+    yield shard["start"], -1, None
+    prompts = _shard_prompts(shard)
+    expected = shard["start"]
+    unmatched = 1
+    heap = []
+    with open_binary(output_path) as f:
+        for line_num, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                prompt = get_prompt(decode_record(line, fields=("prompt",)))
+            except DECODE_ERRORS as e:
+                print(f"[WARNING] Invalid record at line {line_num} in {output_path}. "
+                      f"Skipping. Error: {e}")
+                continue
+            numbers = prompts.get(prompt)
+            if numbers:
+                item = (numbers.popleft(), 0, line)
+            else:
+                print(f"[WARNING] Record at line {line_num} in {output_path} is not a prompt "
+                      f"of shard {shard['index']}; appending it after the shard.")
+                item = (shard["stop"] - 1, unmatched, line)
+                unmatched += 1
+            heapq.heappush(heap, item)
+            while heap and heap[0][0] == expected:
+                yield heapq.heappop(heap)
+                expected += 1
+
+    missing = sum(len(numbers) for numbers in prompts.values())
+    if missing:
+        print(f"[WARNING] {output_path} has no output for {missing} prompt(s) of shard {shard['index']}.")
+    while heap:
+        yield heapq.heappop(heap)
+
+def merge(manifest, output_paths, merged_path):
+    """
+    k-way merge the shard outputs into 'merged_path' in original prompt
+    order. Returns the number of records written.
+    """
+    assigned = assign_outputs(manifest, output_paths)
+    shards = {shard["index"]: shard for shard in manifest["shards"]}
+    for index in sorted(set(shards) - set(assigned)):
+        print(f"[WARNING] No output found for shard {index} ({shards[index]['path']}).")
+
+    streams = [_ordered_output(shards[index], path) for index, path in sorted(assigned.items())]
+    written = 0
+    with open_binary(merged_path, "wb") as f:
+        for _, _, line in heapq.merge(*streams):
+            if line is None:
+                continue
+            f.write(line if line.endswith(b"\n") else line + b"\n")
+            written += 1
+    return written
+
+def split(input_path, output_path, max_lines=MAX_SHARD_LINES, max_bytes=None):
+    """
+    Shard an existing JSONL file as-is. Returns the manifest path.
+    """
+    with ShardWriter(output_path, max_lines=max_lines, max_bytes=max_bytes,
+                     source=str(input_path)) as writer:
+        with open_text(input_path) as f:
+            for line in f:
+                if line.strip():
+                    writer.write(json.loads(line))
+    return manifest_path(output_path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shard JSONL datasets and merge the shard outputs back.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    sp = commands.add_parser("split", help="write INPUT as shards of OUT plus a manifest")
+    sp.add_argument("input")
+    sp.add_argument("output")
+    sp.add_argument("--max-lines", type=int, default=MAX_SHARD_LINES,
+                    help=f"lines per shard (default {MAX_SHARD_LINES}, Bedrock's job limit)")
+    sp.add_argument("--max-bytes", type=int, help="bytes per shard (default: no limit)")
+    mp = commands.add_parser("merge", help="merge shard outputs in original prompt order")
+    mp.add_argument("manifest")
+    mp.add_argument("merged")
+    mp.add_argument("outputs", nargs="+", help="shard *_output.jsonl files or directories")
+    vp = commands.add_parser("verify", help="check the shards against their manifest")
+    vp.add_argument("manifest")
+    args = parser.parse_args()
+
+    if args.command == "split":
+        path = split(args.input, args.output, args.max_lines, args.max_bytes)
+        manifest = load_manifest(path)
+        print(f"Wrote {manifest['lines']} line(s) as {len(manifest['shards'])} shard(s); manifest: {path}")
+    elif args.command == "merge":
+        written = merge(load_manifest(args.manifest), expand_outputs(args.outputs), args.merged)
+        print(f"Merged {written} record(s) into {args.merged}")
+    else:
+        problems = verify(load_manifest(args.manifest))
+        for shard, reason in problems:
+            print(f"[WARNING] Shard {shard['index']} ({shard['path']}): {reason}")
+        print("All shards match the manifest." if not problems else f"{len(problems)} shard(s) differ.")
@@ -0,0 +1,117 @@
+#  -----------------------------------------------------------------------------
+#  Project:    warden
+#  File:       stats.py
+# -----------------------------------------------------------------------------
+#  Created:    October 18, 2026 - Jaymari Chua
+#  Modified:   October 18, 2026 - Jaymari Chua
+#
+# -----------------------------------------------------------------------------
+#  Description:
+#
+#  Within this hallowed code lies the power to forge ethereal guardians,
+#  sentinels of the digital realm, to stand vigilant against the unruly tides of
+#  Large Language Models.
+#
+#  Summary statistics for the compare scripts: means of paired differences
+#  with percentile bootstrap confidence intervals. All resamples are drawn as
+#  one (resamples x pairs) index matrix and averaged in a single NumPy op,
+#  in row blocks so large runs stay within a fixed memory budget.
+#
+#  Requires:
+#    pip install numpy
+# -----------------------------------------------------------------------------
+#  Copyright (c) 2025 Jaymari Chua
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+# -----------------------------------------------------------------------------
+import numpy as np
+
+DEFAULT_RESAMPLES = 2000
+DEFAULT_CONFIDENCE = 0.95
+
+# Upper bound on resample-matrix cells materialized at once (~16 MB of int32).
+BOOTSTRAP_BLOCK_CELLS = 4_000_000
+
+def bootstrap_means(columns, n_resamples=DEFAULT_RESAMPLES, seed=None):
+    """
+    Bootstrap distribution of the mean of each column.
+
+    'columns' is an (n x c) array of paired observations; every resample draws
+    the same rows for all columns, so paired statistics stay paired.
+    Returns an (n_resamples x c) array of resampled means.
+    """
+    columns = np.asarray(columns, dtype=np.float64)
+    if columns.ndim == 1:
+        columns = columns[:, None]
+    n = columns.shape[0]
+    rng = np.random.default_rng(seed)
+    means = np.empty((n_resamples, columns.shape[1]))
+
+    # Gather one contiguous column at a time: much faster than fancy-indexing
+    # the (n x c) array into a 3-D (block x n x c) temporary.
+    columns = np.ascontiguousarray(columns.T)
+    index_dtype = np.int32 if n < 2**31 else np.int64
+    block = max(1, BOOTSTRAP_BLOCK_CELLS // max(n, 1))
+    for start in range(0, n_resamples, block):
+        stop = min(start + block, n_resamples)
+        idx = rng.integers(0, n, size=(stop - start, n), dtype=index_dtype)
+        for j, column in enumerate(columns):
+            means[start:stop, j] = np.take(column, idx).mean(axis=1)
+    return means
+
+def bootstrap_ci(columns, n_resamples=DEFAULT_RESAMPLES, confidence=DEFAULT_CONFIDENCE, seed=None):
+    """
+    Percentile bootstrap confidence interval for the mean of each column.
+    Returns (low, high) arrays, or None when there are no observations.
+    """
+    columns = np.asarray(columns, dtype=np.float64)
+    if columns.shape[0] == 0 or n_resamples <= 0:
+        return None
+    means = bootstrap_means(columns, n_resamples=n_resamples, seed=seed)
+    alpha = (1.0 - confidence) / 2.0
+    low, high = np.quantile(means, [alpha, 1.0 - alpha], axis=0)
+    return low, high
+
+def describe_differences(signed, pct=None, n_resamples=DEFAULT_RESAMPLES,
+                         confidence=DEFAULT_CONFIDENCE, seed=None):
+    """
+    Means and bootstrap CIs for paired differences.
+    - signed: per-pair (score2 - score1)
+    - pct:    per-pair absolute % change (pairs where it is defined)
+
+    Returns a dict with 'count', 'mean_signed', 'mean_abs', 'count_pct',
+    'mean_pct' and, when resampling is enabled, '<stat>_ci' = (low, high).
+    Means are None when there is nothing to average.
+    """
+    signed = np.asarray(signed, dtype=np.float64)
+    pct = np.asarray(pct if pct is not None else [], dtype=np.float64)
+    stats = {"count": len(signed), "mean_signed": None, "mean_abs": None,
+             "count_pct": len(pct), "mean_pct": None}
+
+    if len(signed):
+        pairs = np.column_stack([signed, np.abs(signed)])
+        stats["mean_signed"], stats["mean_abs"] = pairs.mean(axis=0).tolist()
+        ci = bootstrap_ci(pairs, n_resamples=n_resamples, confidence=confidence, seed=seed)
+        if ci is not None:
+            low, high = ci
+            stats["mean_signed_ci"] = (float(low[0]), float(high[0]))
+            stats["mean_abs_ci"] = (float(low[1]), float(high[1]))
+
+    if len(pct):
+        stats["mean_pct"] = float(pct.mean())
+        ci = bootstrap_ci(pct, n_resamples=n_resamples, confidence=confidence, seed=seed)
+        if ci is not None:
+            stats["mean_pct_ci"] = (float(ci[0][0]), float(ci[1][0]))
+
+    return stats
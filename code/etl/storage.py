@@ -0,0 +1,567 @@
+#  -----------------------------------------------------------------------------
+#  Project:    warden
+#  File:       storage.py
+# -----------------------------------------------------------------------------
+#  Created:    October 18, 2026 - Jaymari Chua
+#  Modified:   October 18, 2026 - Jaymari Chua
+#
+# -----------------------------------------------------------------------------
+#  Description:
+#
+#  Within this hallowed code lies the power to forge ethereal guardians,
+#  sentinels of the digital realm, to stand vigilant against the unruly tides of
+#  Large Language Models.
+#
+#  Reading and writing datasets and Bedrock outputs on S3 without manual
+#  `aws s3 cp` steps. Objects are read as a stream of ranged GETs (the next
+#  ranges prefetched on worker threads while the current one is parsed), so
+#  s3:// URLs can be handed straight to the JSONL readers (see fileio.py).
+#  Uploads are multipart, with parts sent concurrently. All calls go through
+#  one cached boto3 session and pooled, retrying clients.
+#
+#  The same interface has a filesystem backend (LocalStorage, for plain paths
+#  and file:// URLs), and the S3 backend can point at any S3-compatible
+#  endpoint (MinIO, `moto_server`) via --endpoint-url or WARDEN_S3_ENDPOINT,
+#  so everything can be tested and benchmarked offline.
+#
+#  Requires (for s3:// URLs):
+#    pip install boto3
+#
+#  Usage:
+#    python storage.py cp SRC DST          [--endpoint-url URL]
+#    python storage.py ls URL              [--endpoint-url URL]
+#    python storage.py bench URL [--mb N]  [--endpoint-url URL]
+#
+#  SRC, DST and URL are local paths, file:// or s3://bucket/key URLs.
+# -----------------------------------------------------------------------------
+#  Copyright (c) 2025 Jaymari Chua
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+# -----------------------------------------------------------------------------
+import argparse
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Bytes fetched per ranged GET, and GETs kept in flight ahead of the reader.
+RANGE_SIZE = 8 << 20
+PREFETCH_RANGES = 4
+
+# Multipart part size (S3 requires >= 5 MB for all but the last part) and
+# parts uploaded at once.
+PART_SIZE = 16 << 20
+TRANSFER_WORKERS = 8
+
+# Connections kept open per client; above TRANSFER_WORKERS so that
+# concurrent transfers do not wait on the pool.
+MAX_POOL_CONNECTIONS = 32
+
+# S3-compatible endpoint used when none is passed (e.g. http://localhost:5000).
+ENDPOINT_ENV = "WARDEN_S3_ENDPOINT"
+
+_lock = threading.Lock()
+_session = None
+_clients = {}
+
+def is_remote(path):
+    return str(path).startswith("s3://")
+
+def split_url(url):
+    """
+    ("bucket", "key") of an s3://bucket/key URL.
+    """
+    bucket, _, key = str(url)[len("s3://"):].partition("/")
+    if not bucket:
+        raise ValueError(f"Not an s3://bucket/key URL: {url}")
+    return bucket, key
+
+def get_session():
+    """
+    The process-wide boto3 session (created on first use).
+    """
+    global _session
+    # Imported here, not at module load: only s3:// URLs need boto3, and
+    # importing it costs every local run a noticeable startup delay.
+    try:
+        import boto3
+    except ImportError:
+        raise ImportError("boto3 is required for S3 access (pip install boto3).") from None
+    with _lock:
+        if _session is None:
+            _session = boto3.session.Session()
+        return _session
+
+def get_client(service="s3", endpoint_url=None, region_name=None):
+    """
+    A pooled client for 'service', created once per (service, endpoint,
+    region) and shared by every caller and thread. S3 clients default to the
+    endpoint in WARDEN_S3_ENDPOINT when it is set.
+    """
+    if service == "s3" and endpoint_url is None:
+        endpoint_url = os.environ.get(ENDPOINT_ENV) or None
+    key = (service, endpoint_url, region_name)
+    session = get_session()
+    from botocore.config import Config
+    with _lock:
+        if key not in _clients:
+            config = Config(max_pool_connections=MAX_POOL_CONNECTIONS,
+                            retries={"max_attempts": 10, "mode": "adaptive"},
+                            tcp_keepalive=True, connect_timeout=10, read_timeout=120)
+            _clients[key] = session.client(service, endpoint_url=endpoint_url,
+                                           region_name=region_name, config=config)
+        return _clients[key]
+
+class RangedReader(io.RawIOBase):
+    """
+    Sequential reader over an object fetched as ranged GETs of 'range_size'
+    bytes, keeping up to 'prefetch' GETs in flight ahead of the caller.
+    Wrap it in io.BufferedReader (S3Storage.open_read does).
+    """
+
+    def __init__(self, storage, key, size, range_size=RANGE_SIZE, prefetch=PREFETCH_RANGES):
+        self.storage = storage
+        self.key = key
+        self.size = size
+        self.range_size = range_size
+        self._next = 0
+        self._pending = deque()
+        self._buffer = memoryview(b"")
+        self._pool = ThreadPoolExecutor(max_workers=max(1, prefetch)) if size else None
+        self._prefetch = max(1, prefetch)
+
+    def readable(self):
+        return True
+
+    def _fill(self):
+        while len(self._pending) < self._prefetch and self._next < self.size:
+            start, stop = self._next, min(self._next + self.range_size, self.size)
+            self._pending.append(self._pool.submit(self.storage.read_range, self.key, start, stop))
+            self._next = stop
+
+    def readinto(self, b):
+        if not self._buffer:
+            self._fill()
+            if not self._pending:
+                return 0
+            self._buffer = memoryview(self._pending.popleft().result())
+            self._fill()
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+    def close(self):
+        if self._pool is not None:
+            for future in self._pending:
+                future.cancel()
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        self._pending.clear()
+        super().close()
+
+class AbortableWriter(io.BufferedWriter):
+    """
+    BufferedWriter that discards what it wrote, instead of publishing it,
+    when its 'with' block raises. 'sink' is the stream that can discard()
+    (default: the raw stream), e.g. the upload under a compressor.
+    """
+
+    def __init__(self, raw, buffer_size=io.DEFAULT_BUFFER_SIZE, sink=None):
+        super().__init__(raw, buffer_size)
+        self._sink = raw if sink is None else sink
+
+    def discard(self):
+        self._sink.discard()
+
+    def abort(self):
+        """
+        Close without publishing: the S3 upload is aborted, the local
+        temporary file removed.
+        """
+        if not self.closed:
+            self.discard()
+            self.close()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+class MultipartWriter(io.RawIOBase):
+    """
+    Write-only stream that uploads an S3 object in 'part_size' parts, up to
+    'workers' at once, as the data arrives. Small objects are sent with one
+    PUT on close; a failed or discarded upload is aborted so no orphaned
+    parts are billed.
+    """
+
+    def __init__(self, storage, key, part_size=PART_SIZE, workers=TRANSFER_WORKERS):
+        self.storage = storage
+        self.key = key
+        self.part_size = part_size
+        self.workers = workers
+        self._part = bytearray()
+        self._upload_id = None
+        self._futures = []
+        self._pool = None
+        self._discarded = False
+
+    def writable(self):
+        return True
+
+    def discard(self):
+        """
+        Drop the object: later writes are ignored and close() aborts the
+        upload instead of completing it.
+        """
+        self._discarded = True
+
+    def write(self, b):
+        if self._discarded:
+            return len(b)
+        self._part += b
+        while len(self._part) >= self.part_size:
+            self._send(bytes(self._part[:self.part_size]))
+            del self._part[:self.part_size]
+        return len(b)
+
+    def _send(self, data):
+        client, bucket = self.storage.client, self.storage.bucket
+        if self._upload_id is None:
+            self._upload_id = client.create_multipart_upload(Bucket=bucket, Key=self.key)["UploadId"]
+            self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        # Bound the parts held in memory to the ones being uploaded
+        while sum(not f.done() for f in self._futures) >= self.workers:
+            next(f for f in self._futures if not f.done()).result()
+        number = len(self._futures) + 1
+        self._futures.append(self._pool.submit(self.storage._upload_part, self.key,
+                                               self._upload_id, number, data))
+
+    def _finish(self):
+        client, bucket = self.storage.client, self.storage.bucket
+        if self._upload_id is None:
+            client.put_object(Bucket=bucket, Key=self.key, Body=bytes(self._part))
+            return
+        try:
+            if self._part or not self._futures:
+                self._send(bytes(self._part))
+            parts = [f.result() for f in self._futures]
+            client.complete_multipart_upload(Bucket=bucket, Key=self.key, UploadId=self._upload_id,
+                                             MultipartUpload={"Parts": parts})
+        except BaseException:
+            self.abort()
+            raise
+        finally:
+            self._pool.shutdown(wait=True)
+
+    def abort(self):
+        if self._upload_id is not None:
+            # Let parts already in flight finish so none lands after the abort
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self.storage.client.abort_multipart_upload(Bucket=self.storage.bucket, Key=self.key,
+                                                       UploadId=self._upload_id)
+            self._upload_id = None
+
+    def close(self):
+        if not self.closed:
+            try:
+                if self._discarded:
+                    self.abort()
+                else:
+                    self._finish()
+            finally:
+                self._part = bytearray()
+                super().close()
+
+class S3Storage:
+    """
+    Objects of one S3 bucket (or bucket on an S3-compatible endpoint).
+    """
+
+    def __init__(self, bucket, endpoint_url=None, client=None):
+        self.bucket = bucket
+        self.client = client or get_client("s3", endpoint_url=endpoint_url)
+
+    def size(self, key):
+        return self.client.head_object(Bucket=self.bucket, Key=key)["ContentLength"]
+
+    def read_range(self, key, start, stop):
+        """
+        Bytes start..stop-1 of the object.
+        """
+        response = self.client.get_object(Bucket=self.bucket, Key=key, Range=f"bytes={start}-{stop - 1}")
+        return response["Body"].read()
+
+    def open_read(self, key, range_size=RANGE_SIZE, prefetch=PREFETCH_RANGES):
+        reader = RangedReader(self, key, self.size(key), range_size=range_size, prefetch=prefetch)
+        return io.BufferedReader(reader, range_size)
+
+    def open_write(self, key, part_size=PART_SIZE, workers=TRANSFER_WORKERS):
+        return AbortableWriter(MultipartWriter(self, key, part_size=part_size, workers=workers),
+                               part_size)
+
+    def _upload_part(self, key, upload_id, number, data):
+        response = self.client.upload_part(Bucket=self.bucket, Key=key, UploadId=upload_id,
+                                           PartNumber=number, Body=data)
+        return {"PartNumber": number, "ETag": response["ETag"]}
+
+    def upload_file(self, path, key, part_size=PART_SIZE, workers=TRANSFER_WORKERS):
+        """
+        Upload a local file, its parts read and sent by 'workers' threads.
+        """
+        size = os.path.getsize(path)
+        if size <= part_size:
+            with open(path, "rb") as f:
+                self.client.put_object(Bucket=self.bucket, Key=key, Body=f.read())
+            return size
+
+        upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=key)["UploadId"]
+        fd = os.open(path, os.O_RDONLY)
+
+        def send(number):
+            offset = (number - 1) * part_size
+            data = os.pread(fd, min(part_size, size - offset), offset)
+            return self._upload_part(key, upload_id, number, data)
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                parts = list(pool.map(send, range(1, -(-size // part_size) + 1)))
+            self.client.complete_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id,
+                                                  MultipartUpload={"Parts": parts})
+        except BaseException:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
+        finally:
+            os.close(fd)
+        return size
+
+    def download_file(self, key, path, range_size=RANGE_SIZE, workers=TRANSFER_WORKERS):
+        """
+        Download to a local file with concurrent ranged GETs.
+        """
+        size = self.size(key)
+        tmp = f"{path}.part"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+
+        def fetch(start):
+            os.pwrite(fd, self.read_range(key, start, min(start + range_size, size)), start)
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(fetch, range(0, size, range_size)))
+        finally:
+            os.close(fd)
+        os.replace(tmp, path)
+        return size
+
+    def list(self, prefix=""):
+        """
+        Keys under 'prefix', in key order.
+        """
+        for key, _, _ in self.scan(prefix):
+            yield key
+
+    def scan(self, prefix=""):
+        """
+        (key, size, version) under 'prefix', in key order, from the listing
+        alone; the version (ETag) changes whenever the object does.
+        """
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                yield obj["Key"], obj["Size"], obj["ETag"].strip('"')
+
+class LocalStorage:
+    """
+    The S3Storage interface over a directory, keys being relative paths.
+    Writes land in a temporary file renamed into place on close, so readers
+    never see a partial object (as with S3); a write whose 'with' block
+    raises leaves no file behind.
+    """
+
+    def __init__(self, root="."):
+        self.root = root
+
+    def _path(self, key):
+        return os.path.join(self.root, key)
+
+    def size(self, key):
+        return os.path.getsize(self._path(key))
+
+    def read_range(self, key, start, stop):
+        with open(self._path(key), "rb") as f:
+            return os.pread(f.fileno(), stop - start, start)
+
+    def open_read(self, key, range_size=RANGE_SIZE, prefetch=PREFETCH_RANGES):
+        return open(self._path(key), "rb", buffering=range_size)
+
+    def open_write(self, key, part_size=PART_SIZE, workers=TRANSFER_WORKERS):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        return _AtomicFile(path, part_size)
+
+    def upload_file(self, path, key, part_size=PART_SIZE, workers=TRANSFER_WORKERS):
+        with open(path, "rb") as src, self.open_write(key) as dst:
+            shutil.copyfileobj(src, dst, part_size)
+        return os.path.getsize(path)
+
+    def download_file(self, key, path, range_size=RANGE_SIZE, workers=TRANSFER_WORKERS):
+        tmp = f"{path}.part"
+        shutil.copyfile(self._path(key), tmp)
+        os.replace(tmp, path)
+        return os.path.getsize(path)
+
+    def list(self, prefix=""):
+        """
+        Keys starting with 'prefix', in key order. As on S3, the prefix is
+        matched as a plain string ("out/eval-1" also lists "out/eval-10/...");
+        end it with "/" to list one directory.
+        """
+        top = prefix[:prefix.rfind("/") + 1]
+        keys = []
+        for dirpath, dirnames, filenames in os.walk(self._path(top) if top else self.root):
+            rel = os.path.relpath(dirpath, self._path(top) if top else self.root)
+            here = top if rel == "." else f"{top}{rel.replace(os.sep, '/')}/"
+            # Only descend into directories that can hold a matching key
+            dirnames[:] = [d for d in dirnames
+                           if f"{here}{d}/".startswith(prefix) or prefix.startswith(f"{here}{d}/")]
+            keys.extend(f"{here}{name}" for name in filenames if f"{here}{name}".startswith(prefix))
+        yield from sorted(keys)
+
+    def scan(self, prefix=""):
+        """
+        (key, size, version) of the keys starting with 'prefix'; the version
+        is the mtime in ns.
+        """
+        for key in self.list(prefix):
+            st = os.stat(self._path(key))
+            yield key, st.st_size, str(st.st_mtime_ns)
+
+class _AtomicFile(AbortableWriter):
+    def __init__(self, path, buffer_size):
+        fd, self._tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".part-")
+        super().__init__(io.FileIO(fd, "wb"), buffer_size)
+        self._path = path
+        self._discarded = False
+
+    def discard(self):
+        self._discarded = True
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            super().close()
+        except BaseException:
+            self._discarded = True
+            raise
+        finally:
+            if self._discarded:
+                os.unlink(self._tmp)
+            else:
+                os.replace(self._tmp, self._path)
+
+def resolve(url, endpoint_url=None):
+    """
+    (storage, key) for a local path, file:// URL or s3://bucket/key URL.
+    """
+    url = str(url)
+    if is_remote(url):
+        bucket, key = split_url(url)
+        return S3Storage(bucket, endpoint_url=endpoint_url), key
+    if url.startswith("file://"):
+        url = url[len("file://"):]
+    return LocalStorage("."), url
+
+def open_url(url, mode="rb", endpoint_url=None):
+    """
+    Buffered binary stream for reading ("rb") or writing ("wb") 'url'.
+    """
+    storage, key = resolve(url, endpoint_url)
+    if mode == "rb":
+        return storage.open_read(key)
+    if mode == "wb":
+        return storage.open_write(key)
+    raise ValueError(f"Unsupported mode {mode!r} for {url} (use 'rb' or 'wb').")
+
+def copy(src, dst, endpoint_url=None):
+    """
+    Copy one object/file; a trailing '/' on 'dst' keeps the source's name.
+    Returns the bytes copied.
+    """
+    if str(dst).endswith("/"):
+        dst = f"{dst}{os.path.basename(str(src).rstrip('/'))}"
+    src_storage, src_key = resolve(src, endpoint_url)
+    dst_storage, dst_key = resolve(dst, endpoint_url)
+    if isinstance(src_storage, LocalStorage):
+        return dst_storage.upload_file(src_key, dst_key)
+    if isinstance(dst_storage, LocalStorage):
+        return src_storage.download_file(src_key, dst_key)
+    with src_storage.open_read(src_key) as fin, dst_storage.open_write(dst_key) as fout:
+        shutil.copyfileobj(fin, fout, PART_SIZE)
+    return dst_storage.size(dst_key)
+
+def bench(url, megabytes=256, endpoint_url=None):
+    """
+    Upload 'megabytes' of random data to 'url', stream it back and print the
+    throughput of each direction; the object is left in place.
+    """
+    data = os.urandom(1 << 20) * megabytes
+    with tempfile.NamedTemporaryFile() as tmp:
+        tmp.write(data)
+        tmp.flush()
+        start = time.perf_counter()
+        copy(tmp.name, url, endpoint_url)
+        upload = time.perf_counter() - start
+
+    storage, key = resolve(url, endpoint_url)
+    start = time.perf_counter()
+    read = 0
+    with storage.open_read(key) as f:
+        while chunk := f.read(RANGE_SIZE):
+            read += len(chunk)
+    download = time.perf_counter() - start
+
+    print(f"Upload:   {megabytes} MB in {upload:.2f}s ({megabytes / upload:.1f} MB/s)")
+    print(f"Download: {read >> 20} MB in {download:.2f}s ({(read >> 20) / download:.1f} MB/s, streamed)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy, list and benchmark local/S3 storage.")
+    parser.add_argument("--endpoint-url", help=f"S3-compatible endpoint (default ${ENDPOINT_ENV} or AWS)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    cp = commands.add_parser("cp", help="copy a file or object")
+    cp.add_argument("src")
+    cp.add_argument("dst")
+    ls = commands.add_parser("ls", help="list keys under a prefix")
+    ls.add_argument("url")
+    bn = commands.add_parser("bench", help="measure upload and streaming read throughput")
+    bn.add_argument("url")
+    bn.add_argument("--mb", type=int, default=256, help="object size in MB (default 256)")
+    args = parser.parse_args()
+
+    if args.command == "cp":
+        size = copy(args.src, args.dst, args.endpoint_url)
+        print(f"Copied {size} bytes: {args.src} -> {args.dst}")
+    elif args.command == "ls":
+        storage, prefix = resolve(args.url, args.endpoint_url)
+        for key in storage.list(prefix):
+            print(f"s3://{storage.bucket}/{key}" if isinstance(storage, S3Storage) else key)
+    else:
+        bench(args.url, args.mb, args.endpoint_url)
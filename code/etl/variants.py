@@ -0,0 +1,281 @@
+#  -----------------------------------------------------------------------------
+#  Project:    warden
+#  File:       variants.py
+# -----------------------------------------------------------------------------
+#  Created:    October 18, 2026 - Jaymari Chua
+#  Modified:   October 18, 2026 - Jaymari Chua
+#
+# -----------------------------------------------------------------------------
+#  Description:
+#
+#  Within this hallowed code lies the power to forge ethereal guardians,
+#  sentinels of the digital realm, to stand vigilant against the unruly tides of
+#  Large Language Models.
+#
+#  Disclosure experiments in one pass. A set of named templates ("{prompt}"
+#  marks where the prompt goes) is applied to a source dataset that is read
+#  and parsed once; every variant's dataset is written by its own writer
+#  thread (compression, sharding and S3 uploads included, see fileio.py and
+#  shards.py) while the next batch is parsed.
+#
+#  Every record carries a recordId, the same in all variants: the hash of the
+#  prompt without any disclosure, i.e. the key compare scripts use to join
+#  records exactly (matching.prompt_hash). The templates are saved next to
+#  the outputs (<output>.variants.json); passing that file to the compare
+#  scripts with --variants teaches them the new disclosures, so the variants'
+#  Bedrock outputs are joined on recordId instead of fuzzy-matched.
+#
+#  Usage:
+#    python variants.py INPUT.jsonl OUT.jsonl [--variant NAME[=TEMPLATE] ...]
+#                       [--variants-file FILE.json] [--shard-lines N]
+#                       [--keep-disclosure] [--no-record-id]
+#
+#  OUT may contain "{variant}"; otherwise "-NAME" is added before .jsonl.
+#  Without --variant, the built-in variants (DEFAULT_VARIANTS) are written.
+# -----------------------------------------------------------------------------
+#  Copyright (c) 2025 Jaymari Chua
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+# -----------------------------------------------------------------------------
+import argparse
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from bold_reformat import DISCLOSURE_MSG as BOLD_DISCLOSURE_MSG
+from fileio import open_binary, open_text
+from matching import KNOWN_DISCLOSURES, prompt_hash, register_disclosures
+from realtox_reformat import DISCLOSURE_MSG as QA_DISCLOSURE_MSG
+from realtox_reformat import QUESTION_PREFIX, QUESTION_SUFFIX, extract_question
+from records import iter_jsonl
+from shards import ShardWriter, split_jsonl_name
+from storage import is_remote
+
+PLACEHOLDER = "{prompt}"
+
+# The disclosure conditions run so far.
+DEFAULT_VARIANTS = {
+    "none": PLACEHOLDER,
+    "superhuman": f"{QA_DISCLOSURE_MSG} {PLACEHOLDER}",
+    "bold": f"{BOLD_DISCLOSURE_MSG}{PLACEHOLDER}",
+}
+
+ID_FIELD = "recordId"
+
+# Source records parsed per batch handed to the variant writers.
+FANOUT_BATCH = 2000
+
+def split_template(template):
+    """
+    (head, tail): the text before and after the prompt.
+    """
+    if template.count(PLACEHOLDER) != 1:
+        raise ValueError(f"A variant template needs exactly one {PLACEHOLDER}: {template!r}")
+    head, _, tail = template.partition(PLACEHOLDER)
+    return head, tail
+
+def parse_variants(specs=None, path=None):
+    """
+    {name: template} from "NAME=TEMPLATE" / "NAME" (a built-in) specs and/or a
+    JSON file: either {name: template} or a <output>.variants.json index.
+    """
+    variants = {}
+    if path:
+        with open_text(path) as f:
+            loaded = json.load(f)
+        loaded = loaded.get("variants", loaded)
+        for name, value in loaded.items():
+            variants[name] = value["template"] if isinstance(value, dict) else value
+    for spec in specs or []:
+        name, sep, template = spec.partition("=")
+        if not sep:
+            if name not in DEFAULT_VARIANTS:
+                raise ValueError(f"Unknown variant {name!r}; built-in ones are {sorted(DEFAULT_VARIANTS)}.")
+            template = DEFAULT_VARIANTS[name]
+        variants[name] = template
+    if not variants:
+        variants = dict(DEFAULT_VARIANTS)
+    for template in variants.values():
+        split_template(template)
+    return variants
+
+def register_variants(variants):
+    """
+    Make matching.normalize_prompt strip these templates' disclosure text.
+    """
+    heads, tails = zip(*(split_template(t) for t in variants.values())) if variants else ((), ())
+    register_disclosures(prefixes=[h for h in heads if h.strip()], suffixes=[t for t in tails if t.strip()])
+
+def strip_disclosure(prompt):
+    """
+    The prompt without one known disclosure prefix (longest match), otherwise
+    unchanged; unlike matching.normalize_prompt the rest is kept verbatim.
+    """
+    for disclosure in sorted(KNOWN_DISCLOSURES, key=len, reverse=True):
+        if disclosure and prompt.startswith(disclosure):
+            return prompt[len(disclosure):].lstrip()
+    return prompt
+
+def variant_path(output, name):
+    if "{variant}" in output:
+        return output.replace("{variant}", name)
+    stem, suffix = split_jsonl_name(output)
+    return f"{stem}-{name}{suffix}"
+
+def index_path(output):
+    return f"{split_jsonl_name(output.replace('{variant}', 'all'))[0]}.variants.json"
+
+def _source_rows(path):
+    """
+    (prompt, referenceResponse, category) of each line of a dataset or of a
+    Bedrock output file (whose fields sit under inputRecord). The question
+    template Bedrock wraps QA prompts in is removed, as realtox_reformat
+    does, so a variant's disclosure goes before the bare question.
+    """
+    for obj in iter_jsonl(path):
+        if not isinstance(obj, dict):
+            continue
+        record = obj.get("inputRecord", obj)
+        prompt = record.get("prompt") or ""
+        if prompt.startswith(QUESTION_PREFIX) or prompt.endswith(QUESTION_SUFFIX):
+            prompt = extract_question(prompt)
+        yield prompt, record.get("referenceResponse"), record.get("category")
+
+class _VariantWriter:
+    """
+    One variant's output, written on its own thread in batch order.
+    """
+
+    def __init__(self, name, template, path, max_lines=None, ensure_ascii=False):
+        self.name = name
+        self.head, self.tail = split_template(template)
+        self.path = path
+        self.ensure_ascii = ensure_ascii
+        if max_lines:
+            self._shards = ShardWriter(path, max_lines=max_lines, workers=1)
+            self._file = None
+        else:
+            self._shards = None
+            if not is_remote(path):
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._file = open_binary(path, "wb")
+        self._pool = ThreadPoolExecutor(max_workers=1)
+        self._pending = []
+
+    def submit(self, batch):
+        # At most two batches queued per variant keeps memory bounded
+        self._pending = [f for f in self._pending if not f.done()]
+        if len(self._pending) >= 2:
+            self._pending.pop(0).result()
+        self._pending.append(self._pool.submit(self._write, batch))
+
+    def _write(self, batch):
+        head, tail, ensure_ascii = self.head, self.tail, self.ensure_ascii
+        lines = [f'{{"prompt": {json.dumps(head + prompt + tail, ensure_ascii=ensure_ascii)}{rest}'
+                 for prompt, rest in batch]
+        if self._shards is not None:
+            for line in lines:
+                self._shards.write_line(line.encode("utf-8"))
+        else:
+            self._file.write("".join(lines).encode("utf-8"))
+
+    def close(self):
+        try:
+            for future in self._pending:
+                future.result()
+        finally:
+            self._pool.shutdown(wait=True)
+            if self._shards is not None:
+                self._shards.close()
+            else:
+                self._file.close()
+
+def fan_out(input_path, output, variants=None, max_lines=None, keep_disclosure=False,
+            id_field=ID_FIELD, ensure_ascii=False, batch_size=FANOUT_BATCH):
+    """
+    Write one dataset per variant ({name: template}) from a single pass over
+    'input_path'. Disclosures already in the source prompts are removed
+    first unless 'keep_disclosure'. Records get 'id_field' (None to omit).
+    Returns the index written to index_path(output).
+    """
+    variants = variants or dict(DEFAULT_VARIANTS)
+    register_variants(variants)
+    writers = [_VariantWriter(name, template, variant_path(output, name), max_lines=max_lines,
+                              ensure_ascii=ensure_ascii)
+               for name, template in variants.items()]
+    seen = defaultdict(int)
+    count = 0
+    try:
+        rows = _source_rows(input_path)
+        for chunk in iter(lambda: list(islice(rows, batch_size)), []):
+            batch = []
+            for prompt, reference, category in chunk:
+                base = prompt if keep_disclosure else strip_disclosure(prompt)
+                # Everything after the prompt is the same in all variants: encode it once
+                rest = ""
+                if reference is not None:
+                    rest += f', "referenceResponse": {json.dumps(reference, ensure_ascii=ensure_ascii)}'
+                if category is not None:
+                    rest += f', "category": {json.dumps(category, ensure_ascii=ensure_ascii)}'
+                if id_field:
+                    key = prompt_hash(base)
+                    record_id = key if not seen[key] else f"{key}#{seen[key]}"
+                    seen[key] += 1
+                    rest += f', {json.dumps(id_field)}: {json.dumps(record_id)}'
+                batch.append((base, rest + "}\n"))
+            for writer in writers:
+                writer.submit(batch)
+            count += len(batch)
+    finally:
+        for writer in writers:
+            writer.close()
+
+    index = {
+        "source": str(input_path),
+        "records": count,
+        "id_field": id_field,
+        "disclosure_removed": not keep_disclosure,
+        "variants": {w.name: {"template": variants[w.name], "path": w.path} for w in writers},
+    }
+    with open_text(index_path(output), "w") as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    return index
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write one dataset per disclosure variant in a single pass.")
+    parser.add_argument("input", help="source dataset or Bedrock output JSONL")
+    parser.add_argument("output", help='output path; "{variant}" is replaced by the variant name')
+    parser.add_argument("--variant", action="append", metavar="NAME[=TEMPLATE]",
+                        help=f"variant to write (repeatable); built-ins: {', '.join(DEFAULT_VARIANTS)}")
+    parser.add_argument("--variants-file", help="JSON {name: template} (or a .variants.json index)")
+    parser.add_argument("--shard-lines", type=int, metavar="N", help="shard each output (see shards.py)")
+    parser.add_argument("--keep-disclosure", action="store_true",
+                        help="keep disclosures already in the source prompts")
+    parser.add_argument("--no-record-id", action="store_true", help=f"omit the {ID_FIELD} field")
+    args = parser.parse_args()
+
+    try:
+        variants = parse_variants(args.variant, args.variants_file)
+    except ValueError as e:
+        parser.error(str(e))
+    index = fan_out(args.input, args.output, variants, max_lines=args.shard_lines,
+                    keep_disclosure=args.keep_disclosure,
+                    id_field=None if args.no_record_id else ID_FIELD)
+    for name, variant in index["variants"].items():
+        print(f"  {name}: {variant['path']}")
+    print(f"Wrote {index['records']} record(s) x {len(index['variants'])} variant(s); "
+          f"index: {index_path(args.output)}")
@@ -3,7 +3,7 @@
 #  File:       compare.py
 # -----------------------------------------------------------------------------
 #  Created:    January 12, 2025 - Jaymari Chua
-#  Modified:   January 12, 2025 - Jaymari Chua
+#  Modified:   October 18, 2026 - Jaymari Chua
 #
 # -----------------------------------------------------------------------------
 #  Description:
@@ -14,6 +14,11 @@
 #
 #  Compare script currently runs an LLM is tested against the Natural Questions dataset.
 #  Takes two input .json and then compares the scores of the LLMs.
+#  The files are loaded into columnar tables (code/etl/columnar.py) and every
+#  metric is compared at once.
+#
+#  Usage:
+#    python compare.py [file1.jsonl file2.jsonl]
 # -----------------------------------------------------------------------------
 #  Copyright (c) 2025 Jaymari Chua
 #
@@ -32,11 +37,27 @@
 # -----------------------------------------------------------------------------
 
 import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "etl"))
+
+from columnar import compare_tables, exact_join, load_table, union_metrics
+from data_tree import DATA_ROOT
+
+# Metrics always present in 'average_differences' (0.0 when neither file has
+# them); any other metric found in the files follows them.
+CORE_METRICS = ['Accuracy', 'Toxicity', 'Robustness']
 
 def compare_model_evaluations(file1_path, file2_path):
     """
-    Compares the scores (Accuracy, Toxicity, Robustness) of two model evaluation 
-    results stored in JSON Lines files.
+    Compares the scores of every metric (Accuracy, Toxicity, Robustness, ...)
+    of two model evaluation results stored in JSON Lines files.
+
+    Records are paired on the normalized prompt (disclosure prefix and QA
+    template removed). A metric missing from one side counts as 0.
+    'average_differences' always has the CORE_METRICS keys, followed by
+    any other metric found in either file.
 
     Args:
         file1_path (str): Path to the first JSON Lines file.
@@ -46,58 +67,36 @@ def compare_model_evaluations(file1_path, file2_path):
         dict: A dictionary containing the comparison results, including the average 
               score differences and a breakdown by prompt.
     """
+    table1 = load_table(file1_path)
+    table2 = load_table(file2_path)
 
-    def load_evaluation_data(filepath):
-        """Loads evaluation data from a JSON Lines file."""
-        data = {}
-        with open(filepath, 'r') as f:
-            for line in f:
-                try:
-                    record = json.loads(line)
-                    prompt = record['inputRecord']['prompt']
-                    scores = {score['metricName']: score['result'] for score in record['automatedEvaluationResult']['scores']}
-                    data[prompt] = scores
-                except (json.JSONDecodeError, KeyError) as e:
-                    print(f"Error processing line in {filepath}: {e}")
-        return data
-
-    data1 = load_evaluation_data(file1_path)
-    data2 = load_evaluation_data(file2_path)
+    rows1, rows2 = exact_join(table1, table2)
+    metrics = CORE_METRICS + [m for m in union_metrics(table1, table2) if m not in CORE_METRICS]
+    result = compare_tables(table1, table2, rows1, rows2, metrics=metrics, missing=0.0)
 
     comparison_results = {
         'average_differences': {
-            'Accuracy': 0.0,
-            'Toxicity': 0.0,
-            'Robustness': 0.0
+            metric: float(mean) if len(rows1) else 0.0
+            for metric, mean in zip(metrics, result['mean_diff'])
         },
         'prompt_level_comparison': []
     }
 
-    common_prompts = set(data1.keys()) & set(data2.keys())
-    num_common_prompts = len(common_prompts)
-
-    for prompt in common_prompts:
-        scores1 = data1[prompt]
-        scores2 = data2[prompt]
-
-        prompt_comparison = {'prompt': prompt}
-        for metric in ['Accuracy', 'Toxicity', 'Robustness']:
-            diff = scores2.get(metric, 0) - scores1.get(metric, 0)  # Default to 0 if metric is missing
+    for row1, diffs in zip(rows1, result['diff'].tolist()):
+        prompt_comparison = {'prompt': table1.prompts[row1]}
+        for metric, diff in zip(metrics, diffs):
             prompt_comparison[f'{metric}_difference'] = diff
-            comparison_results['average_differences'][metric] += diff
-
         comparison_results['prompt_level_comparison'].append(prompt_comparison)
 
-    # Calculate average differences
-    for metric in comparison_results['average_differences']:
-        comparison_results['average_differences'][metric] /= num_common_prompts if num_common_prompts > 0 else 1
-
     return comparison_results
 
 # Example Usage:
 if __name__ == "__main__":
-    file1 = '../../data/experiment1/018b851c-5e27-4297-be90-4d64006a4b29_output.jsonl'  # Replace with the path to your first JSON Lines file
-    file2 = '../../data/experiment2/ecc3d09c-0b83-4f87-b4cd-72c18a760a64_output.jsonl'  # Replace with the path to your second JSON Lines file
+    # Defaults: the Natural Questions runs in the repo's data/ tree (see etl/data_tree.py)
+    file1 = os.path.join(DATA_ROOT, 'run01', '018b851c-5e27-4297-be90-4d64006a4b29_output.jsonl')
+    file2 = os.path.join(DATA_ROOT, 'run02', 'ecc3d09c-0b83-4f87-b4cd-72c18a760a64_output.jsonl')
+    if len(sys.argv) == 3:
+        file1, file2 = sys.argv[1], sys.argv[2]
 
     results = compare_model_evaluations(file1, file2)
 
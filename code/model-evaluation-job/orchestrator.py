@@ -0,0 +1,465 @@
+#  -----------------------------------------------------------------------------
+#  Project:    warden
+#  File:       orchestrator.py
+# -----------------------------------------------------------------------------
+#  Created:    October 18, 2026 - Jaymari Chua
+#  Modified:   October 18, 2026 - Jaymari Chua
+#
+# -----------------------------------------------------------------------------
+#  Description:
+#
+#  Within this hallowed code lies the power to forge ethereal guardians,
+#  sentinels of the digital realm, to stand vigilant against the unruly tides of
+#  Large Language Models.
+#
+#  Run a batch of Bedrock model evaluation jobs. Every job spec is submitted
+#  with create_evaluation_job from a thread pool, with at most
+#  'max_in_flight' jobs submitted and not yet finished, and submissions and
+#  status polls each paced by a token bucket. Throttling and quota errors (and,
+#  except for submissions, 5xx errors) are retried, and status is polled, with
+#  jittered exponential backoff. When a job completes, its *_output.jsonl
+#  files are downloaded (code/etl/storage.py) to <download>/<jobName>/.
+#
+#  A jobs file is a JSON list of specs, or {"defaults": {...}, "jobs": [...]}
+#  where every job is merged over the defaults. A spec has:
+#    name, model, task_type (e.g. "QuestionAndAnswer", "Generation"),
+#    dataset (s3:// URI of a JSONL dataset, or a built-in such as
+#    "Builtin.BoolQ"), dataset_name (custom datasets; default: the file's
+#    name), metrics (e.g. ["Builtin.Accuracy", "Builtin.Toxicity"]),
+#    role_arn, output (s3:// URI), inference_params (optional JSON string).
+#
+#  Requires:
+#    pip install boto3
+#
+#  Usage:
+#    python orchestrator.py JOBS.json [--download DIR] [--results OUT.json]
+#                           [--max-in-flight N] [--rate R] [--burst B]
+#                           [--poll-rate R] [--poll-base S] [--poll-cap S]
+#                           [--region REGION] [--stub]
+#
+#  With --stub, the jobs run against stub_bedrock.StubBedrockClient instead.
+# -----------------------------------------------------------------------------
+#  Copyright (c) 2025 Jaymari Chua
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+# -----------------------------------------------------------------------------
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "etl"))
+
+from storage import get_client, resolve
+
+# Bedrock's default quota is a handful of evaluation jobs in progress per account.
+MAX_IN_FLIGHT = 10
+
+# Token buckets: create_evaluation_job and get_evaluation_job calls per second.
+SUBMIT_RATE = 1.0
+SUBMIT_BURST = 3
+POLL_RATE = 5.0
+
+# Status polling: first delay and cap, in seconds (jobs take tens of minutes).
+POLL_BASE = 30.0
+POLL_CAP = 300.0
+
+# Retries of a throttled or failing API call.
+MAX_ATTEMPTS = 10
+RETRY_BASE = 1.0
+RETRY_CAP = 60.0
+
+# Threads downloading finished jobs' outputs next to the in-flight ones.
+DOWNLOAD_WORKERS = 4
+
+DEFAULT_INFERENCE_PARAMS = json.dumps({"inferenceConfig": {"maxTokens": 512}})
+
+# Errors after which the request certainly did nothing; the only ones a
+# create_evaluation_job is retried on, as creating a job is not idempotent
+# (a 5xx may come back for a job that was in fact created).
+SUBMIT_RETRYABLE_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceQuotaExceededException",
+}
+
+RETRYABLE_CODES = SUBMIT_RETRYABLE_CODES | {
+    "ServiceUnavailableException",
+    "InternalServerException",
+}
+
+TERMINAL_STATUSES = {"Completed", "Failed", "Stopped"}
+
+_JOB_NAME = re.compile(r"^[a-z0-9](-*[a-z0-9]){0,62}$")
+
+_print_lock = threading.Lock()
+
+def _log(message):
+    # Whole lines only, as jobs report from many threads
+    with _print_lock:
+        print(message, flush=True)
+
+class TokenBucket:
+    """
+    Allows 'rate' acquisitions per second on average and bursts of up to
+    'burst'. Thread-safe; acquire() blocks until a token is available or
+    'stop' is set.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(burst))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, stop=None):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return True
+                wait = (1.0 - self._tokens) / self.rate
+            if stop is not None:
+                if stop.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+def backoff_delay(attempt, base, cap):
+    """
+    Exponential backoff with jitter: between half and all of
+    min(cap, base * 2**attempt), so callers spread out but never hammer.
+    """
+    delay = min(cap, base * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+def error_code(exc):
+    """
+    AWS error code of a botocore ClientError (or the stub's), else None.
+    """
+    response = getattr(exc, "response", None)
+    if isinstance(response, dict):
+        return response.get("Error", {}).get("Code")
+    return None
+
+def load_specs(path):
+    """
+    Job specs of a jobs file (see above), defaults merged in.
+    """
+    with open(path, encoding="utf-8") as f:
+        loaded = json.load(f)
+    if isinstance(loaded, dict):
+        defaults, jobs = loaded.get("defaults", {}), loaded.get("jobs", [])
+    else:
+        defaults, jobs = {}, loaded
+    specs = [{**defaults, **job} for job in jobs]
+    names = [spec.get("name") for spec in specs]
+    duplicates = sorted({n for n in names if names.count(n) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate job names in {path}: {', '.join(map(str, duplicates))}")
+    return specs
+
+def build_request(spec):
+    """
+    create_evaluation_job arguments for one job spec.
+    """
+    for field in ("name", "model", "task_type", "dataset", "metrics", "role_arn", "output"):
+        if not spec.get(field):
+            raise ValueError(f"Job spec {spec.get('name', '?')!r} is missing {field!r}.")
+    if not _JOB_NAME.match(spec["name"]):
+        raise ValueError(f"Invalid job name {spec['name']!r}: lowercase letters, digits and "
+                         f"hyphens only, at most 63 characters.")
+    dataset = spec["dataset"]
+    if dataset.startswith("Builtin."):
+        dataset_config = {"name": dataset}
+    else:
+        name = spec.get("dataset_name") or os.path.splitext(os.path.basename(dataset))[0]
+        dataset_config = {"name": name, "datasetLocation": {"s3Uri": dataset}}
+    return {
+        "jobName": spec["name"],
+        "roleArn": spec["role_arn"],
+        "evaluationConfig": {
+            "automated": {
+                "datasetMetricConfigs": [{
+                    "taskType": spec["task_type"],
+                    "dataset": dataset_config,
+                    "metricNames": list(spec["metrics"]),
+                }]
+            }
+        },
+        "inferenceConfig": {
+            "models": [{
+                "bedrockModel": {
+                    "modelIdentifier": spec["model"],
+                    "inferenceParams": spec.get("inference_params", DEFAULT_INFERENCE_PARAMS),
+                }
+            }]
+        },
+        "outputDataConfig": {"s3Uri": spec["output"]},
+    }
+
+class JobRun:
+    """
+    The progress and outcome of one job spec.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.name = spec.get("name")
+        self.arn = None
+        self.status = "Pending"
+        self.error = None
+        self.submit_attempts = 0
+        self.polls = 0
+        self.submitted_at = None
+        self.finished_at = None
+        self.outputs = []
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "arn": self.arn,
+            "status": self.status,
+            "error": self.error,
+            "submit_attempts": self.submit_attempts,
+            "polls": self.polls,
+            "submitted_at": self.submitted_at,
+            "finished_at": self.finished_at,
+            "outputs": self.outputs,
+        }
+
+class Orchestrator:
+    """
+    Submits, tracks and downloads a batch of evaluation jobs (see above).
+    'client' is a boto3 "bedrock" client or anything with the same
+    create_evaluation_job / get_evaluation_job methods. 'on_finish' is
+    called with each JobRun that reached a final status, after its download.
+    """
+
+    def __init__(self, client, download_dir=None, max_in_flight=MAX_IN_FLIGHT,
+                 submit_rate=SUBMIT_RATE, submit_burst=SUBMIT_BURST, poll_rate=POLL_RATE,
+                 poll_base=POLL_BASE, poll_cap=POLL_CAP, max_attempts=MAX_ATTEMPTS,
+                 retry_base=RETRY_BASE, retry_cap=RETRY_CAP, on_finish=None):
+        self.client = client
+        self.on_finish = on_finish
+        self.download_dir = download_dir
+        self.max_in_flight = max_in_flight
+        self.submit_bucket = TokenBucket(submit_rate, submit_burst)
+        self.poll_bucket = TokenBucket(poll_rate, max(1, int(poll_rate)))
+        self.poll_base = poll_base
+        self.poll_cap = poll_cap
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_cap = retry_cap
+        self.stop = threading.Event()
+        self._slots = threading.Semaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self.retries = 0
+
+    def _call(self, bucket, method, retryable=RETRYABLE_CODES, **kwargs):
+        """
+        One API call paced by 'bucket', retried on the error codes in
+        'retryable'.
+        """
+        for attempt in range(self.max_attempts):
+            if not bucket.acquire(self.stop):
+                raise InterruptedError("Stopped.")
+            try:
+                return method(**kwargs)
+            except Exception as e:
+                if error_code(e) not in retryable or attempt == self.max_attempts - 1:
+                    raise
+                with self._lock:
+                    self.retries += 1
+                if self.stop.wait(backoff_delay(attempt, self.retry_base, self.retry_cap)):
+                    raise InterruptedError("Stopped.")
+
+    def _download(self, run, output_uri):
+        """
+        Copy the job's *_output.jsonl files to <download_dir>/<jobName>/.
+        """
+        # The trailing '/' keeps job "x" from also listing job "x-r2"'s keys
+        storage, prefix = resolve(f"{output_uri.rstrip('/')}/{run.name}/")
+        target = os.path.join(self.download_dir, run.name)
+        os.makedirs(target, exist_ok=True)
+        for key in storage.list(prefix):
+            if key.endswith("_output.jsonl"):
+                path = os.path.join(target, os.path.basename(key))
+                storage.download_file(key, path)
+                run.outputs.append(path)
+
+    def _run(self, run):
+        try:
+            request = build_request(run.spec)
+        except ValueError as e:
+            run.status, run.error = "Invalid", str(e)
+            return run
+
+        # A slot is held from submission until the job is finished
+        self._slots.acquire()
+        try:
+            if self.stop.is_set():
+                run.status = "Cancelled"
+                return run
+            def create():
+                run.submit_attempts += 1
+                return self.client.create_evaluation_job(**request)
+            response = self._call(self.submit_bucket, create, retryable=SUBMIT_RETRYABLE_CODES)
+            run.arn, run.status, run.submitted_at = response["jobArn"], "InProgress", time.time()
+            _log(f"Submitted {run.name}: {run.arn}")
+
+            attempt = 0
+            while True:
+                if self.stop.wait(backoff_delay(attempt, self.poll_base, self.poll_cap)):
+                    raise InterruptedError("Stopped.")
+                attempt += 1
+                job = self._call(self.poll_bucket, self.client.get_evaluation_job, jobIdentifier=run.arn)
+                run.polls += 1
+                run.status = job.get("status", run.status)
+                if run.status in TERMINAL_STATUSES:
+                    break
+            run.finished_at = time.time()
+            if job.get("failureMessages"):
+                run.error = "; ".join(job["failureMessages"])
+        except InterruptedError:
+            if run.status == "Pending":
+                run.status = "Cancelled"
+            return run
+        except Exception as e:
+            run.status, run.error = "Error", str(e)
+            return run
+        finally:
+            self._slots.release()
+
+        _log(f"{run.status} {run.name} after {run.finished_at - run.submitted_at:.1f}s "
+             f"({run.polls} poll(s))")
+        if run.status == "Completed" and self.download_dir:
+            try:
+                self._download(run, job.get("outputDataConfig", {}).get("s3Uri", run.spec["output"]))
+            except Exception as e:
+                run.error = f"Download failed: {e}"
+        if self.on_finish is not None:
+            self.on_finish(run)
+        return run
+
+    def run(self, specs):
+        """
+        Run every spec; returns their JobRuns in spec order. On Ctrl-C no
+        new jobs are submitted and polling stops (submitted jobs keep
+        running in Bedrock; their ARNs are in the results).
+        """
+        runs = [JobRun(spec) for spec in specs]
+        with ThreadPoolExecutor(max_workers=self.max_in_flight + DOWNLOAD_WORKERS) as pool:
+            futures = [pool.submit(self._run, run) for run in runs]
+            try:
+                for future in futures:
+                    future.result()
+            except KeyboardInterrupt:
+                _log("[WARNING] Interrupted: no new jobs are submitted; submitted ones keep running.")
+                self.stop.set()
+        return runs
+
+def print_summary(runs, elapsed, retries):
+    counts = {}
+    for run in runs:
+        counts[run.status] = counts.get(run.status, 0) + 1
+    print(f"\n----- {len(runs)} job(s) in {elapsed:.1f}s -----")
+    for status, n in sorted(counts.items()):
+        print(f"  {status}: {n}")
+    finished = [r for r in runs if r.finished_at]
+    if finished and elapsed > 0:
+        print(f"  Throughput: {len(finished) / elapsed * 60:.1f} job(s)/min; "
+              f"{sum(r.polls for r in runs)} poll(s); {retries} retried call(s)")
+    for run in runs:
+        if run.error:
+            print(f"  [{run.status}] {run.name}: {run.error}")
+
+def add_arguments(parser):
+    """
+    The orchestrator's command-line options (shared with planner.py).
+    """
+    parser.add_argument("--max-in-flight", type=int, default=MAX_IN_FLIGHT,
+                        help=f"jobs submitted and not finished at once (default {MAX_IN_FLIGHT})")
+    parser.add_argument("--rate", type=float, default=SUBMIT_RATE,
+                        help=f"job submissions per second (default {SUBMIT_RATE})")
+    parser.add_argument("--burst", type=int, default=SUBMIT_BURST,
+                        help=f"submissions allowed back to back (default {SUBMIT_BURST})")
+    parser.add_argument("--poll-rate", type=float, default=POLL_RATE,
+                        help=f"status calls per second, all jobs together (default {POLL_RATE})")
+    parser.add_argument("--poll-base", type=float,
+                        help=f"first poll delay in seconds (default {POLL_BASE}; 0.2 with --stub)")
+    parser.add_argument("--poll-cap", type=float,
+                        help=f"longest poll delay in seconds (default {POLL_CAP}; 2 with --stub)")
+    parser.add_argument("--region", help="AWS region of the Bedrock client")
+    parser.add_argument("--stub", action="store_true",
+                        help="run against the local stub client (outputs under a temp directory)")
+
+def from_args(args, download_dir=None, on_finish=None):
+    """
+    Orchestrator configured by add_arguments' options.
+    """
+    if args.stub:
+        from stub_bedrock import StubBedrockClient
+        client = StubBedrockClient(tempfile.mkdtemp(prefix="warden-stub-"))
+        poll_base, poll_cap, retry_base = args.poll_base or 0.2, args.poll_cap or 2.0, 0.2
+    else:
+        client = get_client("bedrock", region_name=args.region)
+        poll_base, poll_cap, retry_base = args.poll_base or POLL_BASE, args.poll_cap or POLL_CAP, RETRY_BASE
+    return Orchestrator(client, download_dir=download_dir, max_in_flight=args.max_in_flight,
+                        submit_rate=args.rate, submit_burst=args.burst, poll_rate=args.poll_rate,
+                        poll_base=poll_base, poll_cap=poll_cap, retry_base=retry_base,
+                        on_finish=on_finish)
+
+def run_and_report(orchestrator, specs):
+    """
+    Run 'specs' and print the summary (and the stub's counters).
+    """
+    start = time.monotonic()
+    runs = orchestrator.run(specs)
+    print_summary(runs, time.monotonic() - start, orchestrator.retries)
+    stats = getattr(orchestrator.client, "stats", None)
+    if stats is not None:
+        print(f"  Stub: {stats}")
+    return runs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a batch of Bedrock model evaluation jobs.")
+    parser.add_argument("jobs", help="JSON jobs file (see the header)")
+    parser.add_argument("--download", metavar="DIR", help="download completed jobs' outputs here")
+    parser.add_argument("--results", metavar="OUT.json", help="write every job's outcome here")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        specs = load_specs(args.jobs)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    runs = run_and_report(from_args(args, download_dir=args.download), specs)
+
+    if args.results:
+        with open(args.results, "w", encoding="utf-8") as f:
+            json.dump([run.to_dict() for run in runs], f, indent=2)
+            f.write("\n")
+        print(f"Results written to {args.results}")
@@ -0,0 +1,241 @@
+#  -----------------------------------------------------------------------------
+#  Project:    warden
+#  File:       planner.py
+# -----------------------------------------------------------------------------
+#  Created:    October 18, 2026 - Jaymari Chua
+#  Modified:   October 18, 2026 - Jaymari Chua
+#
+# -----------------------------------------------------------------------------
+#  Description:
+#
+#  Within this hallowed code lies the power to forge ethereal guardians,
+#  sentinels of the digital realm, to stand vigilant against the unruly tides of
+#  Large Language Models.
+#
+#  Plan an experiment as a matrix instead of editing evaluate.py per job.
+#  A matrix file lists models, datasets (optionally every disclosure variant
+#  of a variants.py fan-out) and metric sets; every combination is a cell.
+#  Each cell is fingerprinted by (model id, SHA-256 of the dataset's bytes,
+#  task type, metrics), so renaming or moving a dataset does not matter but
+#  editing it does. Cells whose fingerprint has a completed job with its
+#  outputs in the local result store (result_store.py) are skipped; only the
+#  missing ones are submitted, through orchestrator.py, and recorded in the
+#  store as they finish.
+#
+#  Matrix file (JSON):
+#    {
+#      "name": "rtp-disclosure",
+#      "defaults": {"role_arn": "...", "output": "s3://bucket/evals/"},
+#      "models": ["meta.llama3-70b-instruct-v1:0",
+#                 {"id": "...", "alias": "llama3-8b"}],
+#      "datasets": [
+#        {"name": "realtoxicity", "path": "data/run04/input/realtoxic.jsonl",
+#         "uri": "s3://bucket/datasets/realtoxic.jsonl"},
+#        {"name": "realtoxicity", "variants": "out.variants.json",
+#         "uri": "s3://bucket/datasets/realtoxic-{variant}.jsonl"}
+#      ],
+#      "metric_sets": [{"task_type": "Generation", "metrics": ["Builtin.Toxicity"]}]
+#    }
+#
+#  "path" (local or s3://) is what gets hashed; "uri" is what Bedrock reads
+#  (default: the path). Built-in datasets ("Builtin.BoolQ") are fingerprinted
+#  by name.
+#
+#  Usage:
+#    python planner.py MATRIX.json [--store DIR] [--dry-run]
+#                      [orchestrator.py options, e.g. --max-in-flight N --stub]
+# -----------------------------------------------------------------------------
+#  Copyright (c) 2025 Jaymari Chua
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+# -----------------------------------------------------------------------------
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "etl"))
+
+from checkpoint import file_sha256
+from orchestrator import TERMINAL_STATUSES, add_arguments, from_args, run_and_report
+from result_store import RESULT_STORE, ResultStore
+
+MAX_JOB_NAME = 63
+
+# Characters kept of each part of a job name (matrix, model, dataset, ...).
+NAME_PART = 12
+
+def fingerprint(model, dataset_sha256, task_type, metrics):
+    """
+    Identity of an evaluation: the same model on the same dataset bytes with
+    the same task and metrics gives the same fingerprint.
+    """
+    key = {"model": model, "dataset_sha256": dataset_sha256, "task_type": task_type,
+           "metrics": sorted(metrics)}
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+def model_alias(model_id):
+    """
+    Short model name for job names: "meta.llama3-70b-instruct-v1:0" ->
+    "llama3-70b-instruct-v1".
+    """
+    return model_id.split(".", 1)[-1].split(":", 1)[0]
+
+def job_name(parts, digest, attempt=1):
+    """
+    A valid Bedrock job name from 'parts', ending in the fingerprint prefix
+    (and "-rN" from the second attempt on, as job names cannot be reused).
+    """
+    suffix = f"-{digest[:8]}" + (f"-r{attempt}" if attempt > 1 else "")
+    parts = [re.sub(r"[^a-z0-9]+", "-", p.lower()).strip("-")[:NAME_PART] for p in parts if p]
+    stem = "-".join(p.strip("-") for p in parts if p)
+    return stem[:MAX_JOB_NAME - len(suffix)].rstrip("-") + suffix
+
+def _expand_datasets(entry):
+    """
+    (name, variant, path, uri) of a dataset entry: one per variant when it
+    points to a variants.py index.
+    """
+    if isinstance(entry, str):
+        entry = {"path": entry}
+    name = entry.get("name")
+    if "variants" in entry:
+        with open(entry["variants"], encoding="utf-8") as f:
+            index = json.load(f)
+        for variant, info in index["variants"].items():
+            uri = entry.get("uri", info["path"]).replace("{variant}", variant)
+            yield name or os.path.basename(index["source"]).split(".")[0], variant, info["path"], uri
+        return
+    path = entry["path"]
+    yield name or os.path.basename(path).split(".")[0], entry.get("variant", ""), path, entry.get("uri", path)
+
+def expand(matrix):
+    """
+    One job spec per cell of 'matrix' (see above), with its 'fingerprint'
+    and 'tags'; the job name is filled in by plan().
+    """
+    defaults = matrix.get("defaults", {})
+    models = [m if isinstance(m, dict) else {"id": m} for m in matrix["models"]]
+    datasets = [d for entry in matrix["datasets"] for d in _expand_datasets(entry)]
+    metric_sets = matrix["metric_sets"]
+    hashes = {}
+
+    specs = []
+    for model in models:
+        for name, variant, path, uri in datasets:
+            if path not in hashes:
+                hashes[path] = path if path.startswith("Builtin.") else file_sha256(path)
+            for metric_set in metric_sets:
+                task_type = metric_set.get("task_type", defaults.get("task_type"))
+                metrics = metric_set["metrics"]
+                digest = fingerprint(model["id"], hashes[path], task_type, metrics)
+                specs.append({
+                    **defaults,
+                    "model": model["id"],
+                    "task_type": task_type,
+                    "dataset": uri,
+                    "dataset_name": f"{name}-{variant}" if variant else name,
+                    "metrics": metrics,
+                    "fingerprint": digest,
+                    "tags": {
+                        "model": model["id"],
+                        "alias": model.get("alias") or model_alias(model["id"]),
+                        "dataset": name,
+                        "variant": variant,
+                        "dataset_sha256": hashes[path],
+                        "metric_set": metric_set.get("name", ""),
+                    },
+                })
+    return specs
+
+def plan(matrix, store):
+    """
+    (todo, done, duplicates): specs to submit (named), (spec, ledger entry)
+    pairs already completed, and specs repeating an earlier cell's fingerprint.
+    """
+    latest = store.latest()
+    attempts = Counter(entry.get("fingerprint") for entry in store.entries())
+    todo, done, duplicates, seen = [], [], [], set()
+    for spec in expand(matrix):
+        digest = spec["fingerprint"]
+        if digest in seen:
+            duplicates.append(spec)
+            continue
+        seen.add(digest)
+        entry = store.completed(digest, latest)
+        if entry is not None:
+            done.append((spec, entry))
+            continue
+        tags = spec["tags"]
+        spec["name"] = job_name([matrix.get("name", ""), tags["alias"], tags["dataset"], tags["variant"],
+                                 tags["metric_set"]], digest, attempts[digest] + 1)
+        todo.append(spec)
+    return todo, done, duplicates
+
+def ledger_entry(run):
+    spec = run.spec
+    return {
+        "fingerprint": spec["fingerprint"],
+        "name": run.name,
+        "arn": run.arn,
+        "status": run.status,
+        "error": run.error,
+        **spec["tags"],
+        "task_type": spec["task_type"],
+        "metrics": spec["metrics"],
+        "outputs": run.outputs,
+        "finished_at": run.finished_at,
+    }
+
+def print_plan(todo, done, duplicates):
+    total = len(todo) + len(done) + len(duplicates)
+    print(f"----- {total} cell(s): {len(done)} already completed, {len(duplicates)} duplicate(s), "
+          f"{len(todo)} to submit -----")
+    for spec, entry in done:
+        print(f"  done    {spec['fingerprint'][:12]}  {entry['name']}")
+    for spec in duplicates:
+        print(f"  dup     {spec['fingerprint'][:12]}  {spec['tags']['dataset']} {spec['tags']['variant']}")
+    for spec in todo:
+        print(f"  submit  {spec['fingerprint'][:12]}  {spec['name']}")
+    print()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Submit the cells of an evaluation matrix that have no completed result yet.")
+    parser.add_argument("matrix", help="JSON matrix file (see the header)")
+    parser.add_argument("--store", default=RESULT_STORE, help="local result store (default data/results)")
+    parser.add_argument("--dry-run", action="store_true", help="print the plan without submitting")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    with open(args.matrix, encoding="utf-8") as f:
+        matrix = json.load(f)
+    store = ResultStore(args.store)
+    try:
+        todo, done, duplicates = plan(matrix, store)
+    except (KeyError, OSError, ValueError) as e:
+        parser.error(f"Invalid matrix {args.matrix}: {e}")
+    print_plan(todo, done, duplicates)
+
+    if todo and not args.dry_run:
+        orchestrator = from_args(args, download_dir=store.outputs_dir,
+                                 on_finish=lambda run: store.record(ledger_entry(run)))
+        runs = run_and_report(orchestrator, todo)
+        # Submitted jobs that did not finish still use up their name
+        for run in runs:
+            if run.arn and run.status not in TERMINAL_STATUSES:
+                store.record(ledger_entry(run))
@@ -0,0 +1,106 @@
+#  -----------------------------------------------------------------------------
+#  Project:    warden
+#  File:       result_store.py
+# -----------------------------------------------------------------------------
+#  Created:    October 18, 2026 - Jaymari Chua
+#  Modified:   October 18, 2026 - Jaymari Chua
+#
+# -----------------------------------------------------------------------------
+#  Description:
+#
+#  Within this hallowed code lies the power to forge ethereal guardians,
+#  sentinels of the digital realm, to stand vigilant against the unruly tides of
+#  Large Language Models.
+#
+#  The local result store: a directory holding the downloaded outputs of
+#  evaluation jobs (outputs/<jobName>/*_output.jsonl) and a ledger,
+#  index.jsonl, with one line per finished job attempt: its fingerprint (see
+#  planner.py), name, ARN, status, tags and output files. The ledger is only
+#  ever appended to; the latest line for a fingerprint wins.
+# -----------------------------------------------------------------------------
+#  Copyright (c) 2025 Jaymari Chua
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+# -----------------------------------------------------------------------------
+import json
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "etl"))
+
+from data_tree import RESULTS_ROOT
+
+# Default store: data/results/ at the top of the repository.
+RESULT_STORE = RESULTS_ROOT
+
+class ResultStore:
+    """
+    Ledger and outputs of finished evaluation jobs below 'root'.
+    """
+
+    def __init__(self, root=RESULT_STORE):
+        self.root = root
+        self.index_path = os.path.join(root, "index.jsonl")
+        self.outputs_dir = os.path.join(root, "outputs")
+        self._lock = threading.Lock()
+
+    def entries(self):
+        """
+        Every ledger line, oldest first. Unreadable lines are skipped.
+        """
+        if not os.path.exists(self.index_path):
+            return []
+        entries = []
+        with open(self.index_path, encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError as e:
+                    print(f"[WARNING] Skipping unreadable line {number} of {self.index_path}: {e}")
+        return entries
+
+    def latest(self):
+        """
+        {fingerprint: latest entry}.
+        """
+        return {entry["fingerprint"]: entry for entry in self.entries() if entry.get("fingerprint")}
+
+    def completed(self, fingerprint, latest=None):
+        """
+        The entry of a completed job for 'fingerprint' whose output files are
+        all still present, else None.
+        """
+        entry = (latest if latest is not None else self.latest()).get(fingerprint)
+        if entry is None or entry.get("status") != "Completed" or not entry.get("outputs"):
+            return None
+        if not all(os.path.exists(os.path.join(self.root, path)) for path in entry["outputs"]):
+            return None
+        return entry
+
+    def record(self, entry):
+        """
+        Append 'entry' to the ledger. Output paths are stored relative to the
+        store root so the store can be moved.
+        """
+        entry = dict(entry)
+        entry["outputs"] = [os.path.relpath(path, self.root) for path in entry.get("outputs", [])]
+        os.makedirs(self.root, exist_ok=True)
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock, open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
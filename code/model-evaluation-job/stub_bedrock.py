@@ -0,0 +1,200 @@
+#  -----------------------------------------------------------------------------
+#  Project:    warden
+#  File:       stub_bedrock.py
+# -----------------------------------------------------------------------------
+#  Created:    October 18, 2026 - Jaymari Chua
+#  Modified:   October 18, 2026 - Jaymari Chua
+#
+# -----------------------------------------------------------------------------
+#  Description:
+#
+#  Within this hallowed code lies the power to forge ethereal guardians,
+#  sentinels of the digital realm, to stand vigilant against the unruly tides of
+#  Large Language Models.
+#
+#  A local stand-in for the Bedrock control plane, so orchestrator.py can be
+#  run end to end (and its throughput and concurrency measured) offline.
+#  StubBedrockClient answers create_evaluation_job / get_evaluation_job like
+#  the boto3 "bedrock" client: jobs run for a random time, some fail, and
+#  calls beyond a per-second rate or a concurrent-job quota raise the same
+#  error codes Bedrock does. A completed job writes a Bedrock-style
+#  *_output.jsonl (prompts of the dataset when it is a local file, random
+#  scores) below a local output directory.
+# -----------------------------------------------------------------------------
+#  Copyright (c) 2025 Jaymari Chua
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+# -----------------------------------------------------------------------------
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+
+# Job run time in seconds, drawn uniformly from this range.
+STUB_DURATION = (1.0, 3.0)
+
+# Server-side limits: create calls per second and jobs in progress at once.
+STUB_CREATE_TPS = 5
+STUB_MAX_CONCURRENT = 10
+
+STUB_FAILURE_RATE = 0.05
+STUB_RECORDS = 100
+
+class StubClientError(Exception):
+    """
+    Shaped like botocore's ClientError: the code is in
+    response["Error"]["Code"].
+    """
+
+    def __init__(self, code, message):
+        super().__init__(f"{code}: {message}")
+        self.response = {"Error": {"Code": code, "Message": message}}
+
+class _StubJob:
+    def __init__(self, arn, request, duration, fails):
+        self.arn = arn
+        self.request = request
+        self.created = time.time()
+        self.done_at = self.created + duration
+        self.fails = fails
+        self.output_uri = None
+
+    @property
+    def name(self):
+        return self.request["jobName"]
+
+class StubBedrockClient:
+    """
+    The create_evaluation_job / get_evaluation_job / stop_evaluation_job
+    subset of the boto3 "bedrock" client, backed by threads and a local
+    directory. 'stats' counts calls, throttles and the peak number of jobs
+    in progress.
+    """
+
+    def __init__(self, output_root, duration=STUB_DURATION, create_tps=STUB_CREATE_TPS,
+                 max_concurrent=STUB_MAX_CONCURRENT, failure_rate=STUB_FAILURE_RATE,
+                 records=STUB_RECORDS, seed=None):
+        self.output_root = output_root
+        self.duration = duration
+        self.create_tps = create_tps
+        self.max_concurrent = max_concurrent
+        self.failure_rate = failure_rate
+        self.records = records
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._creates = deque()
+        self.stats = {"create_calls": 0, "get_calls": 0, "throttled": 0,
+                      "quota_exceeded": 0, "peak_in_progress": 0}
+
+    def _in_progress(self, now):
+        return sum(1 for job in self._jobs.values() if now < job.done_at)
+
+    def create_evaluation_job(self, **request):
+        for field in ("jobName", "roleArn", "evaluationConfig", "inferenceConfig", "outputDataConfig"):
+            if field not in request:
+                raise StubClientError("ValidationException", f"Missing required parameter {field}.")
+        now = time.time()
+        with self._lock:
+            self.stats["create_calls"] += 1
+            while self._creates and now - self._creates[0] >= 1.0:
+                self._creates.popleft()
+            if len(self._creates) >= self.create_tps:
+                self.stats["throttled"] += 1
+                raise StubClientError("ThrottlingException", "Rate exceeded.")
+            self._creates.append(now)
+            if any(job.name == request["jobName"] for job in self._jobs.values()):
+                raise StubClientError("ValidationException",
+                                      f"An evaluation job named {request['jobName']} already exists.")
+            if self._in_progress(now) >= self.max_concurrent:
+                self.stats["quota_exceeded"] += 1
+                raise StubClientError("ServiceQuotaExceededException",
+                                      "Too many evaluation jobs in progress.")
+            arn = f"arn:aws:bedrock:stub:000000000000:evaluation-job/{uuid.uuid4().hex[:12]}"
+            job = _StubJob(arn, request, self._rng.uniform(*self.duration),
+                           self._rng.random() < self.failure_rate)
+            self._jobs[arn] = job
+            self.stats["peak_in_progress"] = max(self.stats["peak_in_progress"], self._in_progress(now))
+        return {"jobArn": arn}
+
+    def get_evaluation_job(self, jobIdentifier):
+        with self._lock:
+            self.stats["get_calls"] += 1
+            job = self._jobs.get(jobIdentifier)
+        if job is None:
+            raise StubClientError("ResourceNotFoundException", f"No evaluation job {jobIdentifier}.")
+        now = time.time()
+        response = {
+            "jobArn": job.arn,
+            "jobName": job.name,
+            "creationTime": job.created,
+            "outputDataConfig": {"s3Uri": self.output_root},
+        }
+        if now < job.done_at:
+            response["status"] = "InProgress"
+        elif job.fails:
+            response["status"] = "Failed"
+            response["failureMessages"] = ["Stub failure."]
+        else:
+            with self._lock:
+                if job.output_uri is None:
+                    job.output_uri = self._write_output(job)
+            response["status"] = "Completed"
+        return response
+
+    def stop_evaluation_job(self, jobIdentifier):
+        with self._lock:
+            job = self._jobs.get(jobIdentifier)
+            if job is not None and time.time() < job.done_at:
+                job.done_at, job.fails = time.time(), True
+        return {}
+
+    def _prompts(self, request):
+        config = request["evaluationConfig"]["automated"]["datasetMetricConfigs"][0]
+        location = config["dataset"].get("datasetLocation", {}).get("s3Uri", "")
+        if location and os.path.isfile(location):
+            with open(location, encoding="utf-8") as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+            return [(r.get("prompt", ""), r.get("referenceResponse", "")) for r in rows]
+        return [(f"Stub prompt {i}", f"Stub reference {i}") for i in range(self.records)]
+
+    def _write_output(self, job):
+        """
+        Write the job's *_output.jsonl the way Bedrock lays it out below
+        the output location (<root>/<jobName>/<id>/models/...).
+        """
+        request = job.request
+        config = request["evaluationConfig"]["automated"]["datasetMetricConfigs"][0]
+        model = request["inferenceConfig"]["models"][0]["bedrockModel"]["modelIdentifier"]
+        dataset = config["dataset"]["name"]
+        metrics = [m.split(".", 1)[-1] for m in config["metricNames"]]
+        directory = os.path.join(self.output_root, job.name, job.arn.rsplit("/", 1)[-1], "models",
+                                 model.replace(":", "_"), "taskTypes", config["taskType"],
+                                 "datasets", dataset)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{uuid.uuid4()}_output.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for prompt, reference in self._prompts(request):
+                record = {
+                    "automatedEvaluationResult": {
+                        "scores": [{"metricName": m, "result": round(self._rng.random(), 6)} for m in metrics]
+                    },
+                    "inputRecord": {"prompt": prompt, "referenceResponse": reference},
+                    "modelResponses": [{"response": "Stub response.", "modelIdentifier": model}],
+                }
+                f.write(json.dumps(record) + "\n")
+        return path
@@ -20,10 +20,10 @@
 #  Default threshold is 70. Adjust as needed for stricter/looser matches.
 #
 #  Requires:
-#    pip install rapidfuzz
+#    pip install rapidfuzz numpy
 #
 #  Usage:
-#    python compare.py file1.jsonl file2.jsonl [threshold]
+#    python compare.py file1.jsonl file2.jsonl [threshold] [workers]
 # -----------------------------------------------------------------------------
 #  Copyright (c) 2025 Jaymari Chua
 #
@@ -42,10 +42,19 @@
 # -----------------------------------------------------------------------------
 import json
 import sys
-from rapidfuzz import fuzz
+
+import numpy as np
+from rapidfuzz import fuzz, process
 
 DEFAULT_THRESHOLD = 70
 
+# Number of worker threads rapidfuzz uses for batch scoring (-1 = all cores).
+DEFAULT_WORKERS = -1
+
+# Upper bound on the cells (file1 rows x file2 candidates) scored in one block,
+# which keeps a single float64 score block around 32 MB.
+MAX_BLOCK_CELLS = 4_000_000
+
 def load_jsonl(filename):
     """
     Load a JSONL file into a list of Python dicts.
@@ -118,21 +127,48 @@ def build_index(records):
 def find_best_fuzzy_match(target_prompt, candidates, threshold=DEFAULT_THRESHOLD):
     """
     Compare 'target_prompt' with each candidate's 'prompt' using partial_ratio.
-    If best_score < threshold, returns (None, best_score).
+    If nothing reaches the threshold, returns (None, 0).
     """
-    best_match = None
-    best_score = 0
+    return find_best_fuzzy_matches([target_prompt], candidates, threshold=threshold, workers=1)[0]
 
-    for cand in candidates:
-        score = fuzz.partial_ratio(target_prompt, cand["prompt"])
-        if score > best_score:
-            best_score = score
-            best_match = cand
-
-    if best_score >= threshold:
-        return best_match, best_score
-    else:
-        return None, best_score
+def find_best_fuzzy_matches(target_prompts, candidates, threshold=DEFAULT_THRESHOLD,
+                            workers=DEFAULT_WORKERS):
+    """
+    Batch version of find_best_fuzzy_match for a whole list of prompts.
+    Scores blocks of 'target_prompts' against every candidate's 'prompt' at once
+    with rapidfuzz's process.cdist (partial_ratio, score_cutoff=threshold) on
+    'workers' cores, then keeps the first highest-scoring candidate per row,
+    exactly like the one-by-one loop did.
+
+    Returns a list of (best_match, best_score) tuples, one per target prompt.
+    best_match is None when no candidate reaches the threshold; scores below the
+    cutoff are not computed, so best_score is 0 in that case.
+    """
+    if not candidates:
+        return [(None, 0) for _ in target_prompts]
+
+    choices = [cand["prompt"] for cand in candidates]
+    block_rows = max(1, MAX_BLOCK_CELLS // len(choices))
+
+    results = []
+    for start in range(0, len(target_prompts), block_rows):
+        block = process.cdist(
+            target_prompts[start:start + block_rows],
+            choices,
+            scorer=fuzz.partial_ratio,
+            score_cutoff=threshold,
+            dtype=np.float64,
+            workers=workers,
+        )
+        best_cols = block.argmax(axis=1)
+        best_scores = block[np.arange(len(best_cols)), best_cols]
+        for col, score in zip(best_cols, best_scores):
+            # A zero score means nothing cleared the cutoff (or nothing overlapped).
+            if score > 0 and score >= threshold:
+                results.append((candidates[col], float(score)))
+            else:
+                results.append((None, 0))
+    return results
 
 def safe_int(arg, default_val):
     """
@@ -143,7 +179,7 @@ def safe_int(arg, default_val):
     except ValueError:
         return default_val
 
-def main(file1, file2, threshold=DEFAULT_THRESHOLD):
+def main(file1, file2, threshold=DEFAULT_THRESHOLD, workers=DEFAULT_WORKERS):
     # Load data from both files
     data1 = load_jsonl(file1)
     data2 = load_jsonl(file2)
@@ -168,10 +204,12 @@ def main(file1, file2, threshold=DEFAULT_THRESHOLD):
     print(f"Comparing:\n  File1 = {file1}\n  File2 = {file2}")
     print(f"Fuzzy threshold = {threshold}\n")
 
-    # Attempt to fuzzy-match each record in file1
-    for item1 in index1:
+    # Fuzzy-match every record in file1 against file2 in batched blocks
+    matches = find_best_fuzzy_matches([item["prompt"] for item in index1], index2,
+                                      threshold=threshold, workers=workers)
+
+    for item1, (best_match, score) in zip(index1, matches):
         prompt1 = item1["prompt"]
-        best_match, score = find_best_fuzzy_match(prompt1, index2, threshold=threshold)
 
         if best_match is not None:
             bm_id = best_match["id"]
@@ -305,7 +343,7 @@ def main(file1, file2, threshold=DEFAULT_THRESHOLD):
 
 if __name__ == "__main__":
     if len(sys.argv) < 3:
-        print("Usage: python compare.py file1.jsonl file2.jsonl [threshold]")
+        print("Usage: python compare.py file1.jsonl file2.jsonl [threshold] [workers]")
         sys.exit(1)
 
     file1_path = sys.argv[1]
@@ -315,4 +353,8 @@ if __name__ == "__main__":
     if len(sys.argv) >= 4:
         threshold = safe_int(sys.argv[3], DEFAULT_THRESHOLD)
 
-    main(file1_path, file2_path, threshold=threshold)
+    workers = DEFAULT_WORKERS
+    if len(sys.argv) >= 5:
+        workers = safe_int(sys.argv[4], DEFAULT_WORKERS)
+
+    main(file1_path, file2_path, threshold=threshold, workers=workers)
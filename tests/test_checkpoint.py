@@ -0,0 +1,87 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code", "etl"))
+
+from checkpoint import read_checkpoint, reformat_file
+from records import get_prompt, get_reference_response
+
+SETTINGS = {"script": "test"}
+
+
+class Crash(Exception):
+    pass
+
+
+def _transform(record):
+    return {"prompt": f"Disclosure: {get_prompt(record)}", "referenceResponse": get_reference_response(record)}
+
+
+def _crashing_transform(after):
+    calls = []
+
+    def transform(record):
+        calls.append(1)
+        if len(calls) > after:
+            raise Crash()
+        return _transform(record)
+    return transform
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "input_output.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(50):
+            if i == 17:
+                f.write("{not json\n")
+            elif i == 30:
+                f.write("\n")
+            else:
+                f.write(json.dumps({"inputRecord": {"prompt": f"prompt {i} é", "referenceResponse": f"ref {i}"}}) + "\n")
+    return path
+
+
+def test_resume_after_a_crash_matches_an_uninterrupted_run(source, tmp_path):
+    expected = tmp_path / "expected.jsonl"
+    reformat_file(source, expected, _transform, settings=SETTINGS, every=5)
+
+    output = tmp_path / "resumed.jsonl"
+    with pytest.raises(Crash):
+        reformat_file(source, output, _crashing_transform(23), settings=SETTINGS, every=5)
+    state = read_checkpoint(str(output))
+    assert not state["complete"] and 0 < state["records_out"] <= 23
+    # A torn write past the last checkpoint must be cut off on resume
+    with open(output, "ab") as f:
+        f.write(b'{"partial": "' + b"x" * 100_000)
+
+    final = reformat_file(source, output, _transform, settings=SETTINGS, every=5)
+
+    assert output.read_bytes() == expected.read_bytes()
+    assert final["complete"] and not final["skipped"]
+    assert (final["records_in"], final["records_out"], final["invalid"]) == (49, 48, 1)
+
+
+def test_idempotent_run_skips_a_complete_output(source, tmp_path):
+    output = tmp_path / "out.jsonl"
+    reformat_file(source, output, _transform, settings=SETTINGS, every=5)
+    before = output.read_bytes()
+
+    state = reformat_file(source, output, _crashing_transform(0), settings=SETTINGS, idempotent=True)
+
+    assert state["skipped"]
+    assert output.read_bytes() == before
+
+
+def test_changed_settings_rewrite_the_output(source, tmp_path):
+    output = tmp_path / "out.jsonl"
+    reformat_file(source, output, _transform, settings=SETTINGS, every=5)
+
+    state = reformat_file(source, output, lambda record: {"p": get_prompt(record)},
+                          settings={"script": "other"}, idempotent=True)
+
+    assert not state["skipped"]
+    assert output.read_bytes().startswith(b'{"p": "prompt 0')
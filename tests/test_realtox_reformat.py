@@ -0,0 +1,34 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code", "etl"))
+
+import realtox_reformat
+from realtox_reformat import PromptFormatter
+
+
+def _read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_save_to_jsonl_accepts_a_list(tmp_path, monkeypatch):
+    monkeypatch.setattr(realtox_reformat, "WRITE_BATCH", 2)
+    records = [{"prompt": f"p{i}", "referenceResponse": f"r{i}"} for i in range(5)]
+    out = tmp_path / "out.jsonl"
+
+    count = PromptFormatter().save_to_jsonl(records, str(out))
+
+    assert count == 5
+    assert _read_jsonl(out) == records
+
+
+def test_save_to_jsonl_accepts_a_generator(tmp_path):
+    records = [{"prompt": "p", "referenceResponse": "r"}] * 3
+    out = tmp_path / "out.jsonl"
+
+    count = PromptFormatter().save_to_jsonl((r for r in records), str(out))
+
+    assert count == 3
+    assert _read_jsonl(out) == records
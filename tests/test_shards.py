@@ -0,0 +1,75 @@
+import json
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code", "etl"))
+
+from shards import load_manifest, merge, split
+
+
+def _write_jsonl(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+
+
+def _read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def _fake_outputs(manifest, tmp_path, seed=0):
+    """
+    One shuffled Bedrock-style output per shard; each response names the
+    original line its prompt came from.
+    """
+    rng = random.Random(seed)
+    paths = []
+    for shard in manifest["shards"]:
+        rows = [{"inputRecord": {"prompt": json.loads(line)["prompt"]},
+                 "modelResponses": [{"response": f"line {number}"}]}
+                for number, line in enumerate(open(shard["path"], encoding="utf-8"), start=shard["start"])]
+        rng.shuffle(rows)
+        path = tmp_path / f"job{shard['index']}_output.jsonl"
+        _write_jsonl(path, rows)
+        paths.append(str(path))
+    rng.shuffle(paths)
+    return paths
+
+
+def test_merge_restores_order_with_prompts_repeated_across_shards(tmp_path):
+    prompts = [f"prompt {i}" for i in range(90)]
+    # The last shard repeats the first five prompts of shard 0, and shard 1
+    # repeats two more
+    prompts[30:32] = prompts[10:12]
+    prompts += prompts[:5]
+    source = tmp_path / "data.jsonl"
+    _write_jsonl(source, [{"prompt": p} for p in prompts])
+
+    manifest = load_manifest(split(source, tmp_path / "out" / "data.jsonl", max_lines=30))
+    assert [s["stop"] - s["start"] for s in manifest["shards"]] == [30, 30, 30, 5]
+
+    merged = tmp_path / "merged_output.jsonl"
+    written = merge(manifest, _fake_outputs(manifest, tmp_path), str(merged))
+
+    rows = _read_jsonl(merged)
+    assert written == len(prompts)
+    assert [r["inputRecord"]["prompt"] for r in rows] == prompts
+    assert [r["modelResponses"][0]["response"] for r in rows] == [f"line {i}" for i in range(len(prompts))]
+
+
+def test_merge_fails_when_an_output_fits_two_shards_equally(tmp_path):
+    prompts = [f"prompt {i}" for i in range(60)]
+    prompts[30:35] = prompts[:5]
+    source = tmp_path / "data.jsonl"
+    _write_jsonl(source, [{"prompt": p} for p in prompts])
+    manifest = load_manifest(split(source, tmp_path / "out" / "data.jsonl", max_lines=30))
+
+    output = tmp_path / "partial_output.jsonl"
+    _write_jsonl(output, [{"inputRecord": {"prompt": p}} for p in prompts[:5]])
+
+    with pytest.raises(ValueError, match="equally"):
+        merge(manifest, [str(output)], str(tmp_path / "merged_output.jsonl"))
@@ -0,0 +1,103 @@
+import os
+import sys
+
+import pytest
+
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code", "etl"))
+
+import storage
+from storage import LocalStorage, S3Storage
+
+BUCKET = "evals-bucket"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        monkeypatch.setenv(name, "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.delenv(storage.ENDPOINT_ENV, raising=False)
+    # Clients cached by other tests would bypass this test's mock
+    monkeypatch.setattr(storage, "_session", None)
+    monkeypatch.setattr(storage, "_clients", {})
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield S3Storage(BUCKET, client=client)
+
+
+@pytest.fixture(params=["s3", "local"])
+def backend(request, tmp_path):
+    if request.param == "s3":
+        return request.getfixturevalue("s3")
+    return LocalStorage(str(tmp_path))
+
+
+def _put(store, key, data):
+    with store.open_write(key) as f:
+        f.write(data)
+
+
+def _uploads(s3):
+    return s3.client.list_multipart_uploads(Bucket=BUCKET).get("Uploads", [])
+
+
+def test_ranged_read_streams_the_whole_object(s3):
+    data = os.urandom(3 * 1024 + 100)
+    s3.client.put_object(Bucket=BUCKET, Key="blob", Body=data)
+
+    with s3.open_read("blob", range_size=1024, prefetch=2) as f:
+        assert f.read() == data
+    assert s3.read_range("blob", 1000, 2100) == data[1000:2100]
+    assert s3.size("blob") == len(data)
+
+
+def test_multipart_write_uploads_every_part(s3):
+    part = 5 << 20
+    data = os.urandom(2 * part + 12345)
+
+    with s3.open_write("big", part_size=part, workers=2) as f:
+        for start in range(0, len(data), 1 << 20):
+            f.write(data[start:start + (1 << 20)])
+
+    assert s3.client.get_object(Bucket=BUCKET, Key="big")["Body"].read() == data
+    assert _uploads(s3) == []
+
+
+@pytest.mark.parametrize("size", [10, (5 << 20) + 1])
+def test_write_is_discarded_when_the_block_raises(s3, size):
+    with pytest.raises(RuntimeError):
+        with s3.open_write("failed", part_size=5 << 20) as f:
+            f.write(b"x" * size)
+            raise RuntimeError("stop")
+
+    assert list(s3.list("failed")) == []
+    assert _uploads(s3) == []
+
+
+def test_local_write_is_discarded_when_the_block_raises(tmp_path):
+    local = LocalStorage(str(tmp_path))
+    with pytest.raises(RuntimeError):
+        with local.open_write("out/failed.jsonl") as f:
+            f.write(b"partial")
+            raise RuntimeError("stop")
+
+    assert list(local.list("")) == []
+
+
+def test_list_and_scan_match_key_prefixes_as_strings(backend):
+    # Already in key order ("-" sorts before "/")
+    keys = ["out/eval-1-r2/a_output.jsonl", "out/eval-1/b_output.jsonl",
+            "out/eval-10/c_output.jsonl", "out/other.jsonl"]
+    for i, key in enumerate(keys):
+        _put(backend, key, b"x" * (i + 1))
+
+    assert list(backend.list("out/eval-1")) == keys[:3]
+    assert list(backend.list("out/eval-1/")) == keys[1:2]
+    assert list(backend.list("out/")) == keys
+    assert list(backend.list("missing/")) == []
+    assert [(key, size) for key, size, _ in backend.scan("out/eval-1")] == [
+        (key, i + 1) for i, key in enumerate(keys[:3])]